@@ -1,7 +1,5 @@
 import argparse
 
-from crons.acfa_updater import UpdateAllInstances
-
 
 def main():
     parser = argparse.ArgumentParser(
@@ -9,8 +7,31 @@ def main():
     )
     parser.add_argument("api_key", help="API key for finding aids API")
     parser.add_argument("parent_cache", help="Parent directory of EAD and HTML caches")
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume the last export if it did not finish",
+    )
+    parser.add_argument(
+        "--sharded",
+        action="store_true",
+        help="Write cached files into hashed subdirectories",
+    )
+    parser.add_argument(
+        "--marc_file",
+        help="Also export MARC records for the Voyager import to this file",
+    )
+    parser.add_argument(
+        "--gc",
+        action="store_true",
+        help="Remove cached finding aids of resources that are no longer published",
+    )
     args = parser.parse_args()
-    UpdateAllInstances(args.parent_cache).all_repos(args.api_key)
+    from crons.acfa_updater import UpdateAllInstances
+
+    UpdateAllInstances(args.parent_cache, args.sharded).all_repos(
+        args.api_key, args.resume, args.marc_file, args.gc
+    )
 
 
 if __name__ == "__main__":
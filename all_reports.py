@@ -1,9 +1,6 @@
 import argparse
 
-from crons.report_accessions import AccessionsReporter
-from crons.report_agents import AgentsReporter
-from crons.report_subjects import SubjectReporter
-from crons.resource_reporter import ResourceReporter
+from crons.report_sinks import SINKS
 
 
 def main():
@@ -11,11 +8,20 @@ def main():
         description="Generates reports against ArchivesSpace API"
     )
     parser.add_argument("--google_sheets", action="store_true")
+    parser.add_argument(
+        "--diff",
+        action="store_true",
+        help="Only write rows that changed since the last Google Sheets update",
+    )
+    parser.add_argument(
+        "--format",
+        choices=SINKS,
+        help="Output format for reports not sent to Google Sheets (overrides [CSV] format)",
+    )
     args = parser.parse_args()
-    ResourceReporter().run(args.google_sheets)
-    AccessionsReporter().run(args.google_sheets)
-    AgentsReporter().run(args.google_sheets)
-    SubjectReporter().run(args.google_sheets)
+    from crons.report_runner import ReportRunner
+
+    ReportRunner(output_format=args.format).run(args.google_sheets, args.diff)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,48 @@
+import argparse
+import sys
+import timeit
+
+from crons.fa_list_generator import finding_aid_titles
+
+
+def sample_resources(count):
+    """Create resource JSON with no dates, one date, and inclusive and bulk dates."""
+    resources = []
+    for i in range(count):
+        dates = [
+            {"date_type": "inclusive", "begin": "1900", "end": f"{1900 + i % 100}"}
+        ]
+        if i % 3 == 1:
+            dates.append({"date_type": "bulk", "expression": "1920-1930"})
+        elif i % 3 == 2:
+            dates = []
+        resources.append({"title": f"Papers {i}", "dates": dates})
+    return resources
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Times finding aid title generation for a batch of resources"
+    )
+    parser.add_argument("--count", type=int, default=10000, help="Resources per batch")
+    parser.add_argument("--repeat", type=int, default=5, help="Batches to time")
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=5.0,
+        help="Maximum microseconds per title (best batch)",
+    )
+    args = parser.parse_args()
+    resources = sample_resources(args.count)
+    best = min(
+        timeit.repeat(
+            lambda: finding_aid_titles(resources), number=1, repeat=args.repeat
+        )
+    )
+    per_title = best / args.count * 1000000
+    print(f"{args.count} titles in {best:.4f}s ({per_title:.2f}us per title)")
+    sys.exit(1 if per_title > args.budget else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import argparse
+import sys
+
+from crons.import_time import IMPORT_BUDGETS, ImportBudget, check_import_budget
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Checks the import time of the cron entry points against their budgets"
+    )
+    parser.add_argument(
+        "modules", nargs="*", default=list(IMPORT_BUDGETS), help="Modules to check"
+    )
+    parser.add_argument(
+        "--runs", type=int, default=3, help="Imports to take the median of"
+    )
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="Multiply the time budgets (e.g., for slower hosts)",
+    )
+    args = parser.parse_args()
+    errors = []
+    for module_name in args.modules:
+        budget = IMPORT_BUDGETS[module_name]
+        budget = ImportBudget(budget.seconds * args.scale, budget.deferred)
+        errors.extend(check_import_budget(module_name, budget, args.runs))
+    for error in errors:
+        print(error)
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,19 @@ from crons.fa_list_generator import FindingAidLists
 
 
 def main():
-    FindingAidLists().create_all_lists()
+    parser = argparse.ArgumentParser(
+        description="Creates HTML snippets listing the finding aids of each repository"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only apply changes since the last run (a full crawl if there is no index yet)",
+    )
+    args = parser.parse_args()
+    if args.incremental:
+        FindingAidLists().update_lists()
+    else:
+        FindingAidLists().create_all_lists()
 
 
 if __name__ == "__main__":
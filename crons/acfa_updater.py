@@ -1,18 +1,30 @@
 import email
 import logging
+import os
 import smtplib
+import threading
 import time
+from concurrent.futures.process import BrokenProcessPool
 from configparser import ConfigParser
 from pathlib import Path
 
 import requests
+from lxml import etree
 
 from .aspace_client import ArchivesSpaceClient
-from .helpers import validate_against_schema, yesterday_utc
+from .bibid_resolver import BibidResolver
+from .checkpoint import CheckpointJournal
+from .finding_aid_cache import FindingAidCache
+from .helpers import page_count, sum_counts, yesterday_utc
+from .pipeline import Join, Pipeline, Stage
+from .resource_delta import ResourceDelta
+from .validation import ValidationService, validate_file
+from .voyager_updater import UpdateRepository as UpdateMarcRepository
+from .voyager_updater import write_marc_collection
 
 
 class UpdateAllInstances(object):
-    def __init__(self, parent_cache):
+    def __init__(self, parent_cache, sharded=False):
         """If no date is provided, default to 24 hours ago.
 
         Expects a config file with (only) an unlimited number of repositories in the following format:
@@ -21,6 +33,14 @@ class UpdateAllInstances(object):
         baseurl: https://sandbox.archivesspace.org/api/
         username: admin
         password: admin
+
+        Each instance can also set throttling options (requests_per_second,
+        min_requests_per_second, max_requests_per_second, target_latency and
+        max_retries; see ArchivesSpaceClient.from_config).
+
+        Args:
+            parent_cache (str): parent directory of EAD and PDF caches
+            sharded (bool): write cached files into hashed subdirectories (see FindingAidCache)
         """
         current_path = Path(__file__).parents[1].resolve()
         log_file = Path(current_path, "acfa_updater.log")
@@ -29,7 +49,7 @@ class UpdateAllInstances(object):
             format="%(asctime)s %(message)s",
             level=logging.INFO,
             handlers=[
-                logging.FileHandler(log_file),
+                logging.FileHandler(log_file, delay=True),
                 logging.StreamHandler(),
             ],
         )
@@ -37,27 +57,155 @@ class UpdateAllInstances(object):
         self.config = ConfigParser()
         self.config.read(config_file)
         self.parent_cache = parent_cache
+        self.cache = FindingAidCache(parent_cache, sharded)
 
-    def all_repos(self, acfa_api_token):
-        """Iterates through each repository in each ASpace instance."""
-        for instance_name in self.config.sections():
-            errors = []
-            as_client = ArchivesSpaceClient(
-                self.config[instance_name]["baseurl"],
-                self.config[instance_name]["username"],
-                self.config[instance_name]["password"],
+    def all_repos(self, acfa_api_token, resume=False, marc_file=None, gc=False):
+        """Iterates through each repository in each ASpace instance.
+
+        Progress is recorded in a checkpoint journal in the parent cache. With
+        resume, an unfinished run picks up where it stopped, using the same
+        modified-since timestamp and skipping stages that already finished.
+
+        With marc_file, MARC records for the Voyager import are exported in the
+        same pass over each repository's changed resources and written to the
+        file at the end. MARC export always runs for every changed resource, so
+        a resumed run still writes a complete file. Unpublished repositories,
+        which have no finding aids, get a MARC-only pass, so the file matches
+        the standalone Voyager export of every repository.
+
+        With gc, cached finding aids of resources that are no longer published
+        are then removed from each repository (see UpdateRepository.garbage_collect).
+
+        Args:
+            acfa_api_token (str): API key for finding aids API
+            resume (bool): resume the last run if it did not finish
+            marc_file (Path obj or str, optional): file to write the Voyager import to
+            gc (bool): also remove cached finding aids that are not published
+        """
+        checkpoint_directory = Path(self.parent_cache, "checkpoints")
+        journal = None
+        if resume:
+            journal = CheckpointJournal.latest_unfinished(checkpoint_directory)
+        if journal:
+            logging.info(f"Resuming export from {journal.path}")
+        else:
+            journal = CheckpointJournal.start(checkpoint_directory, yesterday_utc())
+        marc_collection = None
+        if marc_file:
+            marc_collection = etree.Element(
+                "collection", xmlns="http://www.loc.gov/MARC21/slim"
             )
-            email_from = self.config[instance_name]["email_from"]
-            email_to = self.config[instance_name]["email_to"]
-            email_server = self.config[instance_name]["email_server"]
+        with ValidationService() as validation_service:
+            for instance_name in self.config.sections():
+                self.update_instance(
+                    instance_name,
+                    acfa_api_token,
+                    journal,
+                    validation_service,
+                    marc_collection,
+                    gc,
+                )
+        if marc_file:
+            write_marc_collection(marc_collection, marc_file)
+        journal.finish()
+        logging.info(f"Export finished. Time per stage: {journal.summary()}")
+
+    def dry_run(self, acfa_api_token, marc_file=None, gc=False):
+        """Estimate the work of a run without exporting anything.
+
+        Args:
+            acfa_api_token (str): API key for finding aids API
+            marc_file (Path obj or str, optional): count MARC exports as well
+            gc (bool): count garbage collection requests as well
+
+        Returns:
+            dict: estimates for each repository (see UpdateRepository.dry_run;
+                with marc_file, unpublished repositories are estimated as a
+                MARC-only pass) and their totals
+        """
+        marc_collection = etree.Element("collection") if marc_file else None
+        timestamp = yesterday_utc()
+        estimates = {}
+        for instance_name in self.config.sections():
+            as_client = ArchivesSpaceClient.from_config(self.config[instance_name])
             for repo in as_client.aspace.repositories:
                 if repo.publish:
-                    repo_errors = UpdateRepository(
-                        acfa_api_token, as_client, repo, self.parent_cache
-                    ).daily_update()
-                    errors.extend(repo_errors)
-            if errors:
-                self.send_error_email(email_from, email_to, email_server, errors)
+                    estimates[repo.repo_code] = UpdateRepository(
+                        acfa_api_token,
+                        as_client,
+                        repo,
+                        self.parent_cache,
+                        cache=self.cache,
+                        marc_collection=marc_collection,
+                    ).dry_run(timestamp, gc)
+                elif marc_file:
+                    estimates[repo.repo_code] = UpdateMarcRepository(
+                        as_client, repo
+                    ).dry_run(timestamp)
+        return {"repositories": estimates, **sum_counts(estimates.values())}
+
+    def update_instance(
+        self,
+        instance_name,
+        acfa_api_token,
+        journal,
+        validation_service,
+        marc_collection=None,
+        gc=False,
+    ):
+        """Updates each published repository in an ASpace instance and emails any errors.
+
+        With a marc_collection, MARC records of unpublished repositories are
+        exported as well (see export_marc_only).
+        """
+        errors = []
+        as_client = ArchivesSpaceClient.from_config(self.config[instance_name])
+        email_from = self.config[instance_name]["email_from"]
+        email_to = self.config[instance_name]["email_to"]
+        email_server = self.config[instance_name]["email_server"]
+        for repo in as_client.aspace.repositories:
+            if repo.publish:
+                updater = UpdateRepository(
+                    acfa_api_token,
+                    as_client,
+                    repo,
+                    self.parent_cache,
+                    validation_service,
+                    self.cache,
+                    marc_collection,
+                )
+                errors.extend(updater.daily_update(journal.timestamp, journal))
+                if gc:
+                    errors.extend(updater.garbage_collect())
+            elif marc_collection is not None:
+                errors.extend(
+                    self.export_marc_only(
+                        as_client, repo, journal.timestamp, marc_collection
+                    )
+                )
+        if errors:
+            self.send_error_email(email_from, email_to, email_server, errors)
+
+    def export_marc_only(self, as_client, repo, timestamp, marc_collection):
+        """Add MARC records of a repository's changed resources to the Voyager import.
+
+        Args:
+            as_client (ArchivesSpaceClient): ArchivesSpace client instance
+            repo (asnake.jsonmodel.JSONModelObject): ArchivesSpace repository object
+            timestamp (int): export resources modified since
+            marc_collection (etree.Element): MARCXML collection to add records to
+
+        Returns:
+            list: errors
+        """
+        try:
+            marc_collection.extend(
+                UpdateMarcRepository(as_client, repo).updated_marc(timestamp)
+            )
+        except Exception as e:
+            logging.error(f"{repo.repo_code}: {e}")
+            return [f"Error when exporting MARC records ({repo.repo_code}): {e}"]
+        return []
 
     def send_error_email(self, email_from, email_to, email_server, errors):
         message = email.message.EmailMessage()
@@ -74,7 +222,50 @@ class UpdateAllInstances(object):
 
 
 class UpdateRepository(object):
-    def __init__(self, acfa_api_token, as_client, repo, parent_cache):
+    """Updates the EAD and PDF caches and the finding aids index for one repository.
+
+    Resources pass through separate worker pools for EAD export, schema
+    validation, PDF rendering and index posting, connected by bounded queues.
+    Optionally, MARC records for the Voyager import are exported alongside.
+    """
+
+    stage_workers = {
+        "export": 4,
+        "validate": os.cpu_count() or 2,
+        "pdf": 2,
+        "index": 1,
+        "marc": 2,
+    }
+    index_batch_size = 50
+    # Garbage collection is abandoned if it would remove more than this
+    # fraction of a repository's cached finding aids.
+    gc_max_fraction = 0.1
+    # ArchivesSpace requests per exported resource: the EAD export, and the PDF
+    # job's post, status checks (at least two), output file list and download.
+    requests_per_resource = 6
+
+    def __init__(
+        self,
+        acfa_api_token,
+        as_client,
+        repo,
+        parent_cache,
+        validation_service=None,
+        cache=None,
+        marc_collection=None,
+    ):
+        """Set up the repository update.
+
+        Args:
+            acfa_api_token (str): API key for finding aids API
+            as_client (ArchivesSpaceClient): ArchivesSpace client instance
+            repo (asnake.jsonmodel.JSONModelObject): ArchivesSpace repository object
+            parent_cache (str): parent directory of EAD and PDF caches
+            validation_service (ValidationService, optional): process pool for schema validation. Defaults to validating in the validate stage's threads.
+            cache (FindingAidCache, optional): EAD and PDF caches. Defaults to the flat layout in parent_cache.
+            marc_collection (etree.Element, optional): MARCXML collection to add processed MARC records to
+        """
+        self.validation_service = validation_service
         self.export_params = {
             "include_unpublished": False,
             "include_daos": True,
@@ -83,48 +274,295 @@ class UpdateRepository(object):
         self.acfa_api_token = acfa_api_token
         self.as_client = as_client
         self.repo = repo
-        self.ead_cache = Path(parent_cache, "ead_cache")
-        self.pdf_cache = Path(parent_cache, "pdf_cache")
+        self.cache = cache or FindingAidCache(parent_cache)
+        self.resolver = BibidResolver(as_client)
+        self.delta = ResourceDelta(as_client, repo, self.cache, self.resolver)
+        self.marc_collection = marc_collection
+        self.marc_repository = UpdateMarcRepository(as_client, repo)
+        self.marc_lock = threading.Lock()
 
-    def daily_update(self, timestamp=None):
-        """Updates EAD and HTML caches, updates index."""
-        bibids = []
+    def daily_update(self, timestamp=None, journal=None):
+        """Updates EAD and PDF caches, updates index.
+
+        Once its EAD is written, a resource is queued for validation and PDF
+        rendering at the same time, so EAD exports never wait behind slow PDF
+        jobs. It is indexed after both stages have finished with it, and not at
+        all if its PDF could not be written. Finding aids for resources that
+        were deleted, unpublished or suppressed are then removed from the
+        caches and index.
+
+        Args:
+            timestamp (int, optional): update resources modified since. Defaults to 24 hours ago.
+            journal (CheckpointJournal, optional): records finished stages; stages already recorded are skipped
+        """
         timestamp = yesterday_utc() if timestamp is None else timestamp
-        errors = []
-        for resource in self.updated_resources(timestamp):
+        self.journal = journal
+        self.errors = []
+        export_stage = Stage("export", self.export_ead, self.stage_workers["export"])
+        validate_stage = export_stage.then(
+            Stage("validate", self.validate_ead, self.stage_workers["validate"])
+        )
+        pdf_stage = export_stage.then(
+            Stage("pdf", self.export_pdf, self.stage_workers["pdf"])
+        )
+        join_stage = validate_stage.then(
+            Join("validate+pdf", lambda item: item["resource"].uri, 2)
+        )
+        pdf_stage.then(join_stage)
+        index_stage = join_stage.then(
+            Stage(
+                "index",
+                self.index_resources,
+                self.stage_workers["index"],
+                batch_size=self.index_batch_size,
+            )
+        )
+        stages = [export_stage, validate_stage, pdf_stage, join_stage, index_stage]
+        marc_stage = None
+        if self.marc_collection is not None:
+            marc_stage = Stage("marc", self.export_marc, self.stage_workers["marc"])
+            stages.append(marc_stage)
+        with Pipeline(stages):
+            for resource in self.updated_resources(timestamp):
+                export_stage.put(resource)
+                if marc_stage is not None:
+                    marc_stage.put(resource)
+        self.remove_finding_aids()
+        return self.errors
+
+    def dry_run(self, timestamp=None, gc=False):
+        """Estimate the work of a daily update without exporting anything.
+
+        Only the list of modified resources is requested, and with gc the
+        list of all resources.
+
+        Args:
+            timestamp (int, optional): count resources modified since. Defaults to 24 hours ago.
+            gc (bool): count garbage collection requests as well
+
+        Returns:
+            dict: modified resources, and estimated ArchivesSpace and index requests
+        """
+        timestamp = yesterday_utc() if timestamp is None else timestamp
+        count = len(self.delta.modified_ids(timestamp))
+        per_resource = self.requests_per_resource
+        if self.marc_collection is not None:
+            per_resource += 1
+        requests = count * per_resource
+        # The modified listing and record batches, then the all_ids listing
+        # and delete feed read when removing finding aids.
+        requests += 1 + page_count(count, self.resolver.batch_size)
+        requests += 1 + self.delta.delete_feed_pages
+        if gc:
+            resource_count = len(
+                self.as_client.record_ids(f"/repositories/{self.repo.id}/resources")
+            )
+            requests += 1 + page_count(resource_count, self.resolver.batch_size)
+        return {
+            "resources": count,
+            "requests": requests,
+            "index_requests": page_count(count, self.index_batch_size),
+        }
+
+    def remove_finding_aids(self):
+        """Remove finding aids for deleted, unpublished or suppressed resources."""
+        try:
+            removed = self.delta.removed()
+        except Exception as e:
+            logging.error(f"{self.repo.repo_code}: {e}")
+            self.errors.append(
+                f"Error when finding removed finding aids ({self.repo.repo_code}): {e}"
+            )
+            removed = {}
+        for bibid, reason in removed.items():
+            logging.info(f"{bibid}: Removing finding aid ({reason})")
+            self.cache.remove(bibid)
+        if removed:
+            self.remove_bibids_from_index(sorted(removed))
+
+    def remove_bibids_from_index(self, bibids):
+        """Remove finding aids from the index, noting an error if the request fails."""
+        response = self.remove_from_index(bibids)
+        if not response.ok:
+            self.errors.append(
+                f"Error when removing {len(bibids)} finding aids from index ({self.repo.repo_code}): {response.status_code}"
+            )
+
+    def garbage_collect(self):
+        """Remove the repository's cached finding aids whose resources are not published.
+
+        Only run on request (see UpdateAllInstances.all_repos), not as part of
+        the daily update. Publish states are read from the resource records in
+        the database, listed with all_ids and fetched in batches, so a lagging
+        search index cannot make published finding aids look unpublished.
+        Nothing is removed if the records cannot all be read, or if more than
+        `gc_max_fraction` of the repository's cached finding aids would be.
+
+        Returns:
+            list: errors
+        """
+        self.errors = []
+        try:
+            resource_ids = self.as_client.record_ids(
+                f"/repositories/{self.repo.id}/resources"
+            )
+            published = {
+                self.resolver.bibid(record)
+                for record in self.resolver.resources(self.repo.id, resource_ids)
+                if record.get("publish") and not record.get("suppressed")
+            }
+        except Exception as e:
+            logging.error(f"{self.repo.repo_code}: {e}")
+            self.errors.append(
+                f"Error when listing published resources ({self.repo.repo_code}): {e}"
+            )
+            return self.errors
+        self.cache.claim(published, self.repo.repo_code)
+        cached = self.cache.bibids(self.repo.repo_code)
+        unpublished = cached - published
+        if len(unpublished) > self.gc_max_fraction * len(cached):
+            message = f"Not removing {len(unpublished)} of {len(cached)} cached finding aids ({self.repo.repo_code}): more than {self.gc_max_fraction:.0%} are not published"
+            logging.error(message)
+            self.errors.append(message)
+            return self.errors
+        removed = self.cache.garbage_collect(published, self.repo.repo_code)
+        for bibid in removed:
+            logging.info(f"{bibid}: Removing finding aid (not published)")
+        if removed:
+            self.remove_bibids_from_index(removed)
+        return self.errors
+
+    def completed(self, resource, stage):
+        return self.journal is not None and self.journal.completed(resource.uri, stage)
+
+    def record(self, resource, stage, start_time, bibid):
+        if self.journal:
+            self.journal.record(resource.uri, stage, time.time() - start_time, bibid)
+
+    def export_ead(self, resource):
+        """Write a resource's EAD to the cache.
+
+        The response is streamed to disk as it arrives and written as-is.
+
+        Returns:
+            dict: resource, bibid and path of the EAD file (None if exported in an earlier run)
+        """
+        if self.completed(resource, "ead"):
+            bibid = self.journal.bibids[resource.uri]
+            return {"resource": resource, "bibid": bibid, "ead_path": None}
+        bibid = resource.id_0
+        try:
+            bibid = self.resolver.bibid(resource.json())
+            start_time = time.time()
             ead_response = self.as_client.aspace.client.get(
                 f"/repositories/{self.repo.id}/resource_descriptions/{resource.id}.xml",
                 params=self.export_params,
+                stream=True,
             )
-            if getattr(resource, "id_2", False):
-                bibid = f"{resource.id_0}-{getattr(resource, 'id_1', '')-{getattr(resource, 'id_2')}}"
-            elif getattr(resource, "id_1", False):
-                bibid = f"{resource.id_0}-{getattr(resource, 'id_1')}"
-            else:
-                bibid = f"{resource.id_0}"
+            ead_filepath = self.cache.write(
+                "ead", bibid, ead_response, self.repo.repo_code, resource.uri
+            )
+            self.record(resource, "ead", start_time, bibid)
+            return {"resource": resource, "bibid": bibid, "ead_path": ead_filepath}
+        except Exception as e:
+            self.log_error(bibid, e)
+
+    def validate_ead(self, item):
+        """Validate a resource's EAD against the schema, logging it if invalid.
+
+        Invalid finding aids are still indexed, so the item is always returned,
+        even if the EAD could not be validated at all (the error is reported).
+        """
+        if item["ead_path"] is None:
+            return item
+        try:
+            result = self.validate_file(item["ead_path"])
+        except Exception as e:
+            self.log_error(item["bibid"], f"EAD could not be validated: {e}")
+            return item
+        if not result.valid:
+            details = "; ".join(f"line {line}: {msg}" for line, msg in result.errors)
+            logging.info(f"{item['bibid']}: Invalid EAD ({details})")
+            self.errors.append(f"Invalid EAD: {item['bibid']} ({details})")
+        return item
+
+    def validate_file(self, ead_path):
+        """Validate an EAD file with the validation service, or in this thread.
+
+        If the service's worker processes have died (e.g., a worker was
+        killed for running out of memory), the rest of the repository's
+        finding aids are validated in the validate stage's threads instead.
+        """
+        if self.validation_service:
             try:
-                if not validate_against_schema(ead_response.content, "ead"):
-                    logging.info(f"{bibid}: Invalid EAD")
-                    errors.append(f"Invalid EAD: {bibid}")
-                if bibid.isnumeric() or bibid.startswith("in"):
-                    bibid = f"cul-{bibid}"
-                ead_filepath = Path(self.ead_cache, f"as_ead_{bibid}.xml")
-                with open(ead_filepath, "w") as ead_file:
-                    ead_file.write(ead_response.content.decode("utf-8"))
-                # skip Prokofiev
-                if bibid != "10815449" or bibid != "cul-10815449":
-                    pdf_filepath = Path(self.pdf_cache, f"as_ead_{bibid}.pdf")
-                    pdf_response = self.create_pdf_job(resource.id)
-                    with open(pdf_filepath, "wb") as pdf_file:
-                        pdf_file.write(pdf_response.content)
-                bibids.append(bibid)
+                return self.validation_service.validate_file(ead_path, "ead")
+            except BrokenProcessPool as e:
+                logging.error(f"{self.repo.repo_code}: validation workers failed ({e})")
+                self.validation_service = None
+        return validate_file(ead_path, "ead")
+
+    def export_pdf(self, item):
+        """Render a resource's PDF with an ArchivesSpace job and write it to the cache.
+
+        Returns:
+            dict: the item, or None if the PDF could not be written
+        """
+        resource, bibid = item["resource"], item["bibid"]
+        if self.completed(resource, "pdf"):
+            return item
+        # skip Prokofiev
+        if bibid != "10815449" or bibid != "cul-10815449":
+            try:
+                start_time = time.time()
+                pdf_response = self.create_pdf_job(resource.id)
+                self.cache.write(
+                    "pdf", bibid, pdf_response, self.repo.repo_code, resource.uri
+                )
+                self.record(resource, "pdf", start_time, bibid)
             except Exception as e:
-                logging.error(f"{bibid}: {e}")
-                errors.append(
-                    f"Error when processing {bibid} ({self.repo.repo_code}): {e}"
+                self.log_error(bibid, e)
+                return None
+        return item
+
+    def export_marc(self, resource):
+        """Export and process a resource's MARC record and add it to the Voyager import.
+
+        The marc stage is fed the modified resources directly, so a failed EAD
+        export does not drop the resource's MARC record.
+        """
+        try:
+            marc_record = self.marc_repository.export_marc(resource)
+        except Exception as e:
+            self.log_error(resource.uri, e)
+            return
+        if marc_record is not None:
+            with self.marc_lock:
+                self.marc_collection.append(marc_record)
+
+    def index_resources(self, items):
+        """Post a batch of exported resources to the finding aids index."""
+        items = [i for i in items if not self.completed(i["resource"], "index")]
+        if not items:
+            return
+        start_time = time.time()
+        response = self.update_index([i["bibid"] for i in items])
+        if not response.ok:
+            self.errors.append(
+                f"Error when indexing {len(items)} finding aids ({self.repo.repo_code}): {response.status_code}"
+            )
+            return
+        if self.journal:
+            duration = (time.time() - start_time) / len(items)
+            for item in items:
+                self.journal.record(
+                    item["resource"].uri, "index", duration, item["bibid"]
                 )
-        self.update_index(bibids)
-        return errors
+
+    def log_error(self, bibid, error):
+        logging.error(f"{bibid}: {error}")
+        self.errors.append(
+            f"Error when processing {bibid} ({self.repo.repo_code}): {error}"
+        )
 
     def create_pdf_job(self, resource_id):
         data = {
@@ -155,7 +593,7 @@ class UpdateRepository(object):
                     f"{job_uri}/output_files"
                 ).json()[0]
                 pdf_response = self.as_client.aspace.client.get(
-                    f"{job_uri}/output_files/{output_file_id}"
+                    f"{job_uri}/output_files/{output_file_id}", stream=True
                 )
                 return pdf_response
             elif job_json["status"] == "failed":
@@ -180,14 +618,7 @@ class UpdateRepository(object):
         print(response.content)
 
     def updated_resources(self, timestamp):
-        resource_ids = self.as_client.aspace.client.get(
-            f"/repositories/{self.repo.id}/resources",
-            params={"all_ids": True, "modified_since": timestamp},
-        ).json()
-        for resource_id in resource_ids:
-            resource = self.repo.resources(resource_id)
-            if resource.publish and not resource.suppressed:
-                yield resource
+        return self.delta.modified(timestamp)
 
     def update_index(self, bibids):
         url = f"{self.acfa_base_url}api/v1/index/index_ead"
@@ -198,3 +629,13 @@ class UpdateRepository(object):
         }
         response = requests.post(url, json=json_data, headers=headers)
         return response
+
+    def remove_from_index(self, bibids):
+        url = f"{self.acfa_base_url}api/v1/index/delete_ead"
+        json_data = {"bibids": bibids}
+        headers = {
+            "Authorization": f"Token {self.acfa_api_token}",
+            "Content-Type": "application/json",
+        }
+        response = requests.post(url, json=json_data, headers=headers)
+        return response
@@ -1,43 +1,56 @@
-import csv
+import threading
 from configparser import ConfigParser
 from datetime import datetime
 from pathlib import Path
 
 from .aspace_client import ArchivesSpaceClient
-from .google_sheets_client import DataSheet
+from .report_sinks import get_sink
 
 
 class BaseAsCron(object):
     """Base class which all ArchivesSpace crons inherit.
 
-    Subclasses should implement a `get_sheet_data` method.
+    Subclasses should implement a `get_sheet_data` method. Subclasses can set
+    `as_client_class` to another client with the ArchivesSpaceClient interface
+    (e.g., SyncArchivesSpaceClient to fetch records concurrently).
+
+    Reports not sent to Google Sheets are written in `output_format` (csv,
+    csv.gz, csv.zst, jsonl or parquet), set by `format` in the [CSV] config
+    section and defaulting to csv.
     """
 
-    def __init__(self, sheet_name):
+    as_client_class = ArchivesSpaceClient
+    output_format = "csv"
+    # The Google Sheets service is shared and not thread-safe (see get_service).
+    sheets_lock = threading.Lock()
+
+    def __init__(self, sheet_name, as_client=None):
         """Set up configs and logging.
 
         Args:
             config_file: path to config file
             log_name: path to log file
             sheet_name: key from config that corresponds to a Google Sheet
+            as_client: ArchivesSpace client shared with other reports. Defaults to a new client of `as_client_class`.
         """
         current_path = Path(__file__).parents[1].resolve()
         self.config_file = Path(current_path, "local_settings.cfg")
         self.config = ConfigParser()
         self.config.read(self.config_file)
-        self.as_client = ArchivesSpaceClient(
-            self.config["ArchivesSpace"]["baseurl"],
-            self.config["ArchivesSpace"]["username"],
-            self.config["ArchivesSpace"]["password"],
+        self.as_client = as_client or self.as_client_class.from_config(
+            self.config["ArchivesSpace"]
         )
         self.google_access_token = None
         self.google_refresh_token = self.config["Google Sheets"]["refresh_token"]
         self.google_client_id = self.config["Google Sheets"]["client_id"]
         self.client_secret = self.config["Google Sheets"]["client_secret"]
+        self.output_format = self.config.get("CSV", "format", fallback="csv")
 
-    def run(self, google=False):
+    def run(self, google=False, diff=False):
+        if not google:
+            get_sink(self.output_format)
         start_time = datetime.now()
-        report = self.create_report(google=google)
+        report = self.create_report(google=google, diff=diff)
         end_time = datetime.now()
         msg_duration = f"Start: {start_time}. Finished: {end_time} (duration: {end_time - start_time})"
         msg = f"{report} {msg_duration}"
@@ -54,37 +67,50 @@ class BaseAsCron(object):
         """
         return [row_data.get(field) for field in self.fields]
 
-    def write_data_to_google_sheet(self, sheet_data, sheet_id, data_range):
-        """Write data to a Google Sheet.
+    def write_data_to_google_sheet(self, sheet_data, sheet_id, data_range, diff=False):
+        """Write data to a Google Sheet, replacing the range's contents in one request.
+
+        In diff mode only rows whose cells differ from the sheet (matched on the
+        `uri` column) are written. The whole range is replaced if the sheet is
+        empty or its header has changed.
 
         Args:
             sheet_data (list): list of lists (rows)
             sheet_id: Google Sheet ID
             data_range: the A1 notation of a range for a logical table of data
+            diff (bool): only send changed cell ranges
         """
-        data_sheet = DataSheet(
-            self.google_access_token,
-            self.google_refresh_token,
-            self.google_client_id,
-            self.client_secret,
-            sheet_id,
-            data_range,
-        )
-        data_sheet.clear_sheet()
-        data_sheet.append_sheet(sheet_data)
+        # Imported here so runs without Google Sheets never load the Google API client.
+        from .google_sheets_client import DataSheet
+
+        with self.sheets_lock:
+            data_sheet = DataSheet(
+                self.google_access_token,
+                self.google_refresh_token,
+                self.google_client_id,
+                self.client_secret,
+                sheet_id,
+                data_range,
+            )
+            if diff:
+                counts = data_sheet.update_sheet_diff(sheet_data, key_field="uri")
+                if counts is not None:
+                    return f"Updated https://docs.google.com/spreadsheets/d/{sheet_id} ({data_range}): {counts['inserted']} rows inserted, {counts['changed']} changed, {counts['deleted']} deleted "
+            data_sheet.replace_sheet(sheet_data)
         return f"Posted {len(sheet_data)} rows to https://docs.google.com/spreadsheets/d/{sheet_id} "
 
-    def write_data_to_csv(self, sheet_data, filepath):
-        """Write data to a CSV file.
+    def write_data_to_file(self, sheet_data, filepath, fields=None):
+        """Write data to a file in the output format.
 
         Args:
-            sheet_data (list): list of lists (rows)
-            filepath (Path obj or str): Path object or string of CSV filepath
+            sheet_data (iterable): lists (rows), e.g., streamed from ReportTable.rows
+            filepath (Path obj or str): filepath; its suffix is replaced with the format's suffix
+            fields (list, optional): Field objects giving the column types (see ReportTable.schema)
         """
-        with open(filepath, "w") as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerows(sheet_data)
-        return f"Wrote {len(sheet_data)} rows to {filepath}"
+        sink_class = get_sink(self.output_format)
+        filepath = Path(filepath).with_suffix(sink_class.suffix)
+        row_count = sink_class(filepath, fields).write(sheet_data)
+        return f"Wrote {row_count} rows to {filepath}"
 
-    def create_report(self):
+    def create_report(self, google=False, diff=False):
         raise NotImplementedError("You must implement a `create_report` method")
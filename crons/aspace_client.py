@@ -1,12 +1,103 @@
+import threading
+from collections import OrderedDict
+
 from asnake.aspace import ASpace
 from asnake.utils import get_note_text
 
+from .rate_limiter import RateLimiter, ThrottledAdapter
+
+
+class JsonCache(object):
+    """A thread-safe cache of JSON responses by URI, bounded to `max_size` entries.
+
+    When the cache is full, the least recently used entry is dropped.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, uri):
+        """Return the cached JSON for a URI, or None if it is not cached."""
+        with self.lock:
+            if uri not in self.entries:
+                return None
+            self.entries.move_to_end(uri)
+            return self.entries[uri]
+
+    def set(self, uri, response_json):
+        with self.lock:
+            self.entries[uri] = response_json
+            self.entries.move_to_end(uri)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
 
 class ArchivesSpaceClient:
-    """Handles communication with ArchivesSpace."""
+    """Handles communication with ArchivesSpace.
+
+    The client can be shared between threads. If a RateLimiter is given, all
+    requests through the client are throttled by it, and failed GET requests
+    are retried up to `max_retries` times. If `cache_resources` is set, the
+    `resource_fields` of resources yielded by `all_resources` are added to the
+    JSON cache, so `get_cached_json_response` does not fetch them again.
+    """
 
-    def __init__(self, baseurl, username, password):
+    json_cache_size = 100000
+    resource_fields = ("jsonmodel_type", "uri", "id_0", "title")
+
+    def __init__(self, baseurl, username, password, rate_limiter=None, max_retries=0):
         self.aspace = ASpace(baseurl=baseurl, username=username, password=password)
+        self.rate_limiter = rate_limiter
+        if rate_limiter or max_retries:
+            self.aspace.client.session.mount(
+                baseurl,
+                ThrottledAdapter(rate_limiter, retries=max_retries, pool_maxsize=20),
+            )
+        self.json_cache = JsonCache(self.json_cache_size)
+        self.cache_resources = False
+
+    @classmethod
+    def from_config(cls, config_section, **kwargs):
+        """Create a client from a config section.
+
+        Besides baseurl, username and password, the section can set throttling:
+
+        requests_per_second: 5
+        min_requests_per_second: 1
+        max_requests_per_second: 20
+        target_latency: 2
+        max_retries: 3
+
+        Args:
+            config_section (configparser.SectionProxy): e.g., config["ArchivesSpace"]
+            kwargs: other arguments for the client class
+        """
+        rate = config_section.getfloat("requests_per_second", fallback=None)
+        rate_limiter = None
+        if rate:
+            rate_limiter = RateLimiter(
+                rate,
+                min_rate=config_section.getfloat(
+                    "min_requests_per_second", fallback=None
+                ),
+                max_rate=config_section.getfloat(
+                    "max_requests_per_second", fallback=None
+                ),
+                target_latency=config_section.getfloat("target_latency", fallback=2.0),
+            )
+        return cls(
+            config_section["baseurl"],
+            config_section["username"],
+            config_section["password"],
+            rate_limiter=rate_limiter,
+            max_retries=config_section.getint("max_retries", fallback=0),
+            **kwargs,
+        )
 
     def all_resources(self):
         """Get data about resources from all repos in AS.
@@ -16,7 +107,15 @@ class ArchivesSpaceClient:
         """
         for repo in self.aspace.repositories:
             for resource in repo.resources:
-                yield resource.json()
+                yield self.cache_resource(resource.json())
+
+    def cache_resource(self, resource_json):
+        """Add a resource's `resource_fields` to the JSON cache if `cache_resources` is set, returning the resource."""
+        if self.cache_resources:
+            self.json_cache.set(
+                resource_json["uri"], select_fields(resource_json, self.resource_fields)
+            )
+        return resource_json
 
     def accessions_from_repository(self, repo_id):
         """Get data about resources from a repository in AS.
@@ -83,8 +182,44 @@ class ArchivesSpaceClient:
         response = self.aspace.client.get(uri)
         return response.json()
 
+    def get_cached_json_response(self, uri, fields=None):
+        """Get JSON response for ASpace get request, reusing earlier responses.
+
+        The cache is shared by everything using this client, so records fetched
+        by one report are not requested again by another.
+
+        Args:
+            uri (str): ASpace URI
+            fields (tuple, optional): only cache and return these fields of the
+                response (e.g., `resource_fields`). Callers must ask for the
+                same fields for a URI.
+        """
+        response_json = self.json_cache.get(uri)
+        if response_json is None:
+            response_json = self.get_json_response(uri)
+            if fields:
+                response_json = select_fields(response_json, fields)
+            self.json_cache.set(uri, response_json)
+        return response_json
+
+    def record_ids(self, uri):
+        """Get the IDs of all records at an ASpace URI.
+
+        Args:
+            uri (str): ASpace URI of a record type (e.g., /repositories/2/resources)
+
+        Returns:
+            list: record IDs
+        """
+        return self.aspace.client.get(uri, params={"all_ids": True}).json()
+
     def published_resources(self, repo_id):
         for resource in self.aspace.repositories(repo_id).resources:
             if resource.publish and not resource.suppressed:
                 if resource.json().get("ead_location"):
                     yield resource
+
+
+def select_fields(record_json, fields):
+    """Return the given fields of a JSON record, skipping any it does not have."""
+    return {field: record_json[field] for field in fields if field in record_json}
@@ -0,0 +1,243 @@
+import asyncio
+import weakref
+
+from asnake.aspace import ASpace
+from asnake.jsonmodel import wrap_json_object
+
+from .aspace_client import ArchivesSpaceClient, JsonCache
+from .rate_limiter import ThrottledAdapter
+
+AGENT_TYPES = ["people", "corporate_entities", "families", "software"]
+
+
+class AsyncArchivesSpaceClient:
+    """Asyncio counterpart of ArchivesSpaceClient for fetching many records at once.
+
+    Requests use the same authenticated ArchivesSnake session as
+    ArchivesSpaceClient, with a keep-alive connection pool sized to the
+    concurrency limit. Blocking requests run in worker threads, and a semaphore
+    keeps at most `concurrency` of them in flight.
+    """
+
+    def __init__(
+        self,
+        baseurl,
+        username,
+        password,
+        concurrency=8,
+        rate_limiter=None,
+        max_retries=0,
+    ):
+        """Authenticate with ArchivesSpace and set up the connection pool.
+
+        Args:
+            baseurl (str): ArchivesSpace API URL
+            username (str): ArchivesSpace username
+            password (str): ArchivesSpace password
+            concurrency (int): maximum number of requests in flight
+            rate_limiter (RateLimiter, optional): throttle shared by all requests
+            max_retries (int): times to retry a failed GET request
+        """
+        self.aspace = ASpace(baseurl=baseurl, username=username, password=password)
+        self.rate_limiter = rate_limiter
+        self.aspace.client.session.mount(
+            baseurl,
+            ThrottledAdapter(
+                rate_limiter, retries=max_retries, pool_maxsize=concurrency
+            ),
+        )
+        self.concurrency = concurrency
+        self.semaphores = weakref.WeakKeyDictionary()
+
+    def semaphore(self):
+        """Return the concurrency semaphore for the running event loop."""
+        loop = asyncio.get_running_loop()
+        if loop not in self.semaphores:
+            self.semaphores[loop] = asyncio.Semaphore(self.concurrency)
+        return self.semaphores[loop]
+
+    async def get_json_response(self, uri, params=None):
+        """Get JSON response for ASpace get request.
+
+        Args:
+            uri (str): ASpace URI
+            params (dict, optional): query parameters
+        """
+        async with self.semaphore():
+            response = await asyncio.to_thread(
+                self.aspace.client.get, uri, params=params
+            )
+        return response.json()
+
+    async def get_many(self, uris):
+        """Get JSON responses for many URIs concurrently.
+
+        Only a bounded number of requests is scheduled at a time, so memory use
+        does not grow with the number of URIs.
+
+        Args:
+            uris (iterable): ASpace URIs
+
+        Yields:
+            dict: JSON response, in order of completion
+        """
+        uris = iter(uris)
+        pending = set()
+        try:
+            while True:
+                while len(pending) < self.concurrency * 2:
+                    uri = next(uris, None)
+                    if uri is None:
+                        break
+                    pending.add(asyncio.ensure_future(self.get_json_response(uri)))
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def record_uris(self, uri):
+        """Get URIs of all records at a route (e.g., /repositories/2/resources).
+
+        Args:
+            uri (str): ASpace URI of a record list
+        """
+        record_ids = await self.get_json_response(uri, params={"all_ids": True})
+        return [f"{uri}/{record_id}" for record_id in record_ids]
+
+    async def all_resources(self):
+        """Get data about resources from all repos in AS.
+
+        Yields:
+          dict: Full JSON of AS resource
+        """
+        repositories = await self.get_json_response("/repositories")
+        uri_lists = await asyncio.gather(
+            *(self.record_uris(f"{repo['uri']}/resources") for repo in repositories)
+        )
+        async for resource in self.get_many(u for uris in uri_lists for u in uris):
+            yield resource
+
+    async def accessions_from_repository(self, repo_id):
+        """Get data about accessions from a repository in AS.
+
+        Args:
+            repo_id (int): ASpace repository ID (e.g., 2)
+
+        Yields:
+          dict: Full JSON of AS accession
+        """
+        uris = await self.record_uris(f"/repositories/{repo_id}/accessions")
+        async for accession in self.get_many(uris):
+            yield accession
+
+    async def all_agents(self):
+        """Get data about agents of all types in AS.
+
+        Yields:
+          dict: Full JSON of AS agent
+        """
+        uri_lists = await asyncio.gather(
+            *(self.record_uris(f"/agents/{agent_type}") for agent_type in AGENT_TYPES)
+        )
+        async for agent in self.get_many(u for uris in uri_lists for u in uris):
+            yield agent
+
+    async def all_subjects(self):
+        """Get data about subjects in AS.
+
+        Yields:
+          dict: Full JSON of AS subject
+        """
+        uris = await self.record_uris("/subjects")
+        async for subject in self.get_many(uris):
+            yield subject
+
+    async def published_resources(self, repo_id):
+        """Get published, unsuppressed resources with an EAD location from a repository.
+
+        Args:
+            repo_id (int): ASpace repository ID (e.g., 2)
+
+        Yields:
+          dict: Full JSON of AS resource
+        """
+        uris = await self.record_uris(f"/repositories/{repo_id}/resources")
+        async for resource in self.get_many(uris):
+            if resource.get("publish") and not resource.get("suppressed"):
+                if resource.get("ead_location"):
+                    yield resource
+
+
+def iterate(async_iterable):
+    """Iterate over an async iterable from synchronous code.
+
+    The iterable runs on its own event loop. Requests already scheduled keep
+    running in worker threads while the caller handles each item.
+
+    Args:
+        async_iterable: async generator (e.g., AsyncArchivesSpaceClient.all_resources())
+    """
+    loop = asyncio.new_event_loop()
+    iterator = async_iterable.__aiter__()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(iterator.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(iterator.aclose())
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.run_until_complete(loop.shutdown_default_executor())
+        loop.close()
+
+
+class SyncArchivesSpaceClient(ArchivesSpaceClient):
+    """ArchivesSpaceClient that fetches records concurrently through AsyncArchivesSpaceClient.
+
+    It has the same interface as ArchivesSpaceClient, so a cron can opt in by
+    setting `as_client_class = SyncArchivesSpaceClient`. The reports use it when
+    `concurrent_requests` is set in the [ArchivesSpace] config section (see
+    ReportRunner.client_from_config). Records are yielded in order of completion
+    rather than in ArchivesSpace order.
+    """
+
+    def __init__(
+        self,
+        baseurl,
+        username,
+        password,
+        rate_limiter=None,
+        max_retries=0,
+        concurrency=8,
+    ):
+        self.async_client = AsyncArchivesSpaceClient(
+            baseurl, username, password, concurrency, rate_limiter, max_retries
+        )
+        self.rate_limiter = rate_limiter
+        self.aspace = self.async_client.aspace
+        self.json_cache = JsonCache(self.json_cache_size)
+        self.cache_resources = False
+
+    def all_resources(self):
+        for resource in iterate(self.async_client.all_resources()):
+            yield self.cache_resource(resource)
+
+    def accessions_from_repository(self, repo_id):
+        yield from iterate(self.async_client.accessions_from_repository(repo_id))
+
+    def all_agents(self):
+        yield from iterate(self.async_client.all_agents())
+
+    def all_subjects(self):
+        yield from iterate(self.async_client.all_subjects())
+
+    def published_resources(self, repo_id):
+        for resource in iterate(self.async_client.published_resources(repo_id)):
+            yield wrap_json_object(resource, self.aspace.client)
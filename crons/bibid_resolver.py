@@ -0,0 +1,90 @@
+import threading
+
+
+def finding_aid_bibid(resource):
+    """Return the bibid a finding aid is exported and indexed as.
+
+    Args:
+        resource (dict): ASpace resource JSON
+    """
+    if resource.get("id_2"):
+        bibid = f"{resource['id_0']}-{resource.get('id_1', '')}-{resource['id_2']}"
+    elif resource.get("id_1"):
+        bibid = f"{resource['id_0']}-{resource['id_1']}"
+    else:
+        bibid = f"{resource['id_0']}"
+    if bibid.isnumeric() or bibid.startswith("in"):
+        bibid = f"cul-{bibid}"
+    return bibid
+
+
+def catalog_bibid(resource):
+    """Return the catalog bibid of a resource, or False if it has none.
+
+    Args:
+        resource (dict): ASpace resource JSON
+    """
+    if resource.get("id_0", "").isnumeric():
+        return resource["id_0"]
+    return resource.get("user_defined", {}).get("integer_1") or False
+
+
+class BibidResolver(object):
+    """Resolves bibids for many resources at once.
+
+    Full records are fetched from the database in batches with one `id_set`
+    request each, rather than one GET per resource, so their publish state and
+    titles are current. Bibids are cached by resource URI.
+    """
+
+    def __init__(self, as_client, bibid_func=finding_aid_bibid, batch_size=100):
+        """Set up the resolver.
+
+        Args:
+            as_client (ArchivesSpaceClient): ArchivesSpace client instance
+            bibid_func (callable): builds a bibid from resource JSON (finding_aid_bibid or catalog_bibid)
+            batch_size (int): resources per request (at most the server's maximum page size)
+        """
+        self.as_client = as_client
+        self.bibid_func = bibid_func
+        self.batch_size = batch_size
+        self.bibids = {}
+        self.lock = threading.Lock()
+
+    def resources(self, repo_id, resource_ids):
+        """Get full JSON of resources in batches, caching their bibids.
+
+        Resources deleted since their IDs were listed are skipped.
+
+        Args:
+            repo_id (int): ASpace repository ID (e.g., 2)
+            resource_ids (list): ASpace resource IDs
+
+        Yields:
+            dict: ASpace resource JSON, in the order of resource_ids
+        """
+        resource_ids = list(resource_ids)
+        for start in range(0, len(resource_ids), self.batch_size):
+            end = start + self.batch_size
+            batch = resource_ids[start:end]
+            response = self.as_client.aspace.client.get(
+                f"/repositories/{repo_id}/resources", params={"id_set[]": batch}
+            )
+            response.raise_for_status()
+            records = {record["uri"]: record for record in response.json()}
+            for resource_id in batch:
+                record = records.get(f"/repositories/{repo_id}/resources/{resource_id}")
+                if record is not None:
+                    self.bibid(record)
+                    yield record
+
+    def bibid(self, resource):
+        """Return the bibid of a resource, from the cache if it has been resolved.
+
+        Args:
+            resource (dict): ASpace resource JSON
+        """
+        with self.lock:
+            if resource["uri"] not in self.bibids:
+                self.bibids[resource["uri"]] = self.bibid_func(resource)
+            return self.bibids[resource["uri"]]
@@ -0,0 +1,116 @@
+import json
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+
+class CheckpointJournal(object):
+    """Append-only JSON Lines journal of the stages finished in one export run.
+
+    Each line records one stage (e.g., ead, pdf, index) finished for one
+    resource, with its duration in seconds. The first line records the
+    modified-since timestamp of the run, so a resumed run works through the
+    same resources, and the last line of a completed run is a finish event.
+    """
+
+    def __init__(self, path):
+        """Load an existing journal.
+
+        Args:
+            path (Path obj or str): journal file
+        """
+        self.path = Path(path)
+        self.timestamp = None
+        self.finished = False
+        self.stages = set()
+        self.bibids = {}
+        self.durations = defaultdict(float)
+        self.lock = threading.Lock()
+        with open(self.path) as journal_file:
+            for line in journal_file:
+                if line.strip():
+                    self.load_entry(json.loads(line))
+
+    @classmethod
+    def start(cls, directory, timestamp):
+        """Create a journal for a new run.
+
+        Args:
+            directory (Path obj or str): directory holding journals
+            timestamp (int): modified-since timestamp of the run
+        """
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        path = Path(directory, f"{datetime.now().strftime('%Y_%m_%d_%H%M%S')}.jsonl")
+        with open(path, "w") as journal_file:
+            journal_file.write(json.dumps({"event": "start", "timestamp": timestamp}))
+            journal_file.write("\n")
+        return cls(path)
+
+    @classmethod
+    def latest_unfinished(cls, directory):
+        """Return the journal of the most recent run if it did not finish.
+
+        Args:
+            directory (Path obj or str): directory holding journals
+        """
+        paths = sorted(Path(directory).glob("*.jsonl"))
+        if paths:
+            journal = cls(paths[-1])
+            if not journal.finished:
+                return journal
+        return None
+
+    def load_entry(self, entry):
+        if entry.get("event") == "start":
+            self.timestamp = entry["timestamp"]
+        elif entry.get("event") == "finish":
+            self.finished = True
+        else:
+            self.stages.add((entry["resource"], entry["stage"]))
+            self.durations[entry["stage"]] += entry["duration"]
+            if entry.get("bibid"):
+                self.bibids[entry["resource"]] = entry["bibid"]
+
+    def append(self, entry):
+        """Write an entry to disk before returning, so it survives a crash."""
+        with self.lock:
+            with open(self.path, "a") as journal_file:
+                journal_file.write(f"{json.dumps(entry)}\n")
+                journal_file.flush()
+                os.fsync(journal_file.fileno())
+            self.load_entry(entry)
+
+    def record(self, resource_uri, stage, duration, bibid=None):
+        """Record that a stage finished for a resource.
+
+        Args:
+            resource_uri (str): ASpace resource URI
+            stage (str): ead, pdf or index
+            duration (float): seconds the stage took
+            bibid (str, optional): bibid the resource was exported as
+        """
+        entry = {
+            "resource": resource_uri,
+            "stage": stage,
+            "duration": round(duration, 3),
+            "time": datetime.now().isoformat(),
+        }
+        if bibid:
+            entry["bibid"] = bibid
+        self.append(entry)
+
+    def completed(self, resource_uri, stage):
+        """Return True if a stage has already finished for a resource."""
+        return (resource_uri, stage) in self.stages
+
+    def finish(self):
+        """Mark the run as finished so it is not resumed."""
+        self.append({"event": "finish", "time": datetime.now().isoformat()})
+
+    def summary(self):
+        """Return total seconds spent in each stage, e.g., for logging."""
+        return ", ".join(
+            f"{stage}: {duration:.1f}s" for stage, duration in self.durations.items()
+        )
@@ -0,0 +1,272 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+from .report_sinks import SINKS
+
+CONFIG_FILE = Path(Path(__file__).parents[1].resolve(), "local_settings.cfg")
+
+
+class Job(object):
+    """A cron job run from the command line.
+
+    Subclasses implement `run` and `dry_run`. They import the job's module
+    when called, so the command line starts without loading every job's
+    dependencies (see import_time).
+    """
+
+    def __init__(self, args):
+        """Set up the job.
+
+        Args:
+            args (argparse.Namespace): parsed command line arguments
+        """
+        self.args = args
+
+    def run(self):
+        """Run the job, returning its result (e.g., report messages), if any."""
+        raise NotImplementedError("You must implement a `run` method")
+
+    def dry_run(self):
+        """Return an estimate of the job's work (e.g., record and request counts) without doing it."""
+        raise NotImplementedError("You must implement a `dry_run` method")
+
+
+class ReportsJob(Job):
+    def run(self):
+        from .report_runner import ReportRunner
+
+        return ReportRunner(output_format=self.args.format).run(
+            self.args.google_sheets, self.args.diff
+        )
+
+    def dry_run(self):
+        from .report_runner import ReportRunner
+
+        return ReportRunner().dry_run()
+
+
+class AcfaJob(Job):
+    def updater(self):
+        from .acfa_updater import UpdateAllInstances
+
+        return UpdateAllInstances(self.args.parent_cache, self.args.sharded)
+
+    def run(self):
+        self.updater().all_repos(
+            self.args.api_key, self.args.resume, self.args.marc_file, self.args.gc
+        )
+
+    def dry_run(self):
+        return self.updater().dry_run(
+            self.args.api_key, self.args.marc_file, self.args.gc
+        )
+
+
+class VoyagerJob(Job):
+    def run(self):
+        from .voyager_updater import UpdateAllInstances
+
+        UpdateAllInstances().all_repos(self.args.marc_file)
+
+    def dry_run(self):
+        from .voyager_updater import UpdateAllInstances
+
+        return UpdateAllInstances().dry_run()
+
+
+class DailyReportJob(Job):
+    def run(self):
+        from .daily_report import DailyReport
+
+        return DailyReport().run()
+
+    def dry_run(self):
+        from .daily_report import DailyReport
+
+        return DailyReport().dry_run()
+
+
+class FindingAidListsJob(Job):
+    def run(self):
+        from .fa_list_generator import FindingAidLists
+
+        if self.args.incremental:
+            FindingAidLists().update_lists()
+        else:
+            FindingAidLists().create_all_lists()
+
+    def dry_run(self):
+        from .fa_list_generator import FindingAidLists
+
+        return FindingAidLists().dry_run(self.args.incremental)
+
+
+class DigestJob(Job):
+    def run(self):
+        from .digester import Digester
+
+        Digester(CONFIG_FILE, self.args.test).run()
+
+    def dry_run(self):
+        from .digester import Digester
+
+        return Digester(CONFIG_FILE, self.args.test).dry_run()
+
+
+JOBS = {
+    "reports": ReportsJob,
+    "acfa": AcfaJob,
+    "voyager": VoyagerJob,
+    "daily-report": DailyReportJob,
+    "fa-lists": FindingAidListsJob,
+    "digest": DigestJob,
+}
+
+
+def run_job(name, args):
+    """Run a job, or dry-run it with --dry-run, and time it.
+
+    Errors are caught so that other jobs keep running. A dry run only logs to
+    stderr, so it creates no log files.
+
+    Args:
+        name (str): job name (a key of JOBS)
+        args (argparse.Namespace): parsed command line arguments
+
+    Returns:
+        dict: job name, status (ok or failed), duration in seconds, and the
+            job's result or error
+    """
+    summary = {"job": name, "dry_run": args.dry_run}
+    if args.dry_run:
+        logging.basicConfig(
+            format="%(asctime)s %(message)s",
+            level=logging.INFO,
+            handlers=[logging.StreamHandler()],
+        )
+    start_time = time.monotonic()
+    try:
+        job = JOBS[name](args)
+        summary["result"] = job.dry_run() if args.dry_run else job.run()
+        summary["status"] = "ok"
+    except Exception as e:
+        summary["error"] = str(e)
+        summary["status"] = "failed"
+    summary["seconds"] = round(time.monotonic() - start_time, 3)
+    return summary
+
+
+def run_job_process(name, args):
+    """Run a job (see run_job) in a new process, returning its summary.
+
+    Jobs log through the root logger, which is configured once per process,
+    so each job needs its own process to write its own log file. Processes
+    are started with forkserver (spawn where it is unavailable), since other
+    jobs' threads are running when they start.
+    """
+    start_method = (
+        "forkserver"
+        if "forkserver" in multiprocessing.get_all_start_methods()
+        else "spawn"
+    )
+    with ProcessPoolExecutor(
+        max_workers=1, mp_context=multiprocessing.get_context(start_method)
+    ) as executor:
+        return executor.submit(run_job, name, args).result()
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        prog="crons",
+        description="Runs ArchivesSpace cron jobs, printing a JSON timing summary for each job",
+    )
+    parser.add_argument("job_names", nargs="+", choices=JOBS, metavar="job")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of jobs to run in parallel (default 1)",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="List what each job would process and estimate its requests, without exporting anything",
+    )
+    reports = parser.add_argument_group("reports")
+    reports.add_argument("--google_sheets", action="store_true")
+    reports.add_argument(
+        "--diff",
+        action="store_true",
+        help="Only write rows that changed since the last Google Sheets update",
+    )
+    reports.add_argument(
+        "--format",
+        choices=SINKS,
+        help="Output format for reports not sent to Google Sheets (overrides [CSV] format)",
+    )
+    acfa = parser.add_argument_group("acfa and voyager")
+    acfa.add_argument("--api_key", help="API key for finding aids API")
+    acfa.add_argument("--parent_cache", help="Parent directory of EAD and PDF caches")
+    acfa.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume the last export if it did not finish",
+    )
+    acfa.add_argument(
+        "--sharded",
+        action="store_true",
+        help="Write cached files into hashed subdirectories",
+    )
+    acfa.add_argument(
+        "--marc_file",
+        help="File to write MARC records for the Voyager import to",
+    )
+    acfa.add_argument(
+        "--gc",
+        action="store_true",
+        help="Remove cached finding aids of resources that are no longer published (acfa only)",
+    )
+    fa_lists = parser.add_argument_group("fa-lists")
+    fa_lists.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only apply changes since the last run (a full crawl if there is no index yet)",
+    )
+    digest = parser.add_argument_group("digest")
+    digest.add_argument(
+        "--test", action="store_true", help="Use the digester test sheet"
+    )
+    return parser
+
+
+def main(argv=None):
+    """Run the selected jobs, printing a JSON summary line as each is reported.
+
+    Each job runs in its own process (see run_job_process), so it sets up its
+    own logging. Summaries are printed in the order the jobs were given.
+
+    Returns:
+        int: exit status; 1 if any job failed
+    """
+    parser = get_parser()
+    args = parser.parse_args(argv)
+    job_names = list(dict.fromkeys(args.job_names))
+    if "acfa" in job_names and not (args.api_key and args.parent_cache):
+        parser.error("acfa requires --api_key and --parent_cache")
+    if {"acfa", "voyager"} <= set(job_names) and args.marc_file:
+        parser.error("acfa already exports MARC to --marc_file; run voyager separately")
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    failed = False
+    with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        futures = [executor.submit(run_job_process, name, args) for name in job_names]
+        for future in futures:
+            summary = future.result()
+            failed = failed or summary["status"] == "failed"
+            print(json.dumps(summary, default=str), flush=True)
+    return 1 if failed else 0
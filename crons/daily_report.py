@@ -1,17 +1,26 @@
+import csv
 import email
+import gzip
+import io
 import logging
 import smtplib
+from concurrent.futures import ThreadPoolExecutor
 from configparser import ConfigParser
-from datetime import datetime
+from datetime import datetime, timezone
 from pathlib import Path
 
 from .aspace_client import ArchivesSpaceClient
-from .helpers import yesterday_utc
+from .helpers import page_count, sum_counts, yesterday_utc
+
+REPORT_FIELDS = ["repo", "title", "id_0", "published", "mtime"]
+SEARCH_FIELDS = ["title", "identifier", "publish", "system_mtime"]
 
 
 class DailyReport(object):
     """Generates and sends a daily report of updated ArchivesSpace resource records."""
 
+    max_workers = 4
+
     def __init__(self):
         """Initializes the DailyReport class.
 
@@ -26,50 +35,80 @@ class DailyReport(object):
             format="%(asctime)s %(message)s",
             level=logging.INFO,
             handlers=[
-                logging.FileHandler(log_file),
+                logging.FileHandler(log_file, delay=True),
                 logging.StreamHandler(),
             ],
         )
         config_file = Path(current_path, "as_export.cfg")
         self.config = ConfigParser()
         self.config.read(config_file)
-        self.as_client = ArchivesSpaceClient(
-            self.config["CUL"]["baseurl"],
-            self.config["CUL"]["username"],
-            self.config["CUL"]["password"],
-        )
+        self.as_client = ArchivesSpaceClient.from_config(self.config["CUL"])
         self.email_from = self.config["CUL"]["email_from"]
         self.email_to = self.config["CUL"]["email_to"]
         self.email_server = self.config["CUL"]["email_server"]
+        self.inline_limit = self.config.getint(
+            "CUL", "daily_report_inline_limit", fallback=500
+        )
 
     def run(self):
         """Executes the daily report generation and sending process.
 
         Fetches updated resource records from ArchivesSpace for each published
-        repository since 24 hours ago, constructs an email body with the report,
-        and then sends the email.
+        repository since 24 hours ago, renders the report, and then sends the
+        email. Records beyond the inline limit are attached as a gzipped CSV.
+
+        Repositories are fetched concurrently and rendered in ArchivesSpace
+        order once all have finished, so the report reads the same every day.
+        Errors are logged and raised, so the run is reported as failed.
+
+        Returns:
+            str: number of updated resource records reported
         """
         try:
             timestamp = yesterday_utc()
             record_count = 0
-            email_body = f"The following records have been updated since {datetime.fromtimestamp(timestamp).isoformat()}:\n\n"
-            for repo in self.as_client.aspace.repositories:
-                if repo.publish:
-                    repository = Repository(self.as_client, repo, timestamp)
-                    repository.get_report()
-                    record_count += len(repository.published_resources)
-                    record_count += len(repository.unpublished_resources)
-                    email_body += repository.email_message
-            self.send_report_email(record_count, email_body)
+            renderer = ReportRenderer(self.inline_limit)
+            renderer.write(
+                f"The following records have been updated since {datetime.fromtimestamp(timestamp).isoformat()}:\n"
+            )
+            repositories = [
+                Repository(self.as_client, repo, timestamp)
+                for repo in self.as_client.aspace.repositories
+                if repo.publish
+            ]
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                list(executor.map(Repository.get_report, repositories))
+            for repository in repositories:
+                record_count += len(repository.published_resources)
+                record_count += len(repository.unpublished_resources)
+                repository.construct_body(renderer)
+            self.send_report_email(record_count, renderer.body(), renderer.attachment())
         except Exception as e:
             logging.error(e)
+            raise
+        return f"Sent report of {record_count} updated resource records"
+
+    def dry_run(self):
+        """Estimate the work of a report without sending it.
+
+        Returns:
+            dict: estimates for each repository (see Repository.dry_run) and their totals
+        """
+        timestamp = yesterday_utc()
+        estimates = {
+            repo.repo_code: Repository(self.as_client, repo, timestamp).dry_run()
+            for repo in self.as_client.aspace.repositories
+            if repo.publish
+        }
+        return {"repositories": estimates, **sum_counts(estimates.values())}
 
-    def send_report_email(self, record_count, email_body):
+    def send_report_email(self, record_count, email_body, attachment=None):
         """Sends the daily report email.
 
         Args:
             record_count (int): The total number of updated resource records.
             email_body (str): The body content of the email.
+            attachment (bytes, optional): Gzipped CSV of records not listed in the body.
         """
         try:
             message = email.message.EmailMessage()
@@ -77,6 +116,13 @@ class DailyReport(object):
             message["To"] = self.email_to
             message["Subject"] = f"{record_count} Resource Records Updated"
             message.set_content(email_body)
+            if attachment:
+                message.add_attachment(
+                    attachment,
+                    maintype="application",
+                    subtype="gzip",
+                    filename=ReportRenderer.attachment_name,
+                )
             server = smtplib.SMTP(self.email_server)
             server.send_message(message)
             server.quit()
@@ -84,6 +130,61 @@ class DailyReport(object):
             raise
 
 
+class ReportRenderer(object):
+    """Renders the daily report email body into a buffer.
+
+    At most `inline_limit` resource lines are listed in the body. Resources
+    past the limit are collected as rows for a gzipped CSV attachment, and the
+    body says how many were left out.
+    """
+
+    attachment_name = "updated_resources.csv.gz"
+
+    def __init__(self, inline_limit=500):
+        """Set up the buffer.
+
+        Args:
+            inline_limit (int): maximum number of resources listed in the body
+        """
+        self.inline_limit = inline_limit
+        self.buffer = io.StringIO()
+        self.inline_count = 0
+        self.overflow = []
+
+    def write(self, line=""):
+        self.buffer.write(line)
+        self.buffer.write("\n")
+
+    def add_resource(self, row):
+        """List a resource in the body, or in the attachment past the inline limit.
+
+        Args:
+            row (dict): resource with REPORT_FIELDS keys
+        """
+        if self.inline_count < self.inline_limit:
+            self.write(f"- {row['title']} ({row['id_0']})")
+            self.inline_count += 1
+        else:
+            self.overflow.append(row)
+
+    def body(self):
+        """Return the rendered body, noting any resources left for the attachment."""
+        body = self.buffer.getvalue()
+        if self.overflow:
+            body += f"\n{len(self.overflow)} more resource records are listed in the attached {self.attachment_name}.\n"
+        return body
+
+    def attachment(self):
+        """Return a gzipped CSV of the resources past the inline limit, or None."""
+        if not self.overflow:
+            return None
+        csv_buffer = io.StringIO()
+        writer = csv.DictWriter(csv_buffer, fieldnames=REPORT_FIELDS)
+        writer.writeheader()
+        writer.writerows(self.overflow)
+        return gzip.compress(csv_buffer.getvalue().encode("utf-8"))
+
+
 class Repository(object):
     """Represents an ArchivesSpace repository and handles its daily reporting.
 
@@ -91,6 +192,8 @@ class Repository(object):
     repository and constructing the part of the email body related to it.
     """
 
+    page_size = 250
+
     def __init__(self, as_client, repo, timestamp):
         """Initializes a Repository instance.
 
@@ -102,55 +205,105 @@ class Repository(object):
         self.as_client = as_client
         self.repo = repo
         self.timestamp = timestamp
-        self.email_message = ""
         self.published_resources = []
         self.unpublished_resources = []
 
     def get_report(self):
         """Generates the report for the current repository.
 
-        This method updates the lists of published and unpublished resources
-        and then constructs the email message specific to this repository.
+        This method updates the lists of published and unpublished resources.
         """
         self.get_updated_resources()
-        self.construct_body()
 
     def get_updated_resources(self):
         """Updates the lists of published and unpublished resources."""
         for resource in self.updated_resources():
-            if resource.publish:
-                self.published_resources.append(f"{resource.title} ({resource.id_0})")
+            row = {
+                "repo": self.repo.name,
+                "title": resource.get("title"),
+                "id_0": resource.get("identifier"),
+                "published": resource.get("publish", False),
+                "mtime": resource.get("system_mtime"),
+            }
+            if row["published"]:
+                self.published_resources.append(row)
             else:
-                self.unpublished_resources.append(f"{resource.title} ({resource.id_0})")
+                self.unpublished_resources.append(row)
 
-    def construct_body(self):
-        """Constructs the email message body for the current repository.
+    def construct_body(self, renderer):
+        """Renders the part of the email body for the current repository.
 
         The message includes counts of published and unpublished resources
         and lists their titles and IDs.
+
+        Args:
+            renderer (ReportRenderer): renderer for the email body
         """
+        renderer.write()
         if len(self.published_resources) + len(self.unpublished_resources) > 0:
-            self.email_message = f"{len(self.published_resources)} published resource records and {len(self.unpublished_resources)} unpublished resource records updated in {self.repo.name}:\n"
-            for resource in self.published_resources:
-                self.email_message += f"- {resource}\n"
-            for resource in self.unpublished_resources:
-                self.email_message += f"- {resource}\n"
-            self.email_message += "\n"
+            renderer.write(
+                f"{len(self.published_resources)} published resource records and {len(self.unpublished_resources)} unpublished resource records updated in {self.repo.name}:"
+            )
+            for resource in self.published_resources + self.unpublished_resources:
+                renderer.add_resource(resource)
         else:
-            self.email_message = f"0 resource records updated in {self.repo.name}\n\n"
+            renderer.write(f"0 resource records updated in {self.repo.name}")
 
     def updated_resources(self):
-        """Generates updated resource objects for the repository.
+        """Generates updated resources for the repository from the search index.
+
+        Only the title, identifier, publish and system_mtime fields are
+        requested, a page of results at a time. The index has no separate
+        id_0 field; identifier joins id_0 to id_3 with hyphens, so it is id_0
+        for single-part identifiers.
 
         Yields:
-            asnake.jsonmodel.JSONModelObject: An ArchivesSpace resource that has
-                been updated and is not suppressed.
+            dict: Fields of an ArchivesSpace resource that has been updated and
+                is not suppressed.
         """
-        resource_ids = self.as_client.aspace.client.get(
-            f"/repositories/{self.repo.id}/resources",
-            params={"all_ids": True, "modified_since": self.timestamp},
+        page = 1
+        while True:
+            results = self.search(page, self.page_size)
+            yield from results["results"]
+            if results["this_page"] >= results["last_page"]:
+                break
+            page += 1
+
+    def search(self, page, page_size):
+        """Get a page of resources updated since the timestamp from the search index.
+
+        Args:
+            page (int): page number, starting at 1
+            page_size (int): results per page
+
+        Returns:
+            dict: search results
+        """
+        modified_since = datetime.fromtimestamp(self.timestamp, timezone.utc)
+        return self.as_client.aspace.client.get(
+            f"/repositories/{self.repo.id}/search",
+            params={
+                "q": "*",
+                "type[]": "resource",
+                "filter_query[]": [
+                    f"system_mtime:[{modified_since.strftime('%Y-%m-%dT%H:%M:%SZ')} TO *]",
+                    "suppressed:false",
+                ],
+                "fields[]": SEARCH_FIELDS,
+                "sort": "title_sort asc",
+                "page": page,
+                "page_size": page_size,
+            },
         ).json()
-        for resource_id in resource_ids:
-            resource = self.repo.resources(resource_id)
-            if not resource.suppressed:
-                yield resource
+
+    def dry_run(self):
+        """Count updated resources with a one-result search.
+
+        Returns:
+            dict: updated resources and the search requests the report makes
+        """
+        count = self.search(1, 1)["total_hits"]
+        return {
+            "resources": count,
+            "requests": max(1, page_count(count, self.page_size)),
+        }
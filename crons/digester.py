@@ -24,7 +24,10 @@ class Digester(object):
             datefmt="%m/%d/%Y %I:%M:%S %p",
             format="%(asctime)s %(message)s",
             level=logging.INFO,
-            handlers=[logging.FileHandler("digester.log"), logging.StreamHandler()],
+            handlers=[
+                logging.FileHandler("digester.log", delay=True),
+                logging.StreamHandler(),
+            ],
         )
         self.garbage_day = 15  # Day of month to prune old entries from sheet
         self.google_access_token = self.config["Google Sheets"]["access_token"]
@@ -59,6 +62,17 @@ class Digester(object):
                 logging.info("• {m['value']}")
             logging.info("******************\n")
 
+    def dry_run(self):
+        """Estimate the Sheets requests of a run without reading or changing the sheet.
+
+        Returns:
+            dict: one read for the digest, plus a read, clear and append on garbage day
+        """
+        requests = 1
+        if datetime.today().day == self.garbage_day:
+            requests += 3
+        return {"sheet_requests": requests}
+
     def cleanup_datasheet(self, date_column=1, month_offset=2):
         """Prune log sheet to recent entries (by month).
 
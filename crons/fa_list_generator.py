@@ -1,114 +1,305 @@
+import gzip
 import logging
+import time
 from configparser import ConfigParser
+from html import escape
 from pathlib import Path
+from urllib.parse import quote
 
 from crons.aspace_client import ArchivesSpaceClient
-from crons.helpers import format_date
+from crons.bibid_resolver import BibidResolver
+from crons.fa_list_index import FindingAidList, FindingAidListIndex
+from crons.helpers import format_date, page_count, sum_counts, write_atomic
+
+# ASpace repositories whose finding aids are listed, and the code of each
+# repository's list. Repository 2 is split into further lists (see list_code).
+REPOSITORY_CODES = {2: "nnc-rb", 3: "nnc-a", 4: "nnc-ea", 5: "nnc-ut", 7: "nnc-ccoh"}
+LIST_CODES = ["nnc-rb", "nnc-ua", "nnc-ccoh", "nnc-a", "nnc-ea", "nnc-ut"]
+
+# Title and list item formats, bound once rather than parsed for each resource
+TITLE = "{} {}".format
+BULK_TITLE = "{} {} (bulk {})".format
+LIST_ITEM = '<li><a href="{href}">{title}</a></li>\n'.format
+
+
+def finding_aid_title(resource):
+    """Creates a finding aid title, including a formatted date.
+
+    The first date is used, followed by the first bulk date if there is more
+    than one date. Titles with dates end with a comma before the date.
+
+    Args:
+        resource (dict): ASpace resource JSON
+    """
+    title = resource["title"]
+    dates = resource.get("dates")
+    if not dates:
+        return title
+    if not title.endswith(","):
+        title = f"{title},"
+    date_string = format_date(dates[0])
+    if len(dates) > 1:
+        for date in dates:
+            if date.get("date_type") == "bulk":
+                return BULK_TITLE(title, date_string, format_date(date))
+    return TITLE(title, date_string)
+
+
+def finding_aid_titles(resources):
+    """Creates finding aid titles for a batch of resources.
+
+    Args:
+        resources (list): ASpace resource JSON
+
+    Returns:
+        list: titles, in the order of resources
+    """
+    return list(map(finding_aid_title, resources))
 
 
 class FindingAidLists(object):
+    """Writes an HTML snippet listing the finding aids of each CUL repository.
+
+    The lists are kept in an index next to the snippets (see
+    FindingAidListIndex). A full run crawls every repository; an incremental
+    run applies only the resources modified, unpublished or deleted since
+    the last run. Either way, only snippets whose content changed are
+    rewritten.
+
+    Resource titles and publish states are read from the resource records,
+    not the search index, which can lag behind them. Incremental runs also
+    look back `window_margin` seconds before the last run started, so
+    resources saved while it was running are not missed.
+    """
+
+    window_margin = 3600
+
     def __init__(self):
         current_path = Path(__file__).parents[1].resolve()
         self.config_file = Path(current_path, "local_settings.cfg")
         self.config = ConfigParser()
         self.config.read(self.config_file)
-        self.as_client = ArchivesSpaceClient(
-            self.config["ArchivesSpace"]["baseurl"],
-            self.config["ArchivesSpace"]["username"],
-            self.config["ArchivesSpace"]["password"],
-        )
+        self.as_client = ArchivesSpaceClient.from_config(self.config["ArchivesSpace"])
         self.base_path = self.config["Other"]["finding_aids_lists"]
+        self.gzip_lists = self.config.getboolean(
+            "Other", "finding_aids_lists_gzip", fallback=False
+        )
+        self.resolver = BibidResolver(self.as_client)
+        self.index = FindingAidListIndex(Path(self.base_path, ".fa_list_index.json"))
         logging.basicConfig(
             datefmt="%m/%d/%Y %I:%M:%S %p",
             format="%(asctime)s %(message)s",
             level=logging.INFO,
             handlers=[
-                logging.FileHandler("finding_aid_lists.log"),
+                logging.FileHandler("finding_aid_lists.log", delay=True),
                 logging.StreamHandler(),
             ],
         )
 
     def create_all_lists(self):
-        """Creates html snippets of finding aid lists for all CUL repositories."""
+        """Creates html snippets of finding aid lists for all CUL repositories from a full crawl."""
         logging.info("Starting process...")
         try:
-            repositories = {3: "nnc-a", 4: "nnc-ea", 5: "nnc-ut"}
-            for repo_id, repo_code in repositories.items():
-                resource_links = {}
-                for resource in self.as_client.published_resources(repo_id):
-                    title = self.construct_title(resource)
-                    resource_links[title] = self.create_resource_link(
-                        repo_code, resource.id_0, title
-                    )
-                self.create_html_snippet(resource_links, repo_code)
-            rbml_links = {}
-            ua_links = {}
-            oh_links = {}
-            for resource in self.as_client.published_resources(2):
-                title = self.construct_title(resource)
-                rbml_code = "nnc-rb"
-                ua_code = "nnc-ua"
-                oh_code = "nnc-ccoh"
-                call_number = (
-                    resource.json().get("user_defined", {}).get("string_1", "")
-                )
-                if call_number.startswith("UA"):
-                    ua_links[title] = self.create_resource_link(
-                        ua_code, resource.id_0, title
-                    )
-                elif call_number.startswith("OH"):
-                    oh_links[title] = self.create_resource_link(
-                        oh_code, resource.id_0, title
-                    )
-                else:
-                    rbml_links[title] = self.create_resource_link(
-                        rbml_code, resource.id_0, title
-                    )
-            self.create_html_snippet(rbml_links, rbml_code)
-            self.create_html_snippet(ua_links, ua_code)
-            for resource in self.as_client.published_resources(7):
-                title = self.construct_title(resource)
-                oh_links[title] = self.create_resource_link(
-                    oh_code, resource.id_0, title
-                )
-            self.create_html_snippet(oh_links, oh_code)
+            start_time = int(time.time())
+            self.index.lists = {repo_code: FindingAidList() for repo_code in LIST_CODES}
+            for repo_id in REPOSITORY_CODES:
+                self.add_repository(repo_id)
+            self.write_lists(start_time)
         except Exception as e:
             logging.error(e)
 
-    def create_resource_link(self, repo_code, bibid, title):
-        return f'<li><a href="/ead/{repo_code}/ldpd_{bibid}">{title}</a></li>'
+    def update_lists(self):
+        """Updates the lists with changes since the last run.
+
+        The first run, with no index yet, is a full crawl.
+        """
+        if self.index.timestamp is None:
+            return self.create_all_lists()
+        modified_since = self.modified_since()
+        logging.info(f"Updating lists with changes since {modified_since}...")
+        try:
+            start_time = int(time.time())
+            for repo_id in REPOSITORY_CODES:
+                self.update_repository(repo_id, modified_since)
+            self.write_lists(start_time)
+        except Exception as e:
+            logging.error(e)
 
-    def create_html_snippet(self, links_dict, repo_code):
-        """Writes an HTML unordered list to a file.
+    def add_repository(self, repo_id):
+        """Adds a repository's listed resources to the lists, a batch at a time.
 
-        links_dict (dict): finding aid titles (keys) and HTML link elements (values)
-        repo_code (str): CUL repository code (e.g., nnc-rb)
+        Resource records are fetched through the resolver, `batch_size` at a
+        time. Only the title and bibid of each listed resource are kept (in
+        the index), so a batch's records are dropped once it is added.
+
+        Args:
+            repo_id (int): ASpace repository ID (e.g., 2)
+        """
+        resource_ids = self.as_client.record_ids(f"/repositories/{repo_id}/resources")
+        batch_size = self.resolver.batch_size
+        for start in range(0, len(resource_ids), batch_size):
+            end = start + batch_size
+            records = self.resolver.resources(repo_id, resource_ids[start:end])
+            self.add_resources(repo_id, [r for r in records if self.is_listed(r)])
+
+    def modified_since(self):
+        """Return the UNIX timestamp an incremental run applies changes since.
+
+        This is `window_margin` seconds before the last run started, so
+        resources modified around then are applied again rather than missed.
         """
-        links_dict = dict(sorted(links_dict.items()))
-        with open(f"{self.base_path}/{repo_code}_fa_list.html", "w") as f:
-            f.write("<ul>\n")
-            for link in links_dict.values():
-                f.write(f"{link}\n")
-            f.write("</ul>")
+        return self.index.timestamp - self.window_margin
 
-    def construct_title(self, resource):
-        """Creates a finding aid title, including a formatted date.
+    def update_repository(self, repo_id, timestamp):
+        """Applies changes to a repository's resources since a timestamp to the lists.
 
-        resource (obj): ArchivesSnake resource object
+        Modified resource records are fetched in batches through the resolver
+        (from the database, so their titles and publish states are current)
+        and re-added, or removed if they are no longer published. Resources
+        no longer in the repository's ID listing are removed.
+
+        Args:
+            repo_id (int): ASpace repository ID (e.g., 2)
+            timestamp (int): UNIX timestamp to apply changes since (see modified_since)
+        """
+        resources_uri = f"/repositories/{repo_id}/resources"
+        modified_ids = self.as_client.aspace.client.get(
+            resources_uri, params={"all_ids": True, "modified_since": timestamp}
+        ).json()
+        listed = []
+        for record in self.resolver.resources(repo_id, modified_ids):
+            self.index.remove(record["uri"])
+            if self.is_listed(record):
+                listed.append(record)
+        self.add_resources(repo_id, listed)
+        current_uris = {
+            f"{resources_uri}/{resource_id}"
+            for resource_id in self.as_client.record_ids(resources_uri)
+        }
+        for finding_aid_list in self.index.lists.values():
+            for uri in finding_aid_list.uris():
+                if uri.startswith(f"{resources_uri}/") and uri not in current_uris:
+                    finding_aid_list.remove(uri)
+
+    def is_listed(self, resource_json):
+        """Return True if a resource is published, unsuppressed and has an EAD location."""
+        if resource_json.get("publish") and not resource_json.get("suppressed"):
+            return bool(resource_json.get("ead_location"))
+        return False
+
+    def list_code(self, repo_id, resource_json):
+        """Return the code of the list a resource goes in.
+
+        Repository 2 resources with call numbers starting with UA go in the
+        University Archives list, and those starting with OH in the Oral
+        History list.
+
+        Args:
+            repo_id (int): ASpace repository ID (e.g., 2)
+            resource_json (dict): ASpace resource
         """
-        title = resource.title if resource.title.endswith(",") else f"{resource.title},"
-        bulk_dates = []
-        if resource.dates:
-            first_date = resource.dates[0].json()
-            date_string = format_date(first_date)
-            if len(resource.dates) > 1:
-                bulk_dates = [x for x in resource.dates if x.date_type == "bulk"]
-                bulk_date_string = (
-                    format_date(bulk_dates[0].json()) if bulk_dates else None
+        if repo_id == 2:
+            call_number = resource_json.get("user_defined", {}).get("string_1", "")
+            if call_number.startswith("UA"):
+                return "nnc-ua"
+            if call_number.startswith("OH"):
+                return "nnc-ccoh"
+        return REPOSITORY_CODES[repo_id]
+
+    def add_resources(self, repo_id, resources):
+        """Adds resources to their lists.
+
+        Args:
+            repo_id (int): ASpace repository ID (e.g., 2)
+            resources (list): ASpace resource JSON
+        """
+        for resource, title in zip(resources, finding_aid_titles(resources)):
+            repo_code = self.list_code(repo_id, resource)
+            self.index.get_list(repo_code).add(resource["uri"], title, resource["id_0"])
+
+    def write_lists(self, timestamp):
+        """Writes the snippets whose content changed and saves the index.
+
+        Args:
+            timestamp (int): UNIX timestamp the lists are up to date as of
+        """
+        written = []
+        for repo_code, finding_aid_list in self.index.lists.items():
+            content = self.render_list(repo_code, finding_aid_list.items())
+            missing = not all(path.exists() for path in self.snippet_paths(repo_code))
+            if self.index.changed(repo_code, content) or missing:
+                self.create_html_snippet(content, repo_code)
+                self.index.record(repo_code, content)
+                written.append(repo_code)
+        self.index.save(timestamp)
+        logging.info(f"Wrote {len(written)} changed lists: {', '.join(written)}")
+
+    def dry_run(self, incremental=False):
+        """Estimate the work of creating the lists without writing them.
+
+        A full run lists each repository's resource IDs and fetches the
+        resources in batches. An incremental run (once there is an index) lists the
+        modified and current resource IDs and fetches modified resources in
+        batches.
+
+        Args:
+            incremental (bool): estimate an incremental run
+
+        Returns:
+            dict: resources and ArchivesSpace requests for each repository and their totals
+        """
+        estimates = {}
+        for repo_id in REPOSITORY_CODES:
+            resources_uri = f"/repositories/{repo_id}/resources"
+            if incremental and self.index.timestamp is not None:
+                count = len(
+                    self.as_client.aspace.client.get(
+                        resources_uri,
+                        params={
+                            "all_ids": True,
+                            "modified_since": self.modified_since(),
+                        },
+                    ).json()
                 )
-            if bulk_dates:
-                return f"{title} {date_string} (bulk {bulk_date_string})"
+                requests = 2 + page_count(count, self.resolver.batch_size)
             else:
-                return f"{title} {date_string}"
-        else:
-            return resource.title
+                count = len(self.as_client.record_ids(resources_uri))
+                requests = 1 + page_count(count, self.resolver.batch_size)
+            estimates[repo_id] = {"resources": count, "requests": requests}
+        return {"repositories": estimates, **sum_counts(estimates.values())}
+
+    def create_resource_link(self, repo_code, bibid, title):
+        """Returns an HTML list item linking to a finding aid, with the title and link escaped."""
+        href = f"/ead/{quote(repo_code)}/ldpd_{quote(str(bibid))}"
+        return LIST_ITEM(href=escape(href), title=escape(title, quote=False))
+
+    def render_list(self, repo_code, items):
+        """Returns an HTML unordered list linking to finding aids.
+
+        repo_code (str): CUL repository code (e.g., nnc-rb)
+        items (list): (title, bibid) tuples, in order
+        """
+        links = [self.create_resource_link(repo_code, b, t) for t, b in items]
+        return "".join(["<ul>\n", *links, "</ul>"])
+
+    def snippet_paths(self, repo_code):
+        """Returns the path of a list's HTML snippet, and of its gzipped copy if gzip_lists is set."""
+        filepath = Path(self.base_path, f"{repo_code}_fa_list.html")
+        if self.gzip_lists:
+            return [filepath, filepath.with_name(f"{filepath.name}.gz")]
+        return [filepath]
+
+    def create_html_snippet(self, content, repo_code):
+        """Writes an HTML snippet to a file, and a gzipped copy if gzip_lists is set.
+
+        Each file is written in one pass and replaced atomically, so the web
+        server never reads a partly written list.
+
+        content (str): HTML unordered list (see render_list)
+        repo_code (str): CUL repository code (e.g., nnc-rb)
+        """
+        data = content.encode("utf-8")
+        filepath, *gzip_paths = self.snippet_paths(repo_code)
+        write_atomic(filepath, data)
+        for gzip_path in gzip_paths:
+            write_atomic(gzip_path, gzip.compress(data, mtime=0))
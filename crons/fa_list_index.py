@@ -0,0 +1,141 @@
+import bisect
+import hashlib
+import json
+from pathlib import Path
+
+from .helpers import write_atomic
+
+
+class FindingAidList(object):
+    """Links to the finding aids of one list (e.g., nnc-rb), kept in title order.
+
+    Entries are keyed by resource URI, so a retitled resource replaces its old
+    entry. The order is kept in a sorted list of (title, uri) pairs that
+    entries are bisect-inserted into, so applying a change never re-sorts
+    the list.
+    """
+
+    def __init__(self, entries=None):
+        """Create a list.
+
+        Args:
+            entries (dict, optional): resource URI to (title, bibid)
+        """
+        self.entries = {}
+        self.order = []
+        for uri, (title, bibid) in (entries or {}).items():
+            self.entries[uri] = (title, bibid)
+            self.order.append((title, uri))
+        self.order.sort()
+
+    def __len__(self):
+        return len(self.order)
+
+    def add(self, uri, title, bibid):
+        """Add or replace the entry for a resource.
+
+        Args:
+            uri (str): ASpace resource URI
+            title (str): finding aid title, which the list is sorted by
+            bibid (str): bibid the finding aid is linked to
+        """
+        self.remove(uri)
+        self.entries[uri] = (title, bibid)
+        bisect.insort(self.order, (title, uri))
+
+    def remove(self, uri):
+        """Remove the entry for a resource, returning True if it was listed."""
+        if uri not in self.entries:
+            return False
+        title, _ = self.entries.pop(uri)
+        del self.order[bisect.bisect_left(self.order, (title, uri))]
+        return True
+
+    def uris(self):
+        return set(self.entries)
+
+    def items(self):
+        """Return (title, bibid) tuples in title order."""
+        return [self.entries[uri] for _, uri in self.order]
+
+
+def content_digest(content):
+    """Return the SHA-256 hex digest of a snippet."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class FindingAidListIndex(object):
+    """Persisted finding aid lists, with the time they were last updated.
+
+    The index is a JSON file holding each list's entries and the digest of
+    the snippet last written for it, so an incremental run only fetches
+    resources modified since `timestamp` and only rewrites snippets whose
+    content changed.
+
+    The file records the `version` of the index format (or of the list
+    entries, e.g., how titles are formatted) it was written with. An index
+    without the current version is not loaded, so the next run rebuilds the
+    lists from a full crawl. Bump `version` whenever the stored entries would
+    differ.
+    """
+
+    version = 1
+
+    def __init__(self, path):
+        """Load the index, or start an empty one if the file does not exist or is another version.
+
+        Args:
+            path (Path obj or str): index file
+        """
+        self.path = Path(path)
+        self.timestamp = None
+        self.lists = {}
+        self.digests = {}
+        if self.path.exists():
+            with open(self.path) as index_file:
+                data = json.load(index_file)
+            if data.get("version") != self.version:
+                return
+            self.timestamp = data["timestamp"]
+            self.digests = data["digests"]
+            self.lists = {
+                repo_code: FindingAidList(
+                    {uri: tuple(entry) for uri, entry in entries.items()}
+                )
+                for repo_code, entries in data["lists"].items()
+            }
+
+    def get_list(self, repo_code):
+        """Return a list, creating it if it is not in the index."""
+        return self.lists.setdefault(repo_code, FindingAidList())
+
+    def remove(self, uri):
+        """Remove a resource from whichever list it is in."""
+        for finding_aid_list in self.lists.values():
+            finding_aid_list.remove(uri)
+
+    def changed(self, repo_code, content):
+        """Return True if a snippet differs from the one last written for its list."""
+        return self.digests.get(repo_code) != content_digest(content)
+
+    def record(self, repo_code, content):
+        """Record the digest of a written snippet."""
+        self.digests[repo_code] = content_digest(content)
+
+    def save(self, timestamp):
+        """Write the index, replacing the file atomically.
+
+        Args:
+            timestamp (int): UNIX timestamp the lists are up to date as of
+        """
+        self.timestamp = timestamp
+        data = {
+            "version": self.version,
+            "timestamp": timestamp,
+            "digests": self.digests,
+            "lists": {
+                repo_code: finding_aid_list.entries
+                for repo_code, finding_aid_list in self.lists.items()
+            },
+        }
+        write_atomic(self.path, json.dumps(data).encode("utf-8"))
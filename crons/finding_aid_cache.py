@@ -0,0 +1,265 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from .helpers import stream_to_file
+
+CACHE_KINDS = {
+    "ead": ("ead_cache", "xml"),
+    "pdf": ("pdf_cache", "pdf"),
+}
+
+
+class FindingAidCache(object):
+    """EAD and PDF caches with a SQLite manifest of what they contain.
+
+    The manifest records the path, size, SHA-256 digest, write time, source
+    repository and resource URI of each cached file, so existence and
+    staleness checks and garbage collection never scan the cache directories.
+
+    Files are written as `<kind>_cache/as_ead_<bibid>.<ext>` by default, which
+    is where the finding aids site reads them. With `sharded`, each file goes
+    in a subdirectory named after the first two hex digits of a hash of its
+    bibid (e.g., `ead_cache/3f/as_ead_cul-123.xml`), keeping directories small.
+    """
+
+    def __init__(self, parent_cache, sharded=False):
+        """Set up the cache. The manifest is opened when it is first used.
+
+        Args:
+            parent_cache (Path obj or str): parent directory of EAD and PDF caches
+            sharded (bool): write files into hashed subdirectories
+        """
+        self.parent_cache = Path(parent_cache)
+        self.sharded = sharded
+        self.lock = threading.RLock()
+        self._connection = None
+
+    @property
+    def connection(self):
+        """Open the manifest, creating it if needed.
+
+        A new manifest is filled with any files already in the cache
+        directories (see import_existing), so nothing is created on disk until
+        the cache is used.
+        """
+        with self.lock:
+            if self._connection is not None:
+                return self._connection
+            self.parent_cache.mkdir(parents=True, exist_ok=True)
+            manifest_path = self.parent_cache / "manifest.sqlite3"
+            created = not manifest_path.exists()
+            connection = sqlite3.connect(manifest_path, check_same_thread=False)
+            connection.row_factory = sqlite3.Row
+            with connection:
+                connection.execute("""CREATE TABLE IF NOT EXISTS entries (
+                        bibid TEXT NOT NULL,
+                        kind TEXT NOT NULL,
+                        path TEXT NOT NULL,
+                        size INTEGER NOT NULL,
+                        digest TEXT NOT NULL,
+                        mtime REAL NOT NULL,
+                        repo TEXT,
+                        resource_uri TEXT,
+                        PRIMARY KEY (bibid, kind)
+                    )""")
+                connection.execute(
+                    "CREATE INDEX IF NOT EXISTS entries_repo ON entries (repo)"
+                )
+            self._connection = connection
+            if created:
+                self.import_existing()
+            return connection
+
+    def close(self):
+        with self.lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def path(self, kind, bibid):
+        """Return the path a file is written to.
+
+        Args:
+            kind (str): ead or pdf
+            bibid (str): bibid of the finding aid
+        """
+        directory, extension = CACHE_KINDS[kind]
+        filename = f"as_ead_{bibid}.{extension}"
+        if self.sharded:
+            shard = hashlib.sha1(bibid.encode("utf-8")).hexdigest()[:2]
+            return self.parent_cache / directory / shard / filename
+        return self.parent_cache / directory / filename
+
+    def write(self, kind, bibid, response, repo=None, resource_uri=None):
+        """Stream a response into the cache and record it in the manifest.
+
+        Args:
+            kind (str): ead or pdf
+            bibid (str): bibid of the finding aid
+            response (obj): requests response, requested with stream=True
+            repo (str, optional): repository code of the resource
+            resource_uri (str, optional): ASpace resource URI
+
+        Returns:
+            Path obj: path of the written file
+        """
+        filepath = self.path(kind, bibid)
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        size, digest = stream_to_file(response, filepath)
+        self.add(kind, bibid, filepath, size, digest, repo, resource_uri)
+        return filepath
+
+    def add(
+        self,
+        kind,
+        bibid,
+        filepath,
+        size,
+        digest,
+        repo=None,
+        resource_uri=None,
+        mtime=None,
+    ):
+        """Record a cached file in the manifest.
+
+        Args:
+            kind (str): ead or pdf
+            bibid (str): bibid of the finding aid
+            filepath (Path obj or str): path of the cached file
+            size (int): size of the file in bytes
+            digest (str): SHA-256 hex digest of the file
+            repo (str, optional): repository code of the resource
+            resource_uri (str, optional): ASpace resource URI
+            mtime (float, optional): UNIX timestamp the file was written. Defaults to now.
+        """
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    bibid,
+                    kind,
+                    str(filepath),
+                    size,
+                    digest,
+                    mtime or time.time(),
+                    repo,
+                    resource_uri,
+                ),
+            )
+
+    def get(self, kind, bibid):
+        """Return the manifest entry for a file as a dict, or None if it is not cached."""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT * FROM entries WHERE bibid = ? AND kind = ?", (bibid, kind)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def exists(self, kind, bibid):
+        return self.get(kind, bibid) is not None
+
+    def bibids(self, repo=None):
+        """Return the set of cached bibids, optionally only those from one repository."""
+        query = "SELECT DISTINCT bibid FROM entries"
+        params = ()
+        if repo is not None:
+            query += " WHERE repo = ?"
+            params = (repo,)
+        with self.lock:
+            return {row["bibid"] for row in self.connection.execute(query, params)}
+
+    def resource_bibids(self, repo=None):
+        """Return a dict of ASpace resource URI to cached bibid, optionally only for one repository."""
+        query = "SELECT DISTINCT resource_uri, bibid FROM entries WHERE resource_uri IS NOT NULL"
+        params = ()
+        if repo is not None:
+            query += " AND repo = ?"
+            params = (repo,)
+        with self.lock:
+            return {
+                row["resource_uri"]: row["bibid"]
+                for row in self.connection.execute(query, params)
+            }
+
+    def remove(self, bibid):
+        """Delete a finding aid's files and manifest entries.
+
+        Returns:
+            list: paths of the deleted files
+        """
+        with self.lock, self.connection:
+            rows = self.connection.execute(
+                "SELECT path FROM entries WHERE bibid = ?", (bibid,)
+            ).fetchall()
+            self.connection.execute("DELETE FROM entries WHERE bibid = ?", (bibid,))
+        paths = [Path(row["path"]) for row in rows]
+        for filepath in paths:
+            filepath.unlink(missing_ok=True)
+        return paths
+
+    def claim(self, bibids, repo):
+        """Assign entries with no repository (e.g., imported files) to a repository.
+
+        Args:
+            bibids (set): bibids of the repository's resources
+            repo (str): repository code
+        """
+        bibids = list(bibids)
+        with self.lock, self.connection:
+            for start in range(0, len(bibids), 500):
+                end = start + 500
+                batch = bibids[start:end]
+                placeholders = ", ".join("?" * len(batch))
+                self.connection.execute(
+                    f"UPDATE entries SET repo = ? WHERE repo IS NULL AND bibid IN ({placeholders})",
+                    (repo, *batch),
+                )
+
+    def garbage_collect(self, keep_bibids, repo=None):
+        """Remove cached finding aids that are no longer published.
+
+        Args:
+            keep_bibids (set): bibids of published, unsuppressed resources
+            repo (str, optional): only collect entries from this repository
+
+        Returns:
+            list: removed bibids
+        """
+        removed = sorted(self.bibids(repo) - set(keep_bibids))
+        for bibid in removed:
+            self.remove(bibid)
+        return removed
+
+    def import_existing(self):
+        """Add files already in the cache directories to the manifest.
+
+        Called when the manifest is created, so a cache written before the
+        manifest existed is tracked. Files already in the manifest are skipped.
+
+        Returns:
+            int: number of files added
+        """
+        added = 0
+        for kind, (directory, extension) in CACHE_KINDS.items():
+            for filepath in Path(self.parent_cache, directory).rglob(f"*.{extension}"):
+                bibid = filepath.stem.replace("as_ead_", "", 1)
+                if self.exists(kind, bibid):
+                    continue
+                digest = hashlib.sha256()
+                with open(filepath, "rb") as cached_file:
+                    for chunk in iter(lambda: cached_file.read(1048576), b""):
+                        digest.update(chunk)
+                stat = filepath.stat()
+                self.add(
+                    kind,
+                    bibid,
+                    filepath,
+                    stat.st_size,
+                    digest.hexdigest(),
+                    mtime=stat.st_mtime,
+                )
+                added += 1
+        return added
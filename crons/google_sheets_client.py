@@ -1,8 +1,293 @@
 import csv
+import re
+from itertools import islice
 
 import google.oauth2.credentials
 from googleapiclient.discovery import build
 
+SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
+TOKEN_URI = "https://oauth2.googleapis.com/token"
+
+# Sheets services shared across clients, keyed by OAuth client and refresh token.
+_services = {}
+
+# Text that USER_ENTERED parses as a number.
+NUMBER_PATTERN = re.compile(r"[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?")
+
+
+def get_service(access_token, refresh_token, client_id, client_secret):
+    """Return a Sheets API service shared by all clients with the same credentials.
+
+    The service is built from the discovery document bundled with
+    google-api-python-client, so no discovery request is made. Sharing the
+    credentials means the access token is refreshed once per process rather
+    than once per sheet.
+
+    Args:
+        access_token (str): OAuth 2.0 access token
+        refresh_token (str): OAuth 2.0 refresh token
+        client_id (str): OAuth 2.0 client ID
+        client_secret (str): OAuth 2.0 client secret
+
+    Returns:
+        googleapiclient.discovery.Resource: Sheets v4 service
+    """
+    key = (client_id, client_secret, refresh_token)
+    if key not in _services:
+        credentials = google.oauth2.credentials.Credentials(
+            access_token,
+            refresh_token=refresh_token,
+            token_uri=TOKEN_URI,
+            client_id=client_id,
+            client_secret=client_secret,
+            scopes=SCOPES,
+        )
+        _services[key] = build(
+            "sheets",
+            "v4",
+            credentials=credentials,
+            static_discovery=True,
+            cache_discovery=False,
+        )
+    return _services[key]
+
+
+def column_number(column_letters):
+    """Convert A1 column letters to a 1-based column number (e.g., AA -> 27)."""
+    number = 0
+    for letter in column_letters.upper():
+        number = number * 26 + ord(letter) - ord("A") + 1
+    return number
+
+
+def pad_rows(rows, width):
+    """Pad rows to a fixed width, replacing None so every cell is overwritten.
+
+    Args:
+        rows (list): list of lists (rows)
+        width (int): number of columns in the range
+    """
+    values = []
+    for row in rows:
+        cells = ["" if cell is None else cell for cell in row]
+        values.append(cells + [""] * (width - len(cells)))
+    return values
+
+
+def cell_data(value):
+    """Return the CellData that enters a value the way valueInputOption USER_ENTERED would.
+
+    Numbers and booleans keep their type, as does text that USER_ENTERED
+    parses as a number or boolean (see cell_text). Text starting with = is a
+    formula, and a leading apostrophe forces text. Empty values clear the cell.
+
+    Args:
+        value: cell value
+    """
+    if value is None or value == "":
+        return {}
+    if isinstance(value, bool):
+        return {"userEnteredValue": {"boolValue": value}}
+    if isinstance(value, (int, float)):
+        return {"userEnteredValue": {"numberValue": value}}
+    value = str(value)
+    if value.startswith("="):
+        return {"userEnteredValue": {"formulaValue": value}}
+    if value.startswith("'"):
+        return {"userEnteredValue": {"stringValue": value[1:]}}
+    if NUMBER_PATTERN.fullmatch(value):
+        return {"userEnteredValue": {"numberValue": float(value)}}
+    if value.upper() in ("TRUE", "FALSE"):
+        return {"userEnteredValue": {"boolValue": value.upper() == "TRUE"}}
+    return {"userEnteredValue": {"stringValue": value}}
+
+
+def cell_text(value, user_entered=True):
+    """Normalize a cell value so values written and read back compare equal.
+
+    Both sides of a comparison go through this function: values written as
+    USER_ENTERED input (see cell_data), and values read with valueRenderOption
+    UNFORMATTED_VALUE. Numbers, and text that USER_ENTERED parses as a number,
+    become the same canonical text, and booleans become TRUE or FALSE.
+
+    Args:
+        value: cell value
+        user_entered (bool): whether text is parsed as USER_ENTERED input; False
+            for values read from the sheet, where text is always a text cell
+    """
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return str(value).upper()
+    if isinstance(value, (int, float)):
+        number = float(value)
+        return str(int(number)) if number.is_integer() else repr(number)
+    value = str(value)
+    if not user_entered:
+        return value
+    if value.startswith("'"):
+        return value[1:]
+    if NUMBER_PATTERN.fullmatch(value):
+        return cell_text(float(value))
+    if value.upper() in ("TRUE", "FALSE"):
+        return value.upper()
+    return value
+
+
+def diff_rows(current_rows, new_rows, key_index):
+    """Work out which cells must change to turn the current rows into the new rows.
+
+    Rows are matched on the key column. Rows that still exist keep their position,
+    inserted rows take the place of deleted rows or are appended, and rows at the
+    bottom are moved up into any remaining gaps so the table stays contiguous.
+
+    Args:
+        current_rows (list): rows currently in the sheet, read with UNFORMATTED_VALUE,
+            including the header row
+        new_rows (list): rows of the new report, including the header row
+        key_index (int): index of the column identifying a row (e.g., uri)
+
+    Returns:
+        tuple: updates (list of (row index, column index, values) tuples) and
+            counts (dict of inserted, changed and deleted rows)
+    """
+    width = max(len(row) for row in new_rows + current_rows)
+    current_text = [
+        [cell_text(cell, False) for cell in row] + [""] * (width - len(row))
+        for row in current_rows
+    ]
+    new_by_key = {cell_text(row[key_index]): row for row in new_rows[1:]}
+    target = [new_rows[0]]
+    counts = {"inserted": 0, "changed": 0, "deleted": 0}
+    for row in current_text[1:]:
+        new_row = new_by_key.pop(row[key_index], None)
+        target.append(new_row)
+        if new_row is None:
+            counts["deleted"] += 1
+        elif [cell_text(cell) for cell in new_row] != row[: len(new_row)]:
+            counts["changed"] += 1
+    counts["inserted"] = len(new_by_key)
+    inserted_rows = iter(new_by_key.values())
+    for index, row in enumerate(target):
+        if row is None:
+            target[index] = next(inserted_rows, None)
+    target.extend(inserted_rows)
+    while None in target:
+        gap = target.index(None)
+        last_row = target.pop()
+        if last_row is not None and gap < len(target):
+            target[gap] = last_row
+    updates = []
+    for index, row in enumerate(target):
+        cells = pad_rows([row], width)[0]
+        row_text = [cell_text(cell) for cell in cells]
+        if index >= len(current_text):
+            updates.append((index, 0, cells))
+            continue
+        changed = [i for i in range(width) if row_text[i] != current_text[index][i]]
+        if changed:
+            first, last = changed[0], changed[-1] + 1
+            updates.append((index, first, cells[first:last]))
+    for index in range(len(target), len(current_text)):
+        updates.append((index, 0, [""] * width))
+    return updates, counts
+
+
+def split_range(data_range):
+    """Split an A1 range into tab name, first column, first row and column count.
+
+    Args:
+        data_range (str): the A1 notation of a range (e.g., rbml!A:Z or rbml!B2:AA)
+
+    Returns:
+        tuple: tab name (str), first column letters (str), 1-based first row
+            (int, 1 if the range has no row), number of columns (int)
+    """
+    tab_name, columns = data_range.rsplit("!", 1)
+    first_cell, last_cell = columns.split(":")
+    first_column = re.sub(r"[0-9]", "", first_cell)
+    last_column = re.sub(r"[0-9]", "", last_cell)
+    first_row = int(re.sub(r"[^0-9]", "", first_cell) or 1)
+    width = column_number(last_column) - column_number(first_column) + 1
+    return tab_name.strip("'"), first_column, first_row, width
+
+
+def append_rows_request(sheet_id, row_count):
+    """Return a batchUpdate request adding empty rows to the bottom of a tab's grid."""
+    return {
+        "appendDimension": {
+            "sheetId": sheet_id,
+            "dimension": "ROWS",
+            "length": row_count,
+        }
+    }
+
+
+def update_cells_request(sheet_id, row_index, column_index, rows):
+    """Return a batchUpdate request entering rows of values from a 0-based cell (see cell_data)."""
+    return {
+        "updateCells": {
+            "start": {
+                "sheetId": sheet_id,
+                "rowIndex": row_index,
+                "columnIndex": column_index,
+            },
+            "rows": [{"values": [cell_data(cell) for cell in row]} for row in rows],
+            "fields": "userEnteredValue",
+        }
+    }
+
+
+def write_requests(properties, data_range, rows, start_row=0, clear_below=False):
+    """Return batchUpdate requests that write rows into a range.
+
+    Rows are padded to the range's width, so every cell is overwritten. The
+    tab's grid is expanded first if the rows run past its last row, and with
+    clear_below, the rows of the range below the written rows are cleared.
+
+    Args:
+        properties (dict): properties of the range's tab (sheetId and gridProperties)
+        data_range (str): the A1 notation of a range (e.g., rbml!A:Z)
+        rows (list): list of lists (rows)
+        start_row (int): number of rows of the range above the first written row
+        clear_below (bool): clear the rest of the range
+
+    Returns:
+        list: requests, to be sent in one (atomic) batchUpdate
+    """
+    tab_name, first_column, first_row, width = split_range(data_range)
+    sheet_id = properties["sheetId"]
+    grid_rows = properties["gridProperties"]["rowCount"]
+    row_index = first_row - 1 + start_row
+    column_index = column_number(first_column) - 1
+    end_row_index = row_index + len(rows)
+    requests = []
+    if end_row_index > grid_rows:
+        requests.append(append_rows_request(sheet_id, end_row_index - grid_rows))
+    if rows:
+        requests.append(
+            update_cells_request(
+                sheet_id, row_index, column_index, pad_rows(rows, width)
+            )
+        )
+    if clear_below and end_row_index < grid_rows:
+        requests.append(
+            {
+                "repeatCell": {
+                    "range": {
+                        "sheetId": sheet_id,
+                        "startRowIndex": end_row_index,
+                        "endRowIndex": grid_rows,
+                        "startColumnIndex": column_index,
+                        "endColumnIndex": column_index + width,
+                    },
+                    "cell": {},
+                    "fields": "userEnteredValue",
+                }
+            }
+        )
+    return requests
+
 
 class GoogleSheetsClient(object):
     def __init__(
@@ -17,15 +302,9 @@ class GoogleSheetsClient(object):
             client_secret (str): OAuth 2.0 client secret
             spreadsheet_id (str): the spreadsheet to request
         """
-        credentials = google.oauth2.credentials.Credentials(
-            access_token,
-            refresh_token=refresh_token,
-            token_uri="https://oauth2.googleapis.com/token",
-            client_id=client_id,
-            client_secret=client_secret,
-            scopes=["https://www.googleapis.com/auth/spreadsheets"],
+        self.service = get_service(
+            access_token, refresh_token, client_id, client_secret
         )
-        self.service = build("sheets", "v4", credentials=credentials)
         self.spreadsheet_id = spreadsheet_id
 
     def get_sheet_info(self):
@@ -42,6 +321,64 @@ class GoogleSheetsClient(object):
         sheet_tabs = [s["properties"]["title"] for s in sheet_data["sheets"]]
         return sheet_tabs
 
+    def tab_properties(self, tab_name):
+        """Return the properties (sheetId, gridProperties, etc.) of a tab.
+
+        Raises:
+            ValueError: if the spreadsheet has no tab with the name
+        """
+        properties = next(
+            (
+                s["properties"]
+                for s in self.get_sheet_info()["sheets"]
+                if s["properties"]["title"] == tab_name
+            ),
+            None,
+        )
+        if properties is None:
+            raise ValueError(
+                f"Spreadsheet {self.spreadsheet_id} has no tab named {tab_name}"
+            )
+        return properties
+
+    def batch_update(self, requests):
+        """Send requests in one spreadsheets.batchUpdate, which applies all or none of them."""
+        request = self.service.spreadsheets().batchUpdate(
+            spreadsheetId=self.spreadsheet_id, body={"requests": requests}
+        )
+        response = request.execute()
+        return response
+
+    def replace_ranges(self, range_data):
+        """Replace the contents of one or more ranges with a single request.
+
+        New rows are written from the first row of each range, growing the
+        grid if needed, and rows left over from previous contents are cleared
+        in the same batchUpdate, so the sheet is never empty and a failed
+        write leaves it untouched.
+
+        Args:
+            range_data (dict): A1 ranges (e.g., rbml!A:Z) and their rows (list of lists)
+
+        Raises:
+            ValueError: if the spreadsheet has no tab named in a range
+        """
+        tabs = {
+            s["properties"]["title"]: s["properties"]
+            for s in self.get_sheet_info()["sheets"]
+        }
+        requests = []
+        for data_range, rows in range_data.items():
+            tab_name = split_range(data_range)[0]
+            if tab_name not in tabs:
+                raise ValueError(
+                    f"Spreadsheet {self.spreadsheet_id} has no tab named {tab_name}"
+                )
+            requests.extend(
+                write_requests(tabs[tab_name], data_range, rows, clear_below=True)
+            )
+        return self.batch_update(requests)
+
 
 class DataSheet(GoogleSheetsClient):
     def __init__(
@@ -88,17 +425,26 @@ class DataSheet(GoogleSheetsClient):
         response = the_data["values"] if "values" in the_data else []
         return response
 
-    def get_sheet_data_columns(self):
-        """Return sheet data in columns instead of rows."""
+    def get_sheet_data_columns(self, value_render_option="FORMATTED_VALUE"):
+        """Return sheet data in columns instead of rows.
+
+        Args:
+            value_render_option (str): FORMATTED_VALUE, UNFORMATTED_VALUE or FORMULA
+        """
+        date_time_render_option = (
+            "SERIAL_NUMBER"
+            if value_render_option == "FORMATTED_VALUE"
+            else "FORMATTED_STRING"
+        )
         request = (
             self.service.spreadsheets()
             .values()
             .get(
                 spreadsheetId=self.spreadsheet_id,
                 range=self.data_range,
-                valueRenderOption="FORMATTED_VALUE",
+                valueRenderOption=value_render_option,
                 majorDimension="COLUMNS",
-                dateTimeRenderOption="SERIAL_NUMBER",
+                dateTimeRenderOption=date_time_render_option,
             )
         )
         the_data = request.execute()
@@ -134,6 +480,66 @@ class DataSheet(GoogleSheetsClient):
         response = request.execute()
         return response
 
+    def replace_sheet(self, data):
+        """Replace the contents of the data range with rows in a single request.
+
+        Args:
+            data (list): list of lists (rows)
+        """
+        return self.replace_ranges({self.data_range: data})
+
+    def update_sheet_diff(self, data, key_field="uri", batch_size=1000):
+        """Update only the cells that differ from the current sheet contents.
+
+        The current rows are read unformatted, so number formats do not hide
+        changes, and matched to the new rows on the key column. Both sides are
+        compared with cell_text. Changed cell ranges are sent in batched
+        batchUpdate requests; the first also grows the grid if inserted rows
+        run past its last row.
+
+        Args:
+            data (list): list of lists (rows), starting with the header row
+            key_field (str): header of the column identifying a row
+            batch_size (int): maximum number of ranges sent per request
+
+        Returns:
+            dict: counts of inserted, changed and deleted rows, or None if the
+                sheet is empty or its header does not match, in which case
+                nothing is written
+        """
+        columns = self.get_sheet_data_columns("UNFORMATTED_VALUE")
+        row_count = max((len(column) for column in columns), default=0)
+        current_rows = [
+            [column[i] if i < len(column) else "" for column in columns]
+            for i in range(row_count)
+        ]
+        if not current_rows or key_field not in data[0]:
+            return None
+        header = [cell_text(cell) for cell in data[0]]
+        current_header = current_rows[0][: len(header)]
+        if [cell_text(cell, False) for cell in current_header] != header:
+            return None
+        tab_name, first_column, first_row, width = split_range(self.data_range)
+        updates, counts = diff_rows(current_rows, data, data[0].index(key_field))
+        properties = self.tab_properties()
+        sheet_id = properties["sheetId"]
+        first_column_index = column_number(first_column) - 1
+        requests = [
+            update_cells_request(
+                sheet_id, first_row - 1 + row, first_column_index + column, [values]
+            )
+            for row, column, values in updates
+        ]
+        end_row_index = max((first_row + row for row, _, _ in updates), default=0)
+        missing_rows = end_row_index - properties["gridProperties"]["rowCount"]
+        if missing_rows > 0:
+            requests.insert(0, append_rows_request(sheet_id, missing_rows))
+        for start in range(0, len(requests), batch_size):
+            end = start + batch_size
+            self.batch_update(requests[start:end])
+        counts["ranges"] = len(updates)
+        return counts
+
     def append_sheet(self, data):
         """Append rows to end of detected table.
 
@@ -156,38 +562,75 @@ class DataSheet(GoogleSheetsClient):
         response = request.execute()
         return response
 
-    def import_csv(self, a_csv, delim=",", quote="NONE"):
-        """Will clear contents of sheet range first.
+    def tab_properties(self):
+        """Return the properties of the data range's tab (see GoogleSheetsClient.tab_properties)."""
+        return super(DataSheet, self).tab_properties(split_range(self.data_range)[0])
+
+    def import_csv(
+        self,
+        a_csv,
+        delim=",",
+        quote="NONE",
+        chunk_size=5000,
+        start_row=0,
+        progress=None,
+        **fmtparams,
+    ):
+        """Will replace contents of sheet range, streaming the CSV in chunks.
+
+        Each chunk is written to the rows it occupies, so the file is never held
+        in memory or sent in a single request. A chunk's batchUpdate also grows
+        the grid when the chunk runs past its last row. Rows left over from
+        the previous contents are cleared once the file is written.
+
+        The import is not atomic: if it fails part way, the sheet holds the new
+        rows written so far followed by the rest of its previous contents. To
+        resume an interrupted import, pass the last row count reported to
+        `progress` as `start_row`.
 
         Args:
             a_csv (str): csv to import
             delim (str): comma by default, can be pipe, colon, etc.
             quote (str): Can be: ALL, MINIMAL, NONNUMERIC, NONE
+            chunk_size (int): number of rows written per request
+            start_row (int): number of CSV rows already written by a previous import
+            progress (callable, optional): called with the number of rows written after each chunk
+            fmtparams: other csv dialect options (e.g., escapechar). See https://docs.python.org/3/library/csv.html
+
+        Returns:
+            int: number of CSV rows written to the sheet
+
+        Raises:
+            ValueError: if the spreadsheet has no tab named in the data range
         """
-        self.clear_sheet()
         quote_behavior = {
             "ALL": csv.QUOTE_ALL,
             "MINIMAL": csv.QUOTE_MINIMAL,
             "NONNUMERIC": csv.QUOTE_NONNUMERIC,
             "NONE": csv.QUOTE_NONE,
         }
-        quote_param = quote_behavior.get(quote.upper())
-        # TODO: Improve ability to pass parameters through to csv dialect options. See https://docs.python.org/3/library/csv.html
-        csv.register_dialect("my_dialect", delimiter=delim, quoting=quote_param)
-        data = []
-        with open(a_csv) as the_csv_data:
-            for row in csv.reader(the_csv_data, "my_dialect"):
-                data.append(row)
-        request = (
-            self.service.spreadsheets()
-            .values()
-            .append(
-                spreadsheetId=self.spreadsheet_id,
-                range=self.data_range,
-                valueInputOption="USER_ENTERED",
-                insertDataOption="OVERWRITE",
-                body={"values": data},
-            )
+        fmtparams.setdefault("delimiter", delim)
+        fmtparams.setdefault("quoting", quote_behavior.get(quote.upper()))
+        first_row = split_range(self.data_range)[2]
+        properties = self.tab_properties()
+        grid = properties["gridProperties"]
+        rows_written = start_row
+        with open(a_csv, newline="") as the_csv_data:
+            rows = islice(csv.reader(the_csv_data, **fmtparams), start_row, None)
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                self.batch_update(
+                    write_requests(properties, self.data_range, chunk, rows_written)
+                )
+                rows_written += len(chunk)
+                grid["rowCount"] = max(grid["rowCount"], first_row - 1 + rows_written)
+                if progress:
+                    progress(rows_written)
+        requests = write_requests(
+            properties, self.data_range, [], rows_written, clear_below=True
         )
-        response = request.execute()
-        return response
+        if requests:
+            self.batch_update(requests)
+        return rows_written
@@ -1,22 +1,24 @@
+import hashlib
+import math
+import os
+import threading
 from datetime import datetime, timedelta
-
-from lxml import etree
+from pathlib import Path
 
 
 def validate_against_schema(xml, schema_name):
     """Validates XML data against ead or MARC21 schema.
 
+    The compiled schema is cached, so repeated validation does not reload it.
+
     Args:
         xml (obj): xml data
         schema_name (str): ead or MARC21slim
     """
-    xmlschema_doc = etree.parse(f"schemas/{schema_name}.xsd.xml")
-    xmlschema = etree.XMLSchema(xmlschema_doc)
-    root = etree.fromstring(xml)
-    if xmlschema.validate(root):
-        return True
-    else:
-        return False
+    # Imported here so modules that only need the date helpers do not load lxml.
+    from .validation import validate_xml
+
+    return validate_xml(xml, schema_name).valid
 
 
 def get_fiscal_year(accession_date):
@@ -84,3 +86,84 @@ def yesterday_utc():
     """
     current_time = datetime.now() - timedelta(days=1)
     return int(current_time.timestamp())
+
+
+def page_count(count, page_size):
+    """Return the number of pages or batches needed for a number of records."""
+    return math.ceil(count / page_size)
+
+
+def sum_counts(counts):
+    """Add up dicts of counts (e.g., dry-run estimates of several repositories).
+
+    Args:
+        counts (iterable): dicts of name to number
+
+    Returns:
+        dict: name to total
+    """
+    totals = {}
+    for count in counts:
+        for name, number in count.items():
+            totals[name] = totals.get(name, 0) + number
+    return totals
+
+
+def write_atomic(filepath, data):
+    """Writes bytes to a file in one pass, replacing it atomically.
+
+    Args:
+        filepath (Path obj or str): file to write
+        data (bytes): file contents
+    """
+    filepath = Path(filepath)
+    temp_path = filepath.with_name(
+        f".{filepath.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+    )
+    try:
+        with open(temp_path, "wb") as temp_file:
+            temp_file.write(data)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        os.replace(temp_path, filepath)
+    finally:
+        if temp_path.exists():
+            temp_path.unlink()
+
+
+def stream_to_file(response, filepath, chunk_size=1048576):
+    """Writes the body of a streamed response to a file, replacing it atomically.
+
+    The raw bytes are written in chunks to a temporary file next to the target,
+    which is renamed over the target once complete, so readers never see a
+    partly written file and a failed download leaves the old file in place.
+
+    Args:
+        response (obj): requests response, requested with stream=True
+        filepath (Path obj or str): file to write
+        chunk_size (int): bytes read from the response at a time
+
+    Returns:
+        tuple: size in bytes and SHA-256 hex digest of the file
+    """
+    filepath = Path(filepath)
+    digest = hashlib.sha256()
+    size = 0
+    temp_path = filepath.with_name(
+        f".{filepath.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+    )
+    try:
+        response.raise_for_status()
+        with open(temp_path, "wb") as temp_file:
+            for chunk in response.iter_content(chunk_size):
+                temp_file.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        os.replace(temp_path, filepath)
+        return size, digest.hexdigest()
+    finally:
+        response.close()
+        if temp_path.exists():
+            temp_path.unlink()
@@ -0,0 +1,94 @@
+import statistics
+import subprocess
+import sys
+from collections import namedtuple
+
+SHEETS_MODULES = ("google", "googleapiclient")
+XML_MODULES = ("lxml",)
+
+
+class ImportBudget(namedtuple("ImportBudget", ["seconds", "deferred"])):
+    """Startup budget for a module imported by a cron entry point.
+
+    seconds (float): maximum cumulative import time
+    deferred (tuple): top-level packages the module must not import
+    """
+
+    __slots__ = ()
+
+
+IMPORT_BUDGETS = {
+    "crons.cli": ImportBudget(0.1, SHEETS_MODULES + XML_MODULES + ("asnake",)),
+    "crons.report_runner": ImportBudget(0.4, SHEETS_MODULES + XML_MODULES),
+    "crons.daily_report": ImportBudget(0.4, SHEETS_MODULES + XML_MODULES),
+    "crons.fa_list_generator": ImportBudget(0.4, SHEETS_MODULES + XML_MODULES),
+    "crons.acfa_updater": ImportBudget(0.5, SHEETS_MODULES),
+}
+
+
+def parse_import_times(output):
+    """Parse the output of `python -X importtime`.
+
+    Args:
+        output (str): stderr of the interpreter
+
+    Returns:
+        dict: module name to cumulative import time in seconds
+    """
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split(":", 1)[1].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative) / 1000000
+    return times
+
+
+def import_times(module_name, python=sys.executable):
+    """Import a module in a fresh interpreter and return its import times.
+
+    Args:
+        module_name (str): e.g., crons.report_runner
+        python (str): interpreter to run
+
+    Returns:
+        dict: module name to cumulative import time in seconds
+    """
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module_name}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return parse_import_times(result.stderr)
+
+
+def check_import_budget(module_name, budget, runs=3):
+    """Measure a module's import time against its budget.
+
+    Args:
+        module_name (str): e.g., crons.report_runner
+        budget (ImportBudget): time and deferred packages allowed
+        runs (int): imports to take the median of
+
+    Returns:
+        list: budget violations; empty if the module is within budget
+    """
+    measurements = [import_times(module_name) for _ in range(runs)]
+    seconds = statistics.median(times[module_name] for times in measurements)
+    errors = []
+    if seconds > budget.seconds:
+        errors.append(
+            f"{module_name} took {seconds:.3f}s to import (budget {budget.seconds:.3f}s)"
+        )
+    loaded = sorted(
+        {
+            name.split(".")[0]
+            for name in measurements[0]
+            if name.split(".")[0] in budget.deferred
+        }
+    )
+    if loaded:
+        errors.append(f"{module_name} imports deferred packages: {', '.join(loaded)}")
+    return errors
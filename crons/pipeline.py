@@ -0,0 +1,184 @@
+import logging
+import queue
+import threading
+import time
+
+STOP = object()
+
+
+class Stage(object):
+    """A pool of worker threads that take items from a bounded queue.
+
+    Whatever the stage function returns (other than None) is put on the queues
+    of downstream stages. Putting an item on a full queue blocks, so a slow
+    stage holds back the stages feeding it rather than letting work pile up.
+    """
+
+    def __init__(self, name, func, workers=1, maxsize=50, batch_size=1):
+        """Set up the stage.
+
+        Args:
+            name (str): name used in stats
+            func (callable): called with each item (or a list of up to batch_size items)
+            workers (int): number of worker threads
+            maxsize (int): size of the input queue
+            batch_size (int): if more than 1, func is called with lists of items
+        """
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize)
+        self.downstream = []
+        self.threads = []
+        self.processed = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+        self.started = None
+
+    def then(self, stage):
+        """Send this stage's results to another stage, returning that stage."""
+        self.downstream.append(stage)
+        return stage
+
+    def put(self, item):
+        self.queue.put(item)
+
+    def start(self):
+        self.started = time.monotonic()
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self.work, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        """Wait for queued items to be processed and stop the workers."""
+        for _ in self.threads:
+            self.queue.put(STOP)
+        for thread in self.threads:
+            thread.join()
+
+    def next_items(self):
+        """Get the next item or batch of items, or STOP."""
+        item = self.queue.get()
+        if self.batch_size == 1 or item is STOP:
+            return item
+        items = [item]
+        while len(items) < self.batch_size:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is STOP:
+                self.queue.put(STOP)
+                break
+            items.append(item)
+        return items
+
+    def work(self):
+        while True:
+            items = self.next_items()
+            if items is STOP:
+                break
+            try:
+                result = self.func(items)
+            except Exception as e:
+                logging.error(f"{self.name}: {e}")
+                with self.lock:
+                    self.errors += 1
+                continue
+            with self.lock:
+                self.processed += len(items) if self.batch_size > 1 else 1
+            if result is not None:
+                for stage in self.downstream:
+                    stage.put(result)
+
+    def stats(self):
+        """Return queue depth, items processed, errors and throughput (items per second)."""
+        elapsed = time.monotonic() - self.started if self.started else 0
+        return {
+            "queue_depth": self.queue.qsize(),
+            "processed": self.processed,
+            "errors": self.errors,
+            "throughput": round(self.processed / elapsed, 2) if elapsed else 0,
+        }
+
+
+class Join(Stage):
+    """A stage that passes an item on once every stage feeding it has returned it.
+
+    Use it to run a stage only after several parallel stages have finished
+    with the same item (e.g., indexing a finding aid once its EAD is validated
+    and its PDF is written). If any of those stages returns None for an item,
+    the item is not passed on.
+    """
+
+    def __init__(self, name, key, count, maxsize=50):
+        """Set up the stage.
+
+        Args:
+            name (str): name used in stats
+            key (callable): returns the key identifying an item (e.g., its URI)
+            count (int): number of stages feeding the join
+            maxsize (int): size of the input queue
+        """
+        super(Join, self).__init__(name, self.arrive, maxsize=maxsize)
+        self.key = key
+        self.count = count
+        self.arrivals = {}
+
+    def arrive(self, item):
+        """Count an arrival of an item, returning the item on its last arrival."""
+        key = self.key(item)
+        arrivals = self.arrivals.pop(key, 0) + 1
+        if arrivals < self.count:
+            self.arrivals[key] = arrivals
+            return None
+        return item
+
+
+class Pipeline(object):
+    """Stages connected by bounded queues, started and stopped together."""
+
+    def __init__(self, stages, stats_interval=60):
+        """Set up the pipeline.
+
+        Args:
+            stages (list): Stage objects, each listed after every stage that feeds it
+            stats_interval (int): seconds between logging stage stats while running
+        """
+        self.stages = stages
+        self.stats_interval = stats_interval
+        self.running = threading.Event()
+
+    def __enter__(self):
+        for stage in self.stages:
+            stage.start()
+        self.running.set()
+        threading.Thread(target=self.log_stats, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Drain the stages in order and stop their workers."""
+        for stage in self.stages:
+            stage.stop()
+        self.running.clear()
+        logging.info(self.summary())
+
+    def stats(self):
+        return {stage.name: stage.stats() for stage in self.stages}
+
+    def summary(self):
+        return "; ".join(
+            f"{name}: {s['processed']} done, {s['errors']} errors, {s['queue_depth']} queued, {s['throughput']}/s"
+            for name, s in self.stats().items()
+        )
+
+    def log_stats(self):
+        while self.running.is_set():
+            time.sleep(self.stats_interval)
+            if self.running.is_set():
+                logging.info(self.summary())
@@ -0,0 +1,151 @@
+import random
+import threading
+import time
+
+from requests import exceptions
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class RateLimiter(object):
+    """Token bucket shared by all threads making requests to one server.
+
+    If `max_rate` is above `min_rate`, the rate adapts to the server (additive
+    increase, multiplicative decrease): it rises by `increase` after each
+    response faster than `target_latency`, and is multiplied by `decrease` after
+    a 429 or 5xx response or a connection error. Slow responses only hold the
+    rate, since some requests (e.g., EAD exports) are slow whatever the load.
+    The rate is decreased at most once per round trip: failures of requests
+    sent before the last decrease are ignored, so a burst of concurrent errors
+    halves the rate once rather than once per request.
+    """
+
+    def __init__(
+        self,
+        rate,
+        burst=None,
+        min_rate=None,
+        max_rate=None,
+        target_latency=2.0,
+        increase=0.1,
+        decrease=0.5,
+    ):
+        """Set up the token bucket.
+
+        Args:
+            rate (float): requests allowed per second to start with
+            burst (int, optional): requests allowed at once after a quiet period. Defaults to rate.
+            min_rate (float, optional): lowest adapted rate. Defaults to rate.
+            max_rate (float, optional): highest adapted rate. Defaults to rate.
+            target_latency (float): response time in seconds above which the rate is not increased
+            increase (float): requests per second added after each fast response
+            decrease (float): factor applied to the rate after a failed response
+        """
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst if burst is not None else rate))
+        self.min_rate = float(min_rate if min_rate is not None else rate)
+        self.max_rate = float(max_rate if max_rate is not None else rate)
+        self.target_latency = target_latency
+        self.increase = increase
+        self.decrease = decrease
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.decreased = float("-inf")
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be made."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.burst, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def record(self, latency, status_code=None):
+        """Adjust the rate after a response.
+
+        Args:
+            latency (float): seconds taken by the request
+            status_code (int, optional): HTTP status of the response, or None if it failed to connect
+        """
+        now = time.monotonic()
+        failed = status_code is None or status_code in RETRY_STATUSES
+        with self.lock:
+            if failed:
+                if now - latency >= self.decreased:
+                    self.rate = max(self.min_rate, self.rate * self.decrease)
+                    self.decreased = now
+            elif latency <= self.target_latency:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+
+
+class ThrottledAdapter(HTTPAdapter):
+    """Transport adapter that throttles requests and retries failed idempotent ones.
+
+    Each attempt waits for the RateLimiter and reports its latency and status
+    back to it. GET, HEAD and OPTIONS requests that fail to connect, time out
+    or return a 429 or 5xx status are retried with exponential backoff and full
+    jitter, honoring a numeric Retry-After header.
+    """
+
+    def __init__(self, rate_limiter=None, retries=0, backoff=1.0, **kwargs):
+        """Set up the adapter.
+
+        Args:
+            rate_limiter (RateLimiter, optional): limiter shared by all requests through the adapter
+            retries (int): times to retry a failed idempotent request
+            backoff (float): base delay in seconds before the first retry
+            kwargs: passed to requests.adapters.HTTPAdapter (e.g., pool_maxsize)
+        """
+        self.rate_limiter = rate_limiter
+        self.retries = retries
+        self.backoff = backoff
+        super(ThrottledAdapter, self).__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        retryable = request.method in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            start_time = time.monotonic()
+            try:
+                response = super(ThrottledAdapter, self).send(request, **kwargs)
+            except (exceptions.ConnectionError, exceptions.Timeout):
+                if self.rate_limiter:
+                    self.rate_limiter.record(time.monotonic() - start_time)
+                if not retryable or attempt >= self.retries:
+                    raise
+                retry_after = None
+            else:
+                if self.rate_limiter:
+                    self.rate_limiter.record(
+                        time.monotonic() - start_time, response.status_code
+                    )
+                finished = response.status_code not in RETRY_STATUSES
+                if finished or not retryable or attempt >= self.retries:
+                    return response
+                retry_after = response.headers.get("Retry-After")
+                response.close()
+            time.sleep(self.retry_delay(attempt, retry_after))
+            attempt += 1
+
+    def retry_delay(self, attempt, retry_after=None):
+        """Seconds to wait before a retry.
+
+        Args:
+            attempt (int): number of retries already made
+            retry_after (str, optional): Retry-After header of the failed response
+        """
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        return random.uniform(0, self.backoff * 2**attempt)
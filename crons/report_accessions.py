@@ -1,20 +1,24 @@
 import datetime
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 from .as_cron import BaseAsCron
 from .helpers import formula_to_string, get_fiscal_year
+from .report_table import Field, ReportTable
 
 
 class AccessionsReporter(BaseAsCron):
-    def __init__(self):
-        super(AccessionsReporter, self).__init__("report_accessions_sheet")
+    repositories = {"rbml": 2, "avery": 3, "rbmlbooks": 6, "ohac": 7}
+
+    def __init__(self, as_client=None):
+        super(AccessionsReporter, self).__init__("report_accessions_sheet", as_client)
         logging.basicConfig(
             datefmt="%m/%d/%Y %I:%M:%S %p",
             format="%(asctime)s %(message)s",
             level=logging.INFO,
             handlers=[
-                logging.FileHandler("accessions_reporter.log"),
+                logging.FileHandler("accessions_reporter.log", delay=True),
                 logging.StreamHandler(),
             ],
         )
@@ -41,46 +45,89 @@ class AccessionsReporter(BaseAsCron):
             "modified by",
         ]
 
-    def create_report(self, google=False):
-        repositories = {"rbml": 2, "avery": 3, "rbmlbooks": 6, "ohac": 7}
-        for name, repo_id in repositories.items():
-            try:
-                msg = self.construct_sheet(name, repo_id, google=google)
-                logging.info(msg)
-            except Exception as e:
-                logging.error(f"Error for {name} accessions: {e}")
-
-    def construct_sheet(self, name, repo_id, google=False):
-        sheet_id = self.config["Google Sheets"]["report_accessions_sheet"]
+    def create_report(self, google=False, diff=False):
+        """Build each repository's accessions tab concurrently.
+
+        Repositories share the ArchivesSpace client (and its rate limit and
+        record cache). Each tab is written as soon as its repository finishes.
+        """
+        messages = []
+        with ThreadPoolExecutor(max_workers=len(self.repositories)) as executor:
+            futures = {}
+            for name, repo_id in self.repositories.items():
+                logging.info(f"Starting accessions reporting for {name}...")
+                futures[executor.submit(self.get_table, repo_id)] = name
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    msg = self.write_sheet(name, future.result(), google, diff)
+                    messages.append(msg)
+                except Exception as e:
+                    logging.error(f"Error for {name} accessions: {e}")
+        return " ".join(messages)
+
+    def construct_sheet(self, name, repo_id, google=False, diff=False):
         logging.info(f"Starting accessions reporting for {name}...")
-        spreadsheet_data = self.get_sheet_data(repo_id)
+        return self.write_sheet(name, self.get_table(repo_id), google, diff)
+
+    def write_sheet(self, name, table, google=False, diff=False):
+        """Write one repository's accessions to its Google Sheet tab or a file.
+
+        Rows are streamed to the file rather than built as a list first.
+
+        Args:
+            name (str): repository name, used as the tab name
+            table (ReportTable): the repository's accession data
+            google (bool): write to Google Sheets instead of a file
+            diff (bool): only send changed cell ranges to Google Sheets
+        """
         if google:
-            self.write_data_to_google_sheet(
-                spreadsheet_data,
-                sheet_id,
+            msg = self.write_data_to_google_sheet(
+                table.to_rows(self.fields),
+                self.config["Google Sheets"]["report_accessions_sheet"],
                 f"{name}!A:Z",
+                diff=diff,
             )
-            msg = f"Posted {len(spreadsheet_data)} rows to https://docs.google.com/spreadsheets/d/{sheet_id} "
         else:
             csv_filename = f"{datetime.datetime.now().strftime('%Y_%m_%d_%H%M')}_{Path(__file__).resolve().name.split('.')[0]}_{name}.csv"
             csv_filepath = Path(self.config["CSV"]["outpath"], csv_filename)
-            self.write_data_to_csv(spreadsheet_data, csv_filepath)
-            msg = f"Wrote {len(spreadsheet_data)} rows to {csv_filename}."
+            msg = self.write_data_to_file(
+                table.rows(self.fields), csv_filepath, table.schema(self.fields)
+            )
         logging.info(msg)
         return msg
 
     def get_sheet_data(self, repo_id):
-        spreadsheet_data = []
-        spreadsheet_data.append(self.fields)
-        rows_data = self.get_row_data(repo_id)
-        for r in rows_data:
-            resource_row = self.construct_row(r)
-            spreadsheet_data.append(resource_row)
-        return spreadsheet_data
+        return self.get_table(repo_id).to_rows(self.fields)
+
+    def get_table(self, repo_id):
+        """Collect a repository's accession data into a ReportTable, computing derived columns per record.
+
+        The extent lists the extent columns are computed from are not kept.
+
+        Args:
+            repo_id (int): ASpace repository ID (e.g., 2)
+
+        Returns:
+            ReportTable
+        """
+        return ReportTable.from_records(
+            self.fields,
+            self.get_row_data(repo_id),
+            derived=[
+                ("year", self.year, "accession_date"),
+                ("fiscal_year", self.fiscal_year, "accession_date"),
+                (Field("linear_feet", float), self.linear_feet, "extent_list"),
+                ("extents_info", self.extents_info, "extent_list"),
+            ],
+        )
 
     def get_row_data(self, repo_id):
         """Get accession data to be written into a row.
 
+        Year, fiscal year and extent columns are computed by get_table from
+        accession_date and extent_list.
+
         Args:
             repo_id (int): ASpace repository ID (e.g., 2)
 
@@ -89,11 +136,11 @@ class AccessionsReporter(BaseAsCron):
         """
         one_week_ago = datetime.date.today() - datetime.timedelta(7)
         for accession in self.as_client.accessions_from_repository(repo_id):
-            y, m, d = (int(a) for a in accession["accession_date"].split("-"))
-            accession_date = datetime.date(y, m, d)
+            accession_date = self.parse_date(accession["accession_date"])
             if accession.get("related_resources"):
-                resource = self.as_client.get_json_response(
-                    accession["related_resources"][0]["ref"]
+                resource = self.as_client.get_cached_json_response(
+                    accession["related_resources"][0]["ref"],
+                    fields=self.as_client.resource_fields,
                 )
             else:
                 resource = None
@@ -117,10 +164,7 @@ class AccessionsReporter(BaseAsCron):
                 "modified by": accession["last_modified_by"],
                 "resource_bibid": resource["id_0"] if resource else "",
                 "resource_asid": resource["uri"] if resource else "",
-                "year": y if y > 1700 else "",
-                "fiscal_year": get_fiscal_year(accession_date),
-                "linear_feet": self.linear_feet(accession["extents"]),
-                "extents_info": self.extents_info(accession["extents"]),
+                "extent_list": accession["extents"],
                 "processing_status": (
                     accession.get("collection_management").get("processing_status")
                     if accession.get("collection_management")
@@ -136,6 +180,17 @@ class AccessionsReporter(BaseAsCron):
             }
             yield accession_fields
 
+    def parse_date(self, date_string):
+        y, m, d = (int(a) for a in date_string.split("-"))
+        return datetime.date(y, m, d)
+
+    def year(self, accession_date):
+        year = int(accession_date.split("-")[0])
+        return year if year > 1700 else ""
+
+    def fiscal_year(self, accession_date):
+        return get_fiscal_year(self.parse_date(accession_date))
+
     def linear_feet(self, extents):
         linear_feet = 0
         for extent in extents:
@@ -6,14 +6,14 @@ from .as_cron import BaseAsCron
 
 
 class AgentsReporter(BaseAsCron):
-    def __init__(self):
-        super(AgentsReporter, self).__init__("report_agents_sheet")
+    def __init__(self, as_client=None):
+        super(AgentsReporter, self).__init__("report_agents_sheet", as_client)
         logging.basicConfig(
             datefmt="%m/%d/%Y %I:%M:%S %p",
             format="%(asctime)s %(message)s",
             level=logging.INFO,
             handlers=[
-                logging.FileHandler("agents_reporter.log"),
+                logging.FileHandler("agents_reporter.log", delay=True),
                 logging.StreamHandler(),
             ],
         )
@@ -28,7 +28,7 @@ class AgentsReporter(BaseAsCron):
             "last_modified",
         ]
 
-    def create_report(self, google=False):
+    def create_report(self, google=False, diff=False):
         try:
             spreadsheet_data = self.get_sheet_data()
             agent_count = len(spreadsheet_data) - 1
@@ -38,11 +38,12 @@ class AgentsReporter(BaseAsCron):
                     spreadsheet_data,
                     self.config["Google Sheets"]["report_agents_sheet"],
                     self.config["Google Sheets"]["report_agents_range"],
+                    diff=diff,
                 )
             else:
                 csv_filename = f"{datetime.now().strftime('%Y_%m_%d_%H%M')}_{Path(__file__).resolve().name.split('.')[0]}.csv"
                 csv_filepath = Path(self.config["CSV"]["outpath"], csv_filename)
-                msg = self.write_data_to_csv(spreadsheet_data, csv_filepath)
+                msg = self.write_data_to_file(spreadsheet_data, csv_filepath)
             logging.info(msg)
             return msg
         except Exception as e:
@@ -0,0 +1,183 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from configparser import ConfigParser
+from contextlib import contextmanager
+from pathlib import Path
+
+from .aspace_client import ArchivesSpaceClient
+from .helpers import sum_counts
+from .report_accessions import AccessionsReporter
+from .report_agents import AgentsReporter
+from .report_sinks import get_sink
+from .report_subjects import SubjectReporter
+from .resource_reporter import ResourceReporter
+
+AGENT_TYPES = ["people", "corporate_entities", "families", "software"]
+
+
+class ReportInstrumentation(object):
+    """Counts ArchivesSpace requests and times reports run over a shared client."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.failed_requests = 0
+        self.request_seconds = 0.0
+        self.durations = {}
+
+    def attach(self, session):
+        """Count every response received by a requests session.
+
+        Args:
+            session (requests.Session): e.g., as_client.aspace.client.session
+        """
+        session.hooks["response"].append(self.record_response)
+
+    def record_response(self, response, *args, **kwargs):
+        with self.lock:
+            self.requests += 1
+            self.request_seconds += response.elapsed.total_seconds()
+            if not response.ok:
+                self.failed_requests += 1
+
+    @contextmanager
+    def report(self, name):
+        """Time a report.
+
+        Args:
+            name (str): report name
+        """
+        start_time = time.monotonic()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.durations[name] = time.monotonic() - start_time
+
+    def summary(self):
+        durations = ", ".join(
+            f"{name}: {duration:.1f}s" for name, duration in self.durations.items()
+        )
+        return f"{self.requests} ArchivesSpace requests ({self.failed_requests} failed, {self.request_seconds:.1f}s total). Reports: {durations}"
+
+
+class ReportRunner(object):
+    """Runs the ArchivesSpace reports concurrently over one shared client.
+
+    Reports share the client's connection pool, rate limit and JSON cache.
+    Resources fetched by the resource report are added to the cache, so the
+    accessions report reuses them for related resources. A report listed in
+    `run_after` starts once the report it depends on has finished, so that
+    it finds the cache filled.
+    """
+
+    reporter_classes = [
+        ResourceReporter,
+        AccessionsReporter,
+        AgentsReporter,
+        SubjectReporter,
+    ]
+    run_after = {AccessionsReporter: ResourceReporter}
+
+    def __init__(self, as_client=None, output_format=None):
+        """Set up the shared client and instrumentation.
+
+        Args:
+            as_client (ArchivesSpaceClient, optional): shared client. Defaults to one configured from local_settings.cfg.
+            output_format (str, optional): report file format, overriding the config (see report_sinks)
+        """
+        if as_client is None:
+            config = ConfigParser()
+            config.read(Path(Path(__file__).parents[1].resolve(), "local_settings.cfg"))
+            as_client = self.client_from_config(config["ArchivesSpace"])
+        self.as_client = as_client
+        self.as_client.cache_resources = True
+        self.output_format = output_format
+        self.instrumentation = ReportInstrumentation()
+        self.instrumentation.attach(self.as_client.aspace.client.session)
+
+    @staticmethod
+    def client_from_config(config_section):
+        """Create the shared client from the [ArchivesSpace] config section.
+
+        If the section sets `concurrent_requests`, records are fetched that many
+        at a time through SyncArchivesSpaceClient instead of one by one.
+
+        Args:
+            config_section (configparser.SectionProxy): e.g., config["ArchivesSpace"]
+        """
+        concurrency = config_section.getint("concurrent_requests", fallback=0)
+        if concurrency:
+            from .async_aspace_client import SyncArchivesSpaceClient
+
+            return SyncArchivesSpaceClient.from_config(
+                config_section, concurrency=concurrency
+            )
+        return ArchivesSpaceClient.from_config(config_section)
+
+    def run(self, google=False, diff=False):
+        """Run all reports, returning their messages in the order of `reporter_classes`.
+
+        Raises:
+            ValueError, ImportError: if a report's output format cannot be written (see get_sink), before any report starts
+        """
+        reporters = []
+        for reporter_class in self.reporter_classes:
+            reporter = reporter_class(self.as_client)
+            if self.output_format:
+                reporter.output_format = self.output_format
+            if not google:
+                get_sink(reporter.output_format)
+            reporters.append(reporter)
+        with ThreadPoolExecutor(max_workers=len(reporters)) as executor:
+            futures = {}
+            for reporter in reporters:
+                dependency = futures.get(self.run_after.get(type(reporter)))
+                futures[type(reporter)] = executor.submit(
+                    self.run_reporter, reporter, google, diff, dependency
+                )
+            messages = [future.result() for future in futures.values()]
+        logging.info(self.instrumentation.summary())
+        return messages
+
+    def dry_run(self):
+        """Estimate the work of the reports without running them.
+
+        Reports get each record they list, so a record type costs one request
+        for its IDs and one per record. Requests for linked records (e.g., a
+        note's subrecords) are not counted.
+
+        Returns:
+            dict: records and ArchivesSpace requests for each record type and their totals
+        """
+        repo_ids = [repo.id for repo in self.as_client.aspace.repositories]
+        uris = {
+            "resources": [f"/repositories/{i}/resources" for i in repo_ids],
+            "accessions": [
+                f"/repositories/{i}/accessions"
+                for i in AccessionsReporter.repositories.values()
+            ],
+            "subjects": ["/subjects"],
+            "agents": [f"/agents/{agent_type}" for agent_type in AGENT_TYPES],
+        }
+        estimates = {}
+        for record_type, type_uris in uris.items():
+            count = sum(len(self.as_client.record_ids(uri)) for uri in type_uris)
+            estimates[record_type] = {
+                "records": count,
+                "requests": count + len(type_uris),
+            }
+        return {"record_types": estimates, **sum_counts(estimates.values())}
+
+    def run_reporter(self, reporter, google, diff, dependency=None):
+        if dependency:
+            wait([dependency])
+        name = type(reporter).__name__
+        with self.instrumentation.report(name):
+            try:
+                return reporter.run(google, diff)
+            except Exception as e:
+                logging.error(f"{name}: {e}")
+                return f"{name} failed: {e}"
@@ -0,0 +1,176 @@
+import csv
+import gzip
+import importlib.util
+import io
+import json
+from itertools import islice
+from pathlib import Path
+
+# pyarrow type names for the Python types of report fields (see report_table.Field).
+ARROW_TYPES = {bool: "bool_", int: "int64", float: "float64"}
+
+
+class CsvSink(object):
+    """Writes report rows to a CSV file.
+
+    Sinks take the rows built by reporters (a header row followed by data
+    rows) and write them to `path` as they are read. Subclasses change the
+    encoding, and name the optional package they need in `requires`.
+    """
+
+    suffix = ".csv"
+    requires = None
+
+    def __init__(self, path, fields=None):
+        """Set up the sink.
+
+        Args:
+            path (Path obj or str): file to write
+            fields (list, optional): report_table.Field objects describing the
+                columns, used by sinks with typed columns
+        """
+        self.path = Path(path)
+        self.fields = fields or []
+
+    def open(self):
+        return open(self.path, "w", newline="")
+
+    def write(self, rows):
+        """Write rows as they are read, returning the number written.
+
+        Args:
+            rows (iterable): lists, starting with the header
+        """
+        row_count = 0
+        with self.open() as csvfile:
+            writer = csv.writer(csvfile)
+            for row in rows:
+                writer.writerow(row)
+                row_count += 1
+        return row_count
+
+
+class GzipCsvSink(CsvSink):
+    suffix = ".csv.gz"
+
+    def open(self):
+        return gzip.open(self.path, "wt", newline="")
+
+
+class ZstdCsvSink(CsvSink):
+    """Writes a zstandard-compressed CSV file. Requires the zstandard package.
+
+    The compressor emits frame chunks to the file as rows are written.
+    """
+
+    suffix = ".csv.zst"
+    requires = "zstandard"
+
+    def open(self):
+        import zstandard
+
+        stream = zstandard.ZstdCompressor().stream_writer(open(self.path, "wb"))
+        return io.TextIOWrapper(stream, encoding="utf-8", newline="")
+
+
+class JsonLinesSink(CsvSink):
+    """Writes one JSON object per row, keyed by the header."""
+
+    suffix = ".jsonl"
+
+    def write(self, rows):
+        rows = iter(rows)
+        header = next(rows)
+        row_count = 1
+        with open(self.path, "w") as jsonfile:
+            for row in rows:
+                jsonfile.write(json.dumps(dict(zip(header, row)), default=str))
+                jsonfile.write("\n")
+                row_count += 1
+        return row_count
+
+
+class ParquetSink(CsvSink):
+    """Writes a Parquet file with typed columns. Requires the pyarrow package.
+
+    Column types come from the sink's fields: bool, int and float fields are
+    written as bool_, int64 and float64 columns, and all other columns as
+    strings. Rows are read and written one row group of `batch_size` at a
+    time, so neither the rows nor their Arrow copy are held in full.
+    """
+
+    suffix = ".parquet"
+    requires = "pyarrow"
+    batch_size = 10000
+
+    def schema(self, header):
+        """Return the pyarrow schema for a header row.
+
+        Args:
+            header (list): column names
+        """
+        import pyarrow as pa
+
+        field_types = {field.name: field.type for field in self.fields}
+        return pa.schema(
+            [
+                (
+                    str(name),
+                    getattr(pa, ARROW_TYPES.get(field_types.get(name), "string"))(),
+                )
+                for name in header
+            ]
+        )
+
+    def write(self, rows):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        rows = iter(rows)
+        schema = self.schema(next(rows))
+        row_count = 1
+        with pq.ParquetWriter(str(self.path), schema) as writer:
+            while True:
+                batch = list(islice(rows, self.batch_size))
+                if not batch:
+                    break
+                arrays = []
+                for field, column in zip(schema, zip(*batch)):
+                    if pa.types.is_string(field.type):
+                        column = [None if v is None else str(v) for v in column]
+                    arrays.append(pa.array(column, type=field.type))
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+                row_count += len(batch)
+        return row_count
+
+
+SINKS = {
+    "csv": CsvSink,
+    "csv.gz": GzipCsvSink,
+    "csv.zst": ZstdCsvSink,
+    "jsonl": JsonLinesSink,
+    "parquet": ParquetSink,
+}
+
+
+def get_sink(output_format):
+    """Return the sink class for an output format (csv, csv.gz, csv.zst, jsonl or parquet).
+
+    Reports call this before fetching any records, so a missing optional
+    package fails the report before the crawl rather than after it.
+
+    Raises:
+        ValueError: if the format is unknown
+        ImportError: if the package the format requires is not installed
+    """
+    try:
+        sink_class = SINKS[output_format]
+    except KeyError:
+        raise ValueError(
+            f"Unknown output format {output_format}; expected one of {', '.join(SINKS)}"
+        )
+    if sink_class.requires and importlib.util.find_spec(sink_class.requires) is None:
+        raise ImportError(
+            f"Writing {sink_class.suffix} reports requires the {sink_class.requires} package"
+        )
+    return sink_class
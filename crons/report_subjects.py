@@ -6,14 +6,14 @@ from .as_cron import BaseAsCron
 
 
 class SubjectReporter(BaseAsCron):
-    def __init__(self):
-        super(SubjectReporter, self).__init__("report_subjects_sheet")
+    def __init__(self, as_client=None):
+        super(SubjectReporter, self).__init__("report_subjects_sheet", as_client)
         logging.basicConfig(
             datefmt="%m/%d/%Y %I:%M:%S %p",
             format="%(asctime)s %(message)s",
             level=logging.INFO,
             handlers=[
-                logging.FileHandler("subject_reporter.log"),
+                logging.FileHandler("subject_reporter.log", delay=True),
                 logging.StreamHandler(),
             ],
         )
@@ -29,7 +29,7 @@ class SubjectReporter(BaseAsCron):
             "terms",
         ]
 
-    def create_report(self, google=False):
+    def create_report(self, google=False, diff=False):
         try:
             spreadsheet_data = self.get_sheet_data()
             subject_count = len(spreadsheet_data) - 1
@@ -40,11 +40,12 @@ class SubjectReporter(BaseAsCron):
                     spreadsheet_data,
                     self.config["Google Sheets"]["report_subjects_sheet"],
                     self.config["Google Sheets"]["report_subjects_range"],
+                    diff=diff,
                 )
             else:
                 csv_filename = f"{datetime.now().strftime('%Y_%m_%d_%H%M')}_{Path(__file__).resolve().name.split('.')[0]}.csv"
                 csv_filepath = Path(self.config["CSV"]["outpath"], csv_filename)
-                msg = self.write_data_to_csv(spreadsheet_data, csv_filepath)
+                msg = self.write_data_to_file(spreadsheet_data, csv_filepath)
             logging.info(msg)
             return msg
         except Exception as e:
@@ -0,0 +1,187 @@
+import array
+from collections import namedtuple
+from itertools import islice
+
+ARRAY_TYPECODES = {float: "d", int: "q"}
+
+
+class Field(namedtuple("Field", ["name", "type"])):
+    """A report column.
+
+    name (str): column name, used as the header
+    type (type): Python type of the values (e.g., str, float), or None for mixed values
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, name, type=None):
+        return super(Field, cls).__new__(cls, name, type)
+
+
+class ReportTable(object):
+    """Column-oriented table of report data.
+
+    Each column is a list, or a typed `array.array` for float and int fields,
+    so a report holds one sequence per field rather than a dict per record.
+    Derived columns (see `derive`) are computed a column at a time over
+    batches of `batch_size` records as they are added, so only their final
+    values are kept, never the full source values (e.g., the untruncated text
+    of a note). Rows are only assembled when the table is
+    written out, and can be streamed to a file (see `rows`).
+    """
+
+    batch_size = 1000
+
+    def __init__(self, fields):
+        """Create an empty table.
+
+        Args:
+            fields (list): Field objects or column names
+        """
+        self.fields = []
+        self.columns = {}
+        self.derived = []
+        self.length = 0
+        for field in fields:
+            field = field if isinstance(field, Field) else Field(field)
+            self.fields.append(field)
+            self.columns[field.name] = self.empty_column(field.type)
+
+    @staticmethod
+    def empty_column(field_type):
+        typecode = ARRAY_TYPECODES.get(field_type)
+        return array.array(typecode) if typecode else []
+
+    @classmethod
+    def from_records(cls, fields, records, derived=()):
+        """Create a table from dicts, taking the value of each field (None if missing).
+
+        Args:
+            fields (list): Field objects or column names
+            records (iterable): dicts, e.g., from a reporter's get_row_data
+            derived (iterable): (field, func, *sources) tuples passed to `derive`
+        """
+        table = cls(fields)
+        for field, func, *sources in derived:
+            table.derive(field, func, *sources)
+        table.extend(records)
+        return table
+
+    def __len__(self):
+        return self.length
+
+    def extend(self, records):
+        """Add records, computing the derived columns a batch at a time.
+
+        Only `batch_size` records are held at once, so source values that are
+        not columns (e.g., full note text) are dropped with each batch.
+
+        Args:
+            records (iterable): dicts, e.g., from a reporter's get_row_data
+        """
+        records = iter(records)
+        while True:
+            batch = list(islice(records, self.batch_size))
+            if not batch:
+                return
+            self.extend_batch(batch)
+
+    def extend_batch(self, batch):
+        derived = {}
+        for name, func, sources in self.derived:
+            derived[name] = list(
+                map(func, *(self.batch_values(batch, derived, s) for s in sources))
+            )
+        for field in self.fields:
+            self.columns[field.name].extend(
+                self.batch_values(batch, derived, field.name)
+            )
+        self.length += len(batch)
+
+    @staticmethod
+    def batch_values(batch, derived, name):
+        if name in derived:
+            return derived[name]
+        return [record.get(name) for record in batch]
+
+    def column(self, name):
+        return self.columns[name]
+
+    def set_column(self, field, values):
+        """Add a column, or replace the column with the same name.
+
+        Args:
+            field (Field or str): column to set
+            values (iterable): one value per row
+        """
+        field = field if isinstance(field, Field) else Field(field)
+        column = self.empty_column(field.type)
+        column.extend(values)
+        if len(column) != self.length:
+            raise ValueError(
+                f"Column {field.name} has {len(column)} values for {self.length} rows"
+            )
+        if field.name in self.columns:
+            self.fields = [f for f in self.fields if f.name != field.name]
+        self.fields.append(field)
+        self.columns[field.name] = column
+
+    def derive(self, field, func, *sources):
+        """Compute a column from each record's source values as records are added.
+
+        Derived columns are computed in the order they are added and can read
+        columns derived before them (e.g., a note's length, then the truncated
+        note). Source values that are not columns (e.g., a list of extents)
+        are read from the record and not kept.
+
+        Args:
+            field (Field or str): column to set; a new column is added if needed
+            func (callable): takes the source values and returns the column's value
+            sources (str): names of the source values
+
+        Raises:
+            ValueError: if records have already been added
+        """
+        if self.length:
+            raise ValueError("Derived columns must be added before any records")
+        field = field if isinstance(field, Field) else Field(field)
+        if field.name in self.columns:
+            self.fields = [field if f.name == field.name else f for f in self.fields]
+        else:
+            self.fields.append(field)
+        self.columns[field.name] = self.empty_column(field.type)
+        self.derived.append((field.name, func, sources))
+
+    def schema(self, names=None):
+        """Return the Field objects of columns, in order.
+
+        Args:
+            names (list, optional): column names. Defaults to all fields.
+        """
+        fields = {field.name: field for field in self.fields}
+        return [fields[name] for name in names] if names else list(self.fields)
+
+    def rows(self, names=None, header=True):
+        """Assemble rows for writing to a CSV file or Google Sheet.
+
+        Args:
+            names (list, optional): columns to include, in order. Defaults to all fields.
+            header (bool): yield the column names first
+
+        Yields:
+            list: row values
+        """
+        names = names or [f.name for f in self.fields]
+        if header:
+            yield list(names)
+        for row in zip(*(self.columns[name] for name in names)):
+            yield list(row)
+
+    def to_rows(self, names=None):
+        """Return a list of rows with a header, the format taken by the write methods of BaseAsCron."""
+        return list(self.rows(names))
+
+
+def truncate_text(value, length=280):
+    """Strip and truncate a string."""
+    return value.strip()[:length]
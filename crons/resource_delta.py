@@ -0,0 +1,122 @@
+import logging
+
+from asnake.jsonmodel import wrap_json_object
+
+from .bibid_resolver import BibidResolver
+
+
+class ResourceDelta(object):
+    """Finds the changes to one repository's resources since the last export.
+
+    Modified resources come from the `modified_since` listing. Finding aids to
+    remove are found by comparing the cache manifest with the current
+    `all_ids` listing and the delete feed, and by noting modified resources
+    whose records are now unpublished or suppressed, so no full crawl is
+    needed.
+    """
+
+    def __init__(self, as_client, repo, cache, resolver=None, delete_feed_pages=1):
+        """Set up the delta.
+
+        Args:
+            as_client (ArchivesSpaceClient): ArchivesSpace client instance
+            repo (asnake.jsonmodel.JSONModelObject): ArchivesSpace repository object
+            cache (FindingAidCache): EAD and PDF caches with their manifest
+            resolver (BibidResolver, optional): fetches modified resources in batches
+            delete_feed_pages (int): pages of the delete feed to read, most recent first
+        """
+        self.as_client = as_client
+        self.repo = repo
+        self.cache = cache
+        self.resolver = resolver or BibidResolver(as_client)
+        self.delete_feed_pages = delete_feed_pages
+        self.unpublished = {}
+
+    def modified(self, timestamp):
+        """Get published, unsuppressed resources modified since a timestamp.
+
+        Resource records are fetched in batches through the resolver, which
+        caches their bibids. Modified resources whose records are unpublished
+        or suppressed are noted for removal with their bibids.
+
+        Args:
+            timestamp (int): UNIX timestamp
+
+        Yields:
+            asnake.jsonmodel.JSONModelObject: ArchivesSpace resource
+        """
+        resource_ids = self.modified_ids(timestamp)
+        for record in self.resolver.resources(self.repo.id, resource_ids):
+            if record.get("publish") and not record.get("suppressed"):
+                yield wrap_json_object(record, self.as_client.aspace.client)
+            else:
+                self.unpublished[record["uri"]] = self.resolver.bibid(record)
+
+    def modified_ids(self, timestamp):
+        """Return the IDs of resources modified since a timestamp, published or not.
+
+        Args:
+            timestamp (int): UNIX timestamp
+        """
+        return self.as_client.aspace.client.get(
+            f"/repositories/{self.repo.id}/resources",
+            params={"all_ids": True, "modified_since": timestamp},
+        ).json()
+
+    def current_uris(self):
+        """Return the URIs of all resources ArchivesSpace lists in the repository."""
+        resource_ids = self.as_client.aspace.client.get(
+            f"/repositories/{self.repo.id}/resources", params={"all_ids": True}
+        ).json()
+        return {
+            f"/repositories/{self.repo.id}/resources/{resource_id}"
+            for resource_id in resource_ids
+        }
+
+    def deleted_uris(self):
+        """Return URIs of resources in the repository listed in the delete feed.
+
+        Returns an empty set if the ArchivesSpace version has no delete feed.
+        """
+        prefix = f"/repositories/{self.repo.id}/resources/"
+        uris = set()
+        for page in range(1, self.delete_feed_pages + 1):
+            response = self.as_client.aspace.client.get(
+                "/delete-feed", params={"page": page}
+            )
+            if not response.ok:
+                logging.info(f"Delete feed unavailable: {response.status_code}")
+                break
+            feed = response.json()
+            uris.update(uri for uri in feed["results"] if uri.startswith(prefix))
+            if feed["this_page"] >= feed["last_page"]:
+                break
+        return uris
+
+    def removed(self):
+        """Return cached finding aids whose resources were deleted, unpublished or suppressed.
+
+        Call after iterating over `modified` to include resources unpublished
+        in the same window. Unpublished resources are matched on the bibid of
+        their record, so finding aids cached without a resource URI (e.g.,
+        imported into the manifest) are removed too.
+
+        Returns:
+            dict: bibid to reason (deleted or unpublished)
+        """
+        cached = self.cache.resource_bibids(self.repo.repo_code)
+        deleted = set()
+        if cached:
+            deleted = (set(cached) - self.current_uris()) | self.deleted_uris()
+        removed = {bibid: "deleted" for uri, bibid in cached.items() if uri in deleted}
+        if self.unpublished:
+            cached_bibids = self.cache.bibids()
+            for bibid in self.unpublished.values():
+                if bibid in cached_bibids:
+                    removed.setdefault(bibid, "unpublished")
+        kept = {
+            bibid
+            for uri, bibid in cached.items()
+            if uri not in deleted and uri not in self.unpublished
+        }
+        return {bibid: r for bibid, r in removed.items() if bibid not in kept}
@@ -4,17 +4,18 @@ from pathlib import Path
 
 from .as_cron import BaseAsCron
 from .helpers import get_user_defined
+from .report_table import Field, ReportTable, truncate_text
 
 
 class ResourceReporter(BaseAsCron):
-    def __init__(self):
-        super(ResourceReporter, self).__init__("report_resources_sheet")
+    def __init__(self, as_client=None):
+        super(ResourceReporter, self).__init__("report_resources_sheet", as_client)
         logging.basicConfig(
             datefmt="%m/%d/%Y %I:%M:%S %p",
             format="%(asctime)s %(message)s",
             level=logging.INFO,
             handlers=[
-                logging.FileHandler("resource_reporter.log"),
+                logging.FileHandler("resource_reporter.log", delay=True),
                 logging.StreamHandler(),
             ],
         )
@@ -46,38 +47,55 @@ class ResourceReporter(BaseAsCron):
             "processing_status",
         ]
 
-    def create_report(self, google=False):
+    def create_report(self, google=False, diff=False):
         try:
-            spreadsheet_data = self.get_sheet_data()
-            resource_count = len(spreadsheet_data) - 1
-            logging.info(f"Total resource records: {resource_count}")
+            table = self.get_table()
+            logging.info(f"Total resource records: {len(table)}")
             if google:
                 msg = self.write_data_to_google_sheet(
-                    spreadsheet_data,
+                    table.to_rows(self.fields),
                     self.config["Google Sheets"]["resource_reporter_sheet"],
                     self.config["Google Sheets"]["resource_reporter_range"],
+                    diff=diff,
                 )
             else:
                 csv_filename = f"{datetime.now().strftime('%Y_%m_%d_%H%M')}_{Path(__file__).resolve().name.split('.')[0]}.csv"
                 csv_filepath = Path(self.config["CSV"]["outpath"], csv_filename)
-                msg = self.write_data_to_csv(spreadsheet_data, csv_filepath)
+                msg = self.write_data_to_file(
+                    table.rows(self.fields), csv_filepath, table.schema(self.fields)
+                )
             logging.info(msg)
             return msg
         except Exception as e:
             logging.error(e)
 
     def get_sheet_data(self):
-        spreadsheet_data = []
-        spreadsheet_data.append(self.fields)
-        resource_data = self.get_row_data()
-        for resource in resource_data:
-            resource_row = self.construct_row(resource)
-            spreadsheet_data.append(resource_row)
-        return spreadsheet_data
+        return self.get_table().to_rows(self.fields)
+
+    def get_table(self):
+        """Collect resource data into a ReportTable, computing the note columns per record.
+
+        Only the truncated notes and their full lengths are kept.
+
+        Returns:
+            ReportTable
+        """
+        return ReportTable.from_records(
+            self.fields,
+            self.get_row_data(),
+            derived=[
+                (Field("scopenote length", int), len, "scope note"),
+                (Field("biognote length", int), len, "bioghist note"),
+                ("scope note", truncate_text, "scope note"),
+                ("bioghist note", truncate_text, "bioghist note"),
+            ],
+        )
 
     def get_row_data(self):
         """Get resource data to be written into a row.
 
+        Notes are full text; get_table records their lengths and truncates them.
+
         Yields:
             dict
         """
@@ -102,10 +120,8 @@ class ResourceReporter(BaseAsCron):
                 "description status": get_user_defined(resource, "enum_3"),
                 "collecting area": get_user_defined(resource, "enum_4"),
                 "level": resource["level"],
-                "scope note": scope_note.strip()[:280],
-                "scopenote length": len(scope_note),
-                "bioghist note": bio_note.strip()[:280],
-                "biognote length": len(bio_note),
+                "scope note": scope_note,
+                "bioghist note": bio_note,
                 "processing_priority": (
                     resource.get("collection_management").get("processing_priority")
                     if resource.get("collection_management")
@@ -0,0 +1,151 @@
+import multiprocessing
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from lxml import etree
+
+SCHEMA_DIRECTORY = Path(__file__).parents[1].resolve() / "schemas"
+
+
+class ValidationResult(namedtuple("ValidationResult", ["valid", "errors"])):
+    """Result of validating an XML document.
+
+    valid (bool): True if the document is valid
+    errors (list): (line, message) tuples for syntax and schema errors
+    """
+
+    __slots__ = ()
+
+
+# Compiled schemas are cached per thread, since lxml validators keep per-object error logs.
+_schemas = threading.local()
+
+
+def get_schema(schema_name):
+    """Return a compiled schema, compiling it on first use in this thread.
+
+    Args:
+        schema_name (str): ead or MARC21slim
+    """
+    if not hasattr(_schemas, "compiled"):
+        _schemas.compiled = {}
+    if schema_name not in _schemas.compiled:
+        schema_doc = etree.parse(str(SCHEMA_DIRECTORY / f"{schema_name}.xsd.xml"))
+        _schemas.compiled[schema_name] = etree.XMLSchema(schema_doc)
+    return _schemas.compiled[schema_name]
+
+
+def load_schemas(schema_names):
+    """Compile schemas when a worker process starts."""
+    for schema_name in schema_names:
+        get_schema(schema_name)
+
+
+def validate_xml(xml, schema_name):
+    """Validate an XML document against the ead or MARC21slim schema.
+
+    Args:
+        xml (bytes): raw XML
+        schema_name (str): ead or MARC21slim
+
+    Returns:
+        ValidationResult
+    """
+    schema = get_schema(schema_name)
+    try:
+        root = etree.fromstring(xml)
+    except etree.XMLSyntaxError as e:
+        return ValidationResult(False, [(e.lineno, e.msg)])
+    valid = schema.validate(root)
+    errors = [(error.line, error.message) for error in schema.error_log]
+    return ValidationResult(valid, errors)
+
+
+def validate_file(path, schema_name):
+    """Validate an XML file against the ead or MARC21slim schema while parsing it.
+
+    Elements are discarded as soon as they are parsed, so memory use does not
+    grow with the size of the file. The parser stops at the first error, so an
+    invalid file is parsed again in full to report every error with its line number.
+
+    Args:
+        path (Path obj or str): XML file
+        schema_name (str): ead or MARC21slim
+
+    Returns:
+        ValidationResult
+    """
+    schema = get_schema(schema_name)
+    try:
+        for _, element in etree.iterparse(str(path), schema=schema):
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+    except etree.XMLSyntaxError:
+        with open(path, "rb") as xml_file:
+            return validate_xml(xml_file.read(), schema_name)
+    return ValidationResult(True, [])
+
+
+class ValidationService(object):
+    """Validates XML against the ead and MARC21slim schemas in a pool of processes.
+
+    Each worker compiles the schemas once when it starts and keeps them, so
+    validation uses every core and stays off the threads doing network I/O.
+    Workers are started with forkserver (spawn where it is unavailable) rather
+    than fork, since the service is created while other threads may hold locks
+    that a forked child would inherit locked.
+    """
+
+    def __init__(self, max_workers=None, schema_names=("ead", "MARC21slim")):
+        """Start the worker processes.
+
+        Args:
+            max_workers (int, optional): number of processes. Defaults to the number of CPUs.
+            schema_names (tuple): schemas each worker compiles when it starts
+        """
+        start_method = (
+            "forkserver"
+            if "forkserver" in multiprocessing.get_all_start_methods()
+            else "spawn"
+        )
+        self.executor = ProcessPoolExecutor(
+            max_workers,
+            mp_context=multiprocessing.get_context(start_method),
+            initializer=load_schemas,
+            initargs=(schema_names,),
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def submit(self, xml, schema_name):
+        """Queue an XML document for validation.
+
+        Args:
+            xml (bytes): raw XML
+            schema_name (str): ead or MARC21slim
+
+        Returns:
+            concurrent.futures.Future: resolves to a ValidationResult
+        """
+        return self.executor.submit(validate_xml, xml, schema_name)
+
+    def validate(self, xml, schema_name):
+        """Validate an XML document, waiting for the result."""
+        return self.submit(xml, schema_name).result()
+
+    def validate_file(self, path, schema_name):
+        """Validate an XML file, waiting for the result.
+
+        Only the path is sent to the worker, which reads the file itself.
+        """
+        return self.executor.submit(validate_file, path, schema_name).result()
+
+    def close(self):
+        self.executor.shutdown()
@@ -1,10 +1,18 @@
+import os
 from configparser import ConfigParser
 from pathlib import Path
 
+from asnake.jsonmodel import wrap_json_object
 from lxml import etree
 
 from .aspace_client import ArchivesSpaceClient
-from .helpers import validate_against_schema, yesterday_utc
+from .bibid_resolver import BibidResolver, catalog_bibid
+from .helpers import (
+    page_count,
+    sum_counts,
+    validate_against_schema,
+    yesterday_utc,
+)
 
 
 class UpdateAllInstances(object):
@@ -23,24 +31,56 @@ class UpdateAllInstances(object):
         self.config = ConfigParser()
         self.config.read(config_file)
 
-    def all_repos(self):
-        """Iterates through each repository in each ASpace instance."""
+    def all_repos(self, marc_file=None):
+        """Iterates through each repository in each ASpace instance.
+
+        Args:
+            marc_file (Path obj or str, optional): file to write the Voyager import to
+        """
         voyager_import = etree.Element(
             "collection", xmlns="http://www.loc.gov/MARC21/slim"
         )
         for instance_name in self.config.sections():
-            as_client = ArchivesSpaceClient(
-                self.config[instance_name]["baseurl"],
-                self.config[instance_name]["username"],
-                self.config[instance_name]["password"],
-            )
+            as_client = ArchivesSpaceClient.from_config(self.config[instance_name])
             for repo in as_client.aspace.repositories:
                 print(f"Updating {repo.name}")
                 for processed_marc_record in UpdateRepository(
                     as_client, repo
                 ).updated_marc():
                     voyager_import.append(processed_marc_record)
-        # TODO: write processed data to file
+        if marc_file:
+            write_marc_collection(voyager_import, marc_file)
+
+    def dry_run(self):
+        """Estimate the work of a run without exporting anything.
+
+        Returns:
+            dict: estimates for each repository (see UpdateRepository.dry_run) and their totals
+        """
+        timestamp = yesterday_utc()
+        estimates = {}
+        for instance_name in self.config.sections():
+            as_client = ArchivesSpaceClient.from_config(self.config[instance_name])
+            for repo in as_client.aspace.repositories:
+                estimates[repo.repo_code] = UpdateRepository(as_client, repo).dry_run(
+                    timestamp
+                )
+        return {"repositories": estimates, **sum_counts(estimates.values())}
+
+
+def write_marc_collection(marc_collection, filepath):
+    """Writes a MARCXML collection to a file, replacing it atomically.
+
+    Args:
+        marc_collection (etree.Element): MARCXML collection element
+        filepath (Path obj or str): file to write
+    """
+    filepath = Path(filepath)
+    temp_path = filepath.with_name(f".{filepath.name}.tmp")
+    etree.ElementTree(marc_collection).write(
+        str(temp_path), encoding="utf-8", xml_declaration=True
+    )
+    os.replace(temp_path, filepath)
 
 
 class UpdateRepository(object):
@@ -56,6 +96,7 @@ class UpdateRepository(object):
         }
         self.as_client = as_client
         self.repo = repo
+        self.resolver = BibidResolver(as_client, catalog_bibid)
 
     def updated_marc(self, timestamp=None):
         """Gets MARCXML for recently updated records.
@@ -68,41 +109,78 @@ class UpdateRepository(object):
         """
         timestamp = yesterday_utc() if timestamp is None else timestamp
         for resource in self.updated_resources(timestamp):
-            bibid = self.get_bibid(resource)
-            # TODO: skip if validation failed?
-            # XML schema: http://www.loc.gov/MARC21/slim http://www.loc.gov/standards/marcxml/schema/MARC21slim.xsd
-            if bibid:
-                try:
-                    marc_response = self.as_client.aspace.client.get(
-                        f"/repositories/{self.repo.id}/resources/marc21/{resource.id}.xml"
-                    )
-                    marc_record = MarcRecord(bibid, marc_response)
-                    if not marc_record.validate_marc:
-                        print(f"{bibid}: Invalid MARC")
-                    processed_marc_record = marc_record.process_cul_record()
+            try:
+                processed_marc_record = self.export_marc(resource)
+                if processed_marc_record is not None:
                     yield processed_marc_record
-                    # print(bibid)
-                    # print(marc)
-                except Exception as e:
-                    print(bibid, e)
+            except Exception as e:
+                print(resource.uri, e)
+
+    def export_marc(self, resource):
+        """Gets and processes MARCXML for a resource.
+
+        Args:
+            resource (ArchivesSpace.Resource): ArchivesSpace resource object
+
+        Returns:
+            etree.Element: processed MARCXML record, or None if the resource has no bibid
+        """
+        bibid = self.get_bibid(resource)
+        # TODO: skip if validation failed?
+        # XML schema: http://www.loc.gov/MARC21/slim http://www.loc.gov/standards/marcxml/schema/MARC21slim.xsd
+        if bibid:
+            marc_response = self.as_client.aspace.client.get(
+                f"/repositories/{self.repo.id}/resources/marc21/{resource.id}.xml"
+            )
+            marc_record = MarcRecord(bibid, marc_response)
+            if not marc_record.validate_marc:
+                print(f"{bibid}: Invalid MARC")
+            return marc_record.process_cul_record()
 
     def updated_resources(self, timestamp):
         """Retrieves recently updated resources from the repository.
 
+        Resources are fetched in batches through the resolver, which also
+        resolves their bibids.
+
         Args:
             timestamp (str): The timestamp to filter resources by modification date
 
         Yields:
             Generator: ArchivesSpace resource objects
         """
-        resource_ids = self.as_client.aspace.client.get(
+        resource_ids = self.modified_ids(timestamp)
+        for record in self.resolver.resources(self.repo.id, resource_ids):
+            if record.get("publish") and not record.get("suppressed"):
+                yield wrap_json_object(record, self.as_client.aspace.client)
+
+    def modified_ids(self, timestamp):
+        """Return the IDs of resources modified since a timestamp.
+
+        Args:
+            timestamp (int): UNIX timestamp
+        """
+        return self.as_client.aspace.client.get(
             f"/repositories/{self.repo.id}/resources",
             params={"all_ids": True, "modified_since": timestamp},
         ).json()
-        for resource_id in resource_ids:
-            resource = self.repo.resources(resource_id)
-            if resource.publish and not resource.suppressed:
-                yield resource
+
+    def dry_run(self, timestamp=None):
+        """Estimate the work of an update without exporting anything.
+
+        Args:
+            timestamp (int, optional): count resources modified since. Defaults to 24 hours ago.
+
+        Returns:
+            dict: modified resources and estimated ArchivesSpace requests (the
+                listing, record batches and one MARC export per resource)
+        """
+        timestamp = yesterday_utc() if timestamp is None else timestamp
+        count = len(self.modified_ids(timestamp))
+        return {
+            "resources": count,
+            "requests": 1 + page_count(count, self.resolver.batch_size) + count,
+        }
 
     def get_bibid(self, resource):
         """Retrieves the bibid from a resource.
@@ -113,15 +191,7 @@ class UpdateRepository(object):
         Returns:
             str: The bibid if found, otherwise False
         """
-        if resource.id_0.isnumeric():
-            return resource.id_0
-        elif getattr(resource, "user_defined"):
-            if getattr(resource.user_defined, "integer_1"):
-                return resource.user_defined.integer_1
-            else:
-                return False
-        else:
-            return False
+        return self.resolver.bibid(resource.json())
 
 
 class MarcRecord(object):
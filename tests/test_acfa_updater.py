@@ -1,7 +1,16 @@
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from shutil import rmtree
 from unittest import TestCase
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
+
+from lxml import etree
 
 from crons.acfa_updater import UpdateAllInstances, UpdateRepository
+from crons.checkpoint import CheckpointJournal
+from crons.finding_aid_cache import FindingAidCache
+from crons.validation import ValidationResult
+from crons.voyager_updater import write_marc_collection
 
 
 class TestUpdateAllInstances(TestCase):
@@ -9,6 +18,34 @@ class TestUpdateAllInstances(TestCase):
     def test_init(self, mock_aspace):
         updated_instances = UpdateAllInstances("tmp/parent_cache")
         self.assertTrue(updated_instances)
+        self.assertFalse(Path("tmp").exists())
+
+    @patch("crons.voyager_updater.UpdateRepository.updated_marc")
+    @patch("crons.acfa_updater.UpdateRepository.daily_update", return_value=[])
+    @patch("crons.acfa_updater.ArchivesSpaceClient.from_config")
+    def test_update_instance_marc(self, mock_client, mock_daily_update, mock_marc):
+        """Unpublished repositories get a MARC-only pass."""
+        repos = [MagicMock(publish=True), MagicMock(publish=False)]
+        mock_client.return_value.aspace.repositories = repos
+        mock_marc.side_effect = lambda timestamp: [etree.Element("record")]
+        updater = UpdateAllInstances("tmp/parent_cache")
+        updater.config.read_dict(
+            {
+                "CUL": {
+                    "email_from": "from@example.com",
+                    "email_to": "to@example.com",
+                    "email_server": "smtp",
+                }
+            }
+        )
+        marc_collection = etree.Element("collection")
+        journal = MagicMock(timestamp=1701302400)
+        updater.update_instance("CUL", "api_key", journal, None, marc_collection)
+        mock_daily_update.assert_called_once_with(1701302400, journal)
+        mock_marc.assert_called_once_with(1701302400)
+        self.assertEqual(len(marc_collection), 1)
+        updater.update_instance("CUL", "api_key", journal, None)
+        self.assertEqual(mock_marc.call_count, 1)
 
 
 class TestUpdateRepository(TestCase):
@@ -18,3 +55,324 @@ class TestUpdateRepository(TestCase):
             mock_aspace, "api_key", "repo", "tmp/parent_cache"
         )
         self.assertTrue(updated_repositories)
+        self.assertFalse(Path("tmp").exists())
+
+    @patch("crons.acfa_updater.UpdateRepository.update_index")
+    @patch("crons.acfa_updater.UpdateRepository.updated_resources")
+    def test_daily_update_resume(self, mock_updated, mock_update_index):
+        resource = MagicMock(uri="/repositories/2/resources/1", id=1)
+        mock_updated.return_value = [resource]
+        as_client = MagicMock()
+        journal = CheckpointJournal.start("tmp/checkpoints", 1701302400)
+        journal.record(resource.uri, "ead", 1, "cul-123")
+        journal.record(resource.uri, "pdf", 1, "cul-123")
+        errors = UpdateRepository(
+            "api_key", as_client, MagicMock(repo_code="nnc-rb"), "tmp/parent_cache"
+        ).daily_update(journal.timestamp, journal)
+        rmtree("tmp")
+        self.assertEqual(errors, [])
+        as_client.aspace.client.get.assert_not_called()
+        mock_update_index.assert_called_once_with(["cul-123"])
+        self.assertTrue(journal.completed(resource.uri, "index"))
+
+    @patch("crons.acfa_updater.ResourceDelta.removed", return_value={})
+    @patch("crons.acfa_updater.validate_file", return_value=ValidationResult(True, []))
+    @patch("crons.acfa_updater.UpdateRepository.create_pdf_job")
+    @patch("crons.acfa_updater.UpdateRepository.update_index")
+    @patch("crons.acfa_updater.UpdateRepository.updated_resources")
+    def test_daily_update(
+        self,
+        mock_updated,
+        mock_update_index,
+        mock_pdf,
+        mock_valid,
+        mock_removed,
+    ):
+        resources = [
+            MagicMock(
+                uri=f"/repositories/2/resources/{i}",
+                id=i,
+                id_0=f"{i}00",
+                **{
+                    "json.return_value": {
+                        "uri": f"/repositories/2/resources/{i}",
+                        "id_0": f"{i}00",
+                    }
+                },
+            )
+            for i in range(1, 4)
+        ]
+        mock_updated.return_value = resources
+        pdf_response = MagicMock(**{"iter_content.return_value": [b"%PDF"]})
+
+        def create_pdf_job(resource_id):
+            if resource_id == 2:
+                raise Exception("PDF export failed!")
+            return pdf_response
+
+        mock_pdf.side_effect = create_pdf_job
+        as_client = MagicMock()
+        as_client.aspace.client.get.return_value.iter_content.return_value = [b"<ead/>"]
+        for cache in ["ead_cache", "pdf_cache"]:
+            Path("tmp/parent_cache", cache).mkdir(parents=True)
+        errors = UpdateRepository(
+            "api_key", as_client, MagicMock(repo_code="nnc-rb"), "tmp/parent_cache"
+        ).daily_update(1701302400)
+        ead = Path("tmp/parent_cache/ead_cache/as_ead_cul-200.xml").read_bytes()
+        pdf = Path("tmp/parent_cache/pdf_cache/as_ead_cul-300.pdf").read_bytes()
+        cached = FindingAidCache("tmp/parent_cache").bibids()
+        rmtree("tmp")
+        self.assertEqual(
+            errors,
+            ["Error when processing cul-200 (nnc-rb): PDF export failed!"],
+        )
+        self.assertEqual(ead, b"<ead/>")
+        self.assertEqual(pdf, b"%PDF")
+        self.assertEqual(cached, {"cul-100", "cul-200", "cul-300"})
+        self.assertEqual(mock_valid.call_count, 3)
+        indexed = [b for c in mock_update_index.call_args_list for b in c.args[0]]
+        self.assertEqual(sorted(indexed), ["cul-100", "cul-300"])
+
+    @patch("crons.acfa_updater.ResourceDelta.removed", return_value={})
+    @patch("crons.acfa_updater.validate_file", side_effect=OSError("Disk error"))
+    @patch("crons.acfa_updater.UpdateRepository.create_pdf_job")
+    @patch("crons.acfa_updater.UpdateRepository.update_index")
+    @patch("crons.acfa_updater.UpdateRepository.updated_resources")
+    def test_daily_update_validation_error(
+        self, mock_updated, mock_update_index, mock_pdf, mock_valid, mock_removed
+    ):
+        """A finding aid whose EAD cannot be validated is reported and still indexed."""
+        resource = MagicMock(
+            uri="/repositories/2/resources/1",
+            id=1,
+            id_0="100",
+            **{
+                "json.return_value": {
+                    "uri": "/repositories/2/resources/1",
+                    "id_0": "100",
+                }
+            },
+        )
+        mock_updated.return_value = [resource]
+        mock_pdf.return_value.iter_content.return_value = [b"%PDF"]
+        as_client = MagicMock()
+        as_client.aspace.client.get.return_value.iter_content.return_value = [b"<ead/>"]
+        errors = UpdateRepository(
+            "api_key", as_client, MagicMock(repo_code="nnc-rb"), "tmp/parent_cache"
+        ).daily_update(1701302400)
+        rmtree("tmp")
+        self.assertEqual(
+            errors,
+            [
+                "Error when processing cul-100 (nnc-rb): EAD could not be validated: Disk error"
+            ],
+        )
+        mock_update_index.assert_called_once_with(["cul-100"])
+
+    @patch("crons.acfa_updater.validate_file", return_value=ValidationResult(True, []))
+    def test_validate_broken_pool(self, mock_valid):
+        """Validation moves into the stage's threads if the worker processes die."""
+        validation_service = MagicMock()
+        validation_service.validate_file.side_effect = BrokenProcessPool("killed")
+        updater = UpdateRepository(
+            "api_key",
+            MagicMock(),
+            MagicMock(repo_code="nnc-rb"),
+            "tmp/parent_cache",
+            validation_service,
+        )
+        updater.errors = []
+        for bibid in ["cul-1", "cul-2"]:
+            item = {"bibid": bibid, "ead_path": f"{bibid}.xml"}
+            self.assertEqual(updater.validate_ead(item), item)
+        self.assertEqual(validation_service.validate_file.call_count, 1)
+        self.assertEqual(mock_valid.call_count, 2)
+        self.assertEqual(updater.errors, [])
+
+    @patch("crons.acfa_updater.UpdateRepository.remove_from_index")
+    @patch("crons.acfa_updater.ResourceDelta.removed")
+    def test_remove_finding_aids(self, mock_removed, mock_remove_from_index):
+        mock_removed.return_value = {"cul-2": "unpublished", "cul-1": "deleted"}
+        mock_remove_from_index.return_value.ok = True
+        updater = self.cached_updater()
+        updater.errors = []
+        updater.remove_finding_aids()
+        cached = updater.cache.bibids()
+        rmtree("tmp")
+        self.assertEqual(cached, {"cul-3", "cul-4", "cul-5", "cul-6"})
+        mock_remove_from_index.assert_called_once_with(["cul-1", "cul-2"])
+        self.assertEqual(updater.errors, [])
+
+    def cached_updater(self):
+        """Return an updater whose cache has cul-1 to cul-5 in nnc-rb and cul-6 in nnc-a."""
+        updater = UpdateRepository(
+            "api_key",
+            MagicMock(),
+            MagicMock(id=2, repo_code="nnc-rb"),
+            "tmp/parent_cache",
+        )
+        for bibid in ["cul-1", "cul-2", "cul-3", "cul-4", "cul-5"]:
+            response = MagicMock()
+            response.iter_content.return_value = [b"<ead/>"]
+            updater.cache.write("ead", bibid, response, "nnc-rb")
+        updater.cache.write("ead", "cul-6", response, "nnc-a")
+        return updater
+
+    @patch("crons.acfa_updater.UpdateRepository.remove_from_index")
+    @patch("crons.bibid_resolver.BibidResolver.resources")
+    def test_garbage_collect(self, mock_resources, mock_remove_from_index):
+        mock_remove_from_index.return_value.ok = True
+        mock_resources.return_value = [
+            {"uri": f"/repositories/2/resources/{i}", "id_0": str(i), "publish": True}
+            for i in [1, 2, 3, 4]
+        ]
+        updater = self.cached_updater()
+        updater.gc_max_fraction = 0.2
+        errors = updater.garbage_collect()
+        cached = updater.cache.bibids()
+        rmtree("tmp")
+        self.assertEqual(errors, [])
+        self.assertEqual(cached, {"cul-1", "cul-2", "cul-3", "cul-4", "cul-6"})
+        mock_remove_from_index.assert_called_once_with(["cul-5"])
+        updater.as_client.record_ids.assert_called_once_with(
+            "/repositories/2/resources"
+        )
+
+    @patch("crons.acfa_updater.UpdateRepository.remove_from_index")
+    @patch("crons.bibid_resolver.BibidResolver.resources")
+    def test_garbage_collect_limit(self, mock_resources, mock_remove_from_index):
+        """Nothing is removed if too many finding aids look unpublished."""
+        mock_resources.return_value = [
+            {"uri": "/repositories/2/resources/1", "id_0": "1", "publish": True},
+            {"uri": "/repositories/2/resources/2", "id_0": "2", "publish": False},
+        ]
+        updater = self.cached_updater()
+        errors = updater.garbage_collect()
+        cached = updater.cache.bibids()
+        rmtree("tmp")
+        self.assertEqual(len(cached), 6)
+        mock_remove_from_index.assert_not_called()
+        self.assertEqual(
+            errors,
+            [
+                "Not removing 4 of 5 cached finding aids (nnc-rb): more than 10% are not published"
+            ],
+        )
+
+    @patch("crons.acfa_updater.UpdateRepository.remove_from_index")
+    def test_remove_deleted_and_unpublished(self, mock_remove_from_index):
+        """Finding aids are removed through the delete feed, listing and records."""
+        mock_remove_from_index.return_value.ok = True
+
+        def mock_get(uri, params=None):
+            response = MagicMock(ok=True)
+            params = params or {}
+            if params.get("id_set[]"):
+                response.json.return_value = [
+                    {
+                        "jsonmodel_type": "resource",
+                        "uri": f"/repositories/2/resources/{i}",
+                        "id_0": str(i),
+                        "publish": i == 1,
+                        "suppressed": False,
+                    }
+                    for i in params["id_set[]"]
+                ]
+            elif uri == "/delete-feed":
+                response.json.return_value = {
+                    "this_page": 1,
+                    "last_page": 1,
+                    "results": ["/repositories/2/resources/3"],
+                }
+            elif uri == "/repositories/2/search":
+                response.json.return_value = {
+                    "last_page": 1,
+                    "results": [
+                        {"id": "/repositories/2/resources/1", "identifier": "1"}
+                    ],
+                }
+            elif params.get("modified_since"):
+                response.json.return_value = [1, 4, 7]
+            else:
+                response.json.return_value = [1, 3, 4, 7]
+            return response
+
+        as_client = MagicMock()
+        as_client.aspace.client.get.side_effect = mock_get
+        updater = UpdateRepository(
+            "api_key",
+            as_client,
+            MagicMock(id=2, repo_code="nnc-rb"),
+            "tmp/parent_cache",
+        )
+        updater.errors = []
+        for i in [1, 3, 4, 5]:
+            updater.cache.write(
+                "ead",
+                f"cul-{i}",
+                MagicMock(**{"iter_content.return_value": [b"<ead/>"]}),
+                "nnc-rb",
+                f"/repositories/2/resources/{i}",
+            )
+        updater.cache.write(
+            "pdf", "cul-7", MagicMock(**{"iter_content.return_value": [b"%PDF"]})
+        )
+        modified = [r.uri for r in updater.updated_resources(1701302400)]
+        updater.remove_finding_aids()
+        cached = updater.cache.bibids()
+        files = sorted(p.name for p in Path("tmp/parent_cache").rglob("as_ead_*"))
+        rmtree("tmp")
+        self.assertEqual(modified, ["/repositories/2/resources/1"])
+        self.assertEqual(cached, {"cul-1"})
+        self.assertEqual(files, ["as_ead_cul-1.xml"])
+        mock_remove_from_index.assert_called_once_with(
+            ["cul-3", "cul-4", "cul-5", "cul-7"]
+        )
+        self.assertEqual(updater.errors, [])
+
+    @patch("crons.acfa_updater.ResourceDelta.removed", return_value={})
+    @patch("crons.voyager_updater.UpdateRepository.export_marc")
+    @patch("crons.acfa_updater.UpdateRepository.updated_resources")
+    def test_daily_update_marc(self, mock_updated, mock_export_marc, mock_removed):
+        journal = CheckpointJournal.start("tmp/checkpoints", 1701302400)
+        resources = []
+        for i in range(1, 4):
+            resources.append(MagicMock(uri=f"/repositories/2/resources/{i}", id=i))
+            if i != 2:
+                for stage in ["ead", "pdf", "index"]:
+                    journal.record(resources[-1].uri, stage, 1, f"cul-{i}00")
+        resources[1].json.return_value = {
+            "uri": resources[1].uri,
+            "id_0": "200",
+        }
+        mock_updated.return_value = resources
+        mock_export_marc.side_effect = lambda resource: etree.Element("record")
+        marc_collection = etree.Element("collection")
+        as_client = MagicMock()
+        as_client.aspace.client.get.side_effect = Exception("Connection refused")
+        errors = UpdateRepository(
+            "api_key",
+            as_client,
+            MagicMock(repo_code="nnc-rb"),
+            "tmp/parent_cache",
+            marc_collection=marc_collection,
+        ).daily_update(journal.timestamp, journal)
+        write_marc_collection(marc_collection, "tmp/voyager.xml")
+        written = etree.parse("tmp/voyager.xml").getroot()
+        rmtree("tmp")
+        self.assertEqual(
+            errors, ["Error when processing cul-200 (nnc-rb): Connection refused"]
+        )
+        self.assertEqual(mock_export_marc.call_count, 3)
+        self.assertEqual(len(written), 3)
+
+    @patch("crons.acfa_updater.ResourceDelta.modified_ids", return_value=[1, 2, 3])
+    def test_dry_run(self, mock_modified_ids):
+        estimate = UpdateRepository(
+            "api_key", MagicMock(), MagicMock(repo_code="nnc-rb"), "tmp/parent_cache"
+        ).dry_run(1701302400)
+        mock_modified_ids.assert_called_once_with(1701302400)
+        self.assertEqual(
+            estimate, {"resources": 3, "requests": 22, "index_requests": 1}
+        )
+        self.assertFalse(Path("tmp").exists())
@@ -0,0 +1,74 @@
+from configparser import ConfigParser
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from crons.aspace_client import ArchivesSpaceClient, JsonCache
+from crons.rate_limiter import RateLimiter
+
+
+class TestArchivesSpaceClient(TestCase):
+    @patch("crons.aspace_client.ArchivesSpaceClient.get_json_response")
+    @patch("crons.aspace_client.ASpace")
+    def test_get_cached_json_response(self, mock_aspace, mock_get_json):
+        mock_get_json.return_value = {"uri": "/repositories/2/resources/1"}
+        as_client = ArchivesSpaceClient(
+            "https://aspace/api", "user", "password", RateLimiter(5)
+        )
+        mock_aspace.return_value.client.session.mount.assert_called_once()
+        for _ in range(3):
+            resource = as_client.get_cached_json_response("/repositories/2/resources/1")
+        self.assertEqual(resource, {"uri": "/repositories/2/resources/1"})
+        mock_get_json.assert_called_once_with("/repositories/2/resources/1")
+
+    @patch("crons.aspace_client.ASpace")
+    def test_from_config(self, mock_aspace):
+        config = ConfigParser()
+        config.read_dict(
+            {
+                "CUL": {
+                    "baseurl": "https://aspace/api",
+                    "username": "user",
+                    "password": "password",
+                    "requests_per_second": "5",
+                    "max_requests_per_second": "20",
+                    "max_retries": "3",
+                }
+            }
+        )
+        as_client = ArchivesSpaceClient.from_config(config["CUL"])
+        mock_aspace.assert_called_once_with(
+            baseurl="https://aspace/api", username="user", password="password"
+        )
+        self.assertEqual(as_client.rate_limiter.rate, 5)
+        self.assertEqual(as_client.rate_limiter.max_rate, 20)
+        adapter = mock_aspace.return_value.client.session.mount.call_args.args[1]
+        self.assertEqual(adapter.retries, 3)
+
+    @patch("crons.aspace_client.ASpace")
+    def test_cache_resources(self, mock_aspace):
+        resource = MagicMock()
+        resource.json.return_value = {
+            "uri": "/repositories/2/resources/1",
+            "id_0": "1234",
+            "notes": [],
+        }
+        mock_aspace.return_value.repositories = [MagicMock(resources=[resource])]
+        as_client = ArchivesSpaceClient("https://aspace/api", "user", "password")
+        list(as_client.all_resources())
+        self.assertEqual(len(as_client.json_cache), 0)
+        as_client.cache_resources = True
+        self.assertEqual(list(as_client.all_resources()), [resource.json.return_value])
+        self.assertEqual(
+            as_client.get_cached_json_response("/repositories/2/resources/1"),
+            {"uri": "/repositories/2/resources/1", "id_0": "1234"},
+        )
+
+    def test_json_cache(self):
+        json_cache = JsonCache(2)
+        json_cache.set("/a", {"uri": "/a"})
+        json_cache.set("/b", {"uri": "/b"})
+        json_cache.get("/a")
+        json_cache.set("/c", {"uri": "/c"})
+        self.assertIsNone(json_cache.get("/b"))
+        self.assertEqual(json_cache.get("/a"), {"uri": "/a"})
+        self.assertEqual(len(json_cache), 2)
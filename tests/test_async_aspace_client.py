@@ -0,0 +1,53 @@
+import asyncio
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from crons.async_aspace_client import AsyncArchivesSpaceClient, SyncArchivesSpaceClient
+
+RECORDS = {
+    "/repositories": [{"uri": "/repositories/2"}, {"uri": "/repositories/3"}],
+    "/repositories/2/resources": [1, 2],
+    "/repositories/3/resources": [1],
+    "/repositories/2/resources/1": {"title": "One", "publish": True},
+    "/repositories/2/resources/2": {
+        "jsonmodel_type": "resource",
+        "uri": "/repositories/2/resources/2",
+        "title": "Two",
+        "publish": True,
+        "ead_location": "https://findingaids.library.columbia.edu/ead/2",
+    },
+    "/repositories/3/resources/1": {"title": "Three", "publish": False},
+}
+
+
+def mock_get(uri, params=None):
+    response = MagicMock()
+    response.json.return_value = RECORDS[uri]
+    return response
+
+
+class TestAsyncArchivesSpaceClient(TestCase):
+    @patch("crons.async_aspace_client.ASpace")
+    def test_all_resources(self, mock_aspace):
+        mock_aspace.return_value.client.get.side_effect = mock_get
+        async_client = AsyncArchivesSpaceClient(
+            "https://aspace/api", "user", "password", concurrency=2
+        )
+
+        async def collect():
+            return [r["title"] async for r in async_client.all_resources()]
+
+        titles = asyncio.run(collect())
+        self.assertEqual(sorted(titles), ["One", "Three", "Two"])
+        mock_aspace.return_value.client.get.assert_any_call(
+            "/repositories/2/resources", params={"all_ids": True}
+        )
+
+    @patch("crons.async_aspace_client.ASpace")
+    def test_sync_adapter(self, mock_aspace):
+        mock_aspace.return_value.client.get.side_effect = mock_get
+        as_client = SyncArchivesSpaceClient("https://aspace/api", "user", "password")
+        self.assertEqual(len(list(as_client.all_resources())), 3)
+        published = list(as_client.published_resources(2))
+        self.assertEqual(len(published), 1)
+        self.assertEqual(published[0].title, "Two")
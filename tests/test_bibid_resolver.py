@@ -0,0 +1,37 @@
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from crons.bibid_resolver import BibidResolver, catalog_bibid, finding_aid_bibid
+
+
+class TestBibidResolver(TestCase):
+    def test_finding_aid_bibid(self):
+        for resource, bibid in [
+            ({"id_0": "4078773"}, "cul-4078773"),
+            ({"id_0": "in00001"}, "cul-in00001"),
+            ({"id_0": "MS", "id_1": "0123"}, "MS-0123"),
+            ({"id_0": "MS", "id_1": "0123", "id_2": "A"}, "MS-0123-A"),
+        ]:
+            self.assertEqual(finding_aid_bibid(resource), bibid)
+
+    def test_catalog_bibid(self):
+        self.assertEqual(catalog_bibid({"id_0": "4078773"}), "4078773")
+        self.assertEqual(
+            catalog_bibid({"id_0": "MS", "user_defined": {"integer_1": "123"}}), "123"
+        )
+        self.assertFalse(catalog_bibid({"id_0": "MS"}))
+
+    def test_resources(self):
+        as_client = MagicMock()
+        as_client.aspace.client.get.return_value.json.side_effect = [
+            [{"uri": "/repositories/2/resources/2", "id_0": "200"}],
+            [{"uri": "/repositories/2/resources/3", "id_0": "MS", "id_1": "3"}],
+        ]
+        resolver = BibidResolver(as_client, batch_size=2)
+        records = list(resolver.resources(2, [1, 2, 3]))
+        self.assertEqual([r["id_0"] for r in records], ["200", "MS"])
+        self.assertEqual(
+            [c.kwargs["params"] for c in as_client.aspace.client.get.call_args_list],
+            [{"id_set[]": [1, 2]}, {"id_set[]": [3]}],
+        )
+        self.assertEqual(resolver.bibids["/repositories/2/resources/3"], "MS-3")
@@ -0,0 +1,28 @@
+from pathlib import Path
+from shutil import rmtree
+from unittest import TestCase
+
+from crons.checkpoint import CheckpointJournal
+
+CHECKPOINT_DIRECTORY = "tmp/checkpoints"
+
+
+class TestCheckpointJournal(TestCase):
+    def tearDown(self):
+        rmtree("tmp", ignore_errors=True)
+
+    def test_resume(self):
+        self.assertIsNone(CheckpointJournal.latest_unfinished(CHECKPOINT_DIRECTORY))
+        journal = CheckpointJournal.start(CHECKPOINT_DIRECTORY, 1701302400)
+        journal.record("/repositories/2/resources/1", "ead", 1.5, "cul-123")
+        journal.record("/repositories/2/resources/1", "pdf", 30, "cul-123")
+        resumed = CheckpointJournal.latest_unfinished(CHECKPOINT_DIRECTORY)
+        self.assertEqual(resumed.path, journal.path)
+        self.assertEqual(resumed.timestamp, 1701302400)
+        self.assertTrue(resumed.completed("/repositories/2/resources/1", "pdf"))
+        self.assertFalse(resumed.completed("/repositories/2/resources/1", "index"))
+        self.assertEqual(resumed.bibids["/repositories/2/resources/1"], "cul-123")
+        self.assertEqual(resumed.summary(), "ead: 1.5s, pdf: 30.0s")
+        resumed.finish()
+        self.assertIsNone(CheckpointJournal.latest_unfinished(CHECKPOINT_DIRECTORY))
+        self.assertEqual(len(Path(resumed.path).read_text().splitlines()), 4)
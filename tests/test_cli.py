@@ -0,0 +1,71 @@
+import io
+import json
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+from crons.cli import get_parser, main, run_job, run_job_process
+
+
+class TestCli(TestCase):
+    def run_main(self, argv):
+        stdout = io.StringIO()
+        with redirect_stdout(stdout):
+            status = main(argv)
+        return status, [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+    @patch("crons.cli.run_job_process")
+    def test_main(self, mock_run_job_process):
+        mock_run_job_process.side_effect = lambda name, args: {
+            "job": name,
+            "status": "failed" if name == "fa-lists" else "ok",
+        }
+        status, summaries = self.run_main(
+            ["fa-lists", "daily-report", "fa-lists", "--jobs", "2", "--dry-run"]
+        )
+        self.assertEqual(status, 1)
+        self.assertEqual([s["job"] for s in summaries], ["fa-lists", "daily-report"])
+
+    @patch("crons.fa_list_generator.FindingAidLists.dry_run")
+    @patch("crons.fa_list_generator.FindingAidLists.__init__", return_value=None)
+    @patch("crons.daily_report.DailyReport.dry_run")
+    @patch("crons.daily_report.DailyReport.__init__", return_value=None)
+    def test_dry_run(
+        self, mock_report_init, mock_report_dry_run, mock_lists_init, mock_lists_dry_run
+    ):
+        mock_report_dry_run.return_value = {"resources": 3, "requests": 1}
+        mock_lists_dry_run.side_effect = Exception("Connection refused")
+        args = get_parser().parse_args(["fa-lists", "daily-report", "--dry-run"])
+        summaries = [run_job(name, args) for name in args.job_names]
+        self.assertEqual(summaries[0]["status"], "failed")
+        self.assertEqual(summaries[0]["error"], "Connection refused")
+        self.assertEqual(summaries[1]["status"], "ok")
+        self.assertEqual(summaries[1]["result"], {"resources": 3, "requests": 1})
+        self.assertTrue(summaries[1]["dry_run"])
+        self.assertIsInstance(summaries[1]["seconds"], float)
+
+    @patch("crons.report_runner.ReportRunner.run", return_value=["Wrote 2 rows"])
+    @patch("crons.report_runner.ReportRunner.__init__", return_value=None)
+    def test_run(self, mock_init, mock_run):
+        summary = run_job(
+            "reports", get_parser().parse_args(["reports", "--format", "jsonl"])
+        )
+        self.assertEqual(summary["status"], "ok")
+        mock_init.assert_called_once_with(output_format="jsonl")
+        mock_run.assert_called_once_with(False, False)
+        self.assertEqual(summary["result"], ["Wrote 2 rows"])
+
+    def test_run_job_process(self):
+        """A dry run in its own process reports back and creates no log files."""
+        logs = set(Path().glob("*.log"))
+        summary = run_job_process(
+            "voyager", get_parser().parse_args(["voyager", "--dry-run"])
+        )
+        self.assertEqual(summary["job"], "voyager")
+        self.assertIn("status", summary)
+        self.assertEqual(set(Path().glob("*.log")), logs)
+
+    def test_acfa_arguments(self):
+        with redirect_stdout(io.StringIO()), self.assertRaises(SystemExit):
+            main(["acfa", "--dry-run"])
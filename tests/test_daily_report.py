@@ -0,0 +1,120 @@
+import csv
+import gzip
+import io
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from crons.daily_report import DailyReport, ReportRenderer, Repository
+
+
+def mock_search(uri, params):
+    repo_id = int(uri.split("/")[2])
+    page = params["page"]
+    response = MagicMock()
+    response.json.return_value = {
+        "this_page": page,
+        "last_page": repo_id,
+        "results": [
+            {
+                "title": f"Papers {repo_id}.{page}",
+                "identifier": f"{repo_id}{page}",
+                "publish": page == 1,
+                "system_mtime": "2023-11-30T12:00:00Z",
+            }
+        ],
+    }
+    return response
+
+
+class TestReportRenderer(TestCase):
+    def test_construct_body(self):
+        repo = MagicMock()
+        repo.name = "Rare Book & Manuscript Library"
+        repository = Repository(MagicMock(), repo, 1701302400)
+        repository.published_resources = [
+            {
+                "repo": repo.name,
+                "title": f"Papers {i}",
+                "id_0": str(i),
+                "published": True,
+                "mtime": "2023-11-30T12:00:00Z",
+            }
+            for i in range(3)
+        ]
+        renderer = ReportRenderer(inline_limit=2)
+        renderer.write("Header")
+        repository.construct_body(renderer)
+        self.assertEqual(
+            renderer.body(),
+            "Header\n\n3 published resource records and 0 unpublished resource records updated in Rare Book & Manuscript Library:\n- Papers 0 (0)\n- Papers 1 (1)\n\n1 more resource records are listed in the attached updated_resources.csv.gz.\n",
+        )
+        rows = list(
+            csv.DictReader(io.StringIO(gzip.decompress(renderer.attachment()).decode()))
+        )
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["title"], "Papers 2")
+        self.assertEqual(rows[0]["published"], "True")
+
+    def test_no_overflow(self):
+        renderer = ReportRenderer()
+        repo = MagicMock()
+        repo.name = "Burke Library"
+        Repository(MagicMock(), repo, 1701302400).construct_body(renderer)
+        self.assertEqual(
+            renderer.body(), "\n0 resource records updated in Burke Library\n"
+        )
+        self.assertIsNone(renderer.attachment())
+
+
+class TestDailyReport(TestCase):
+    @patch("crons.daily_report.DailyReport.send_report_email")
+    @patch("crons.daily_report.DailyReport.__init__", return_value=None)
+    def test_run(self, mock_init, mock_send):
+        daily_report = DailyReport()
+        daily_report.inline_limit = 500
+        daily_report.as_client = MagicMock()
+        daily_report.as_client.aspace.client.get.side_effect = mock_search
+        repos = [MagicMock(id=i, publish=i != 3) for i in [4, 2, 3]]
+        for repo in repos:
+            repo.name = f"Repository {repo.id}"
+        daily_report.as_client.aspace.repositories = repos
+        self.assertEqual(
+            daily_report.run(), "Sent report of 6 updated resource records"
+        )
+        record_count, body, attachment = mock_send.call_args.args
+        self.assertEqual(record_count, 6)
+        self.assertLess(body.index("Repository 4"), body.index("Repository 2"))
+        self.assertNotIn("Repository 3", body)
+        self.assertIn(
+            "1 published resource records and 3 unpublished resource records updated in Repository 4:\n- Papers 4.1 (41)\n- Papers 4.2 (42)",
+            body,
+        )
+        self.assertIsNone(attachment)
+        search_params = daily_report.as_client.aspace.client.get.call_args.kwargs[
+            "params"
+        ]
+        self.assertEqual(
+            search_params["fields[]"],
+            ["title", "identifier", "publish", "system_mtime"],
+        )
+
+    @patch("crons.daily_report.DailyReport.send_report_email")
+    @patch("crons.daily_report.DailyReport.__init__", return_value=None)
+    def test_run_failed(self, mock_init, mock_send):
+        daily_report = DailyReport()
+        daily_report.inline_limit = 500
+        daily_report.as_client = MagicMock()
+        daily_report.as_client.aspace.repositories = [MagicMock(publish=True)]
+        daily_report.as_client.aspace.client.get.side_effect = OSError("No route")
+        with self.assertRaises(OSError):
+            daily_report.run()
+        mock_send.assert_not_called()
+
+    def test_dry_run(self):
+        as_client = MagicMock()
+        as_client.aspace.client.get.return_value.json.return_value = {"total_hits": 501}
+        estimate = Repository(as_client, MagicMock(id=2), 1701302400).dry_run()
+        self.assertEqual(estimate, {"resources": 501, "requests": 3})
+        self.assertEqual(
+            as_client.aspace.client.get.call_args.kwargs["params"]["page_size"], 1
+        )
@@ -0,0 +1,194 @@
+import gzip
+import json
+from pathlib import Path
+from shutil import rmtree
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from crons.bibid_resolver import BibidResolver
+from crons.fa_list_generator import FindingAidLists, finding_aid_titles
+from crons.fa_list_index import FindingAidList, FindingAidListIndex
+
+
+def resource_record(resource_id, title, **kwargs):
+    record = {
+        "jsonmodel_type": "resource",
+        "uri": f"/repositories/2/resources/{resource_id}",
+        "id_0": str(resource_id),
+        "title": title,
+        "dates": [],
+        "publish": True,
+        "suppressed": False,
+        "ead_location": "https://example.com",
+    }
+    record.update(kwargs)
+    return record
+
+
+class TestFindingAidList(TestCase):
+    def test_add_remove(self):
+        finding_aid_list = FindingAidList({"/r/1": ("Beta", "1")})
+        finding_aid_list.add("/r/2", "Alpha", "2")
+        finding_aid_list.add("/r/3", "Gamma", "3")
+        finding_aid_list.add("/r/1", "Delta", "1")
+        self.assertEqual(
+            finding_aid_list.items(), [("Alpha", "2"), ("Delta", "1"), ("Gamma", "3")]
+        )
+        self.assertTrue(finding_aid_list.remove("/r/2"))
+        self.assertFalse(finding_aid_list.remove("/r/2"))
+        self.assertEqual(finding_aid_list.items(), [("Delta", "1"), ("Gamma", "3")])
+
+
+class TestFindingAidListIndex(TestCase):
+    def setUp(self):
+        Path("tmp").mkdir()
+
+    def tearDown(self):
+        rmtree("tmp")
+
+    def test_version(self):
+        index = FindingAidListIndex("tmp/.fa_list_index.json")
+        index.get_list("nnc-rb").add("/r/1", "A", "a")
+        index.save(1701302400)
+        index = FindingAidListIndex("tmp/.fa_list_index.json")
+        self.assertEqual(index.timestamp, 1701302400)
+        self.assertEqual(index.get_list("nnc-rb").items(), [("A", "a")])
+
+        with patch.object(FindingAidListIndex, "version", 2):
+            index = FindingAidListIndex("tmp/.fa_list_index.json")
+        self.assertIsNone(index.timestamp)
+        self.assertEqual(index.lists, {})
+        self.assertEqual(index.digests, {})
+
+        Path("tmp/.fa_list_index.json").write_text(
+            json.dumps({"timestamp": 1701302400, "digests": {}, "lists": {}})
+        )
+        self.assertIsNone(FindingAidListIndex("tmp/.fa_list_index.json").timestamp)
+
+
+class TestFindingAidTitles(TestCase):
+    def test_finding_aid_titles(self):
+        inclusive = {"date_type": "inclusive", "begin": "1900", "end": "1950"}
+        bulk = {"date_type": "bulk", "expression": "1920-1930"}
+        titles = finding_aid_titles(
+            [
+                {"title": "Papers", "dates": []},
+                {"title": "Papers,", "dates": [inclusive]},
+                {"title": "Records", "dates": [inclusive, bulk]},
+                {"title": "Records", "dates": [inclusive, inclusive]},
+            ]
+        )
+        self.assertEqual(
+            titles,
+            [
+                "Papers",
+                "Papers, 1900-1950",
+                "Records, 1900-1950 (bulk 1920-1930)",
+                "Records, 1900-1950",
+            ],
+        )
+
+
+class TestFindingAidLists(TestCase):
+    def setUp(self):
+        Path("tmp").mkdir()
+
+    def tearDown(self):
+        rmtree("tmp")
+
+    @patch("crons.fa_list_generator.FindingAidLists.__init__", return_value=None)
+    def get_lists(self, mock_init):
+        lists = FindingAidLists()
+        lists.base_path = "tmp"
+        lists.gzip_lists = False
+        lists.as_client = MagicMock()
+        lists.resolver = BibidResolver(lists.as_client)
+        lists.index = FindingAidListIndex("tmp/.fa_list_index.json")
+        return lists
+
+    @patch("crons.bibid_resolver.BibidResolver.resources")
+    def test_update_lists(self, mock_resources):
+        lists = self.get_lists()
+        lists.index.get_list("nnc-rb").add("/repositories/2/resources/1", "A", "a")
+        lists.index.get_list("nnc-rb").add("/repositories/2/resources/2", "B", "b")
+        lists.index.get_list("nnc-ua").add("/repositories/2/resources/3", "C", "c")
+        lists.write_lists(1701302400)
+        Path("tmp/nnc-ua_fa_list.html").write_text("stale")
+
+        lists = self.get_lists()
+        lists.as_client.aspace.client.get.return_value.json.return_value = [1, 4]
+        lists.as_client.record_ids.side_effect = lambda uri: (
+            [1, 3, 4] if uri == "/repositories/2/resources" else []
+        )
+        mock_resources.side_effect = lambda repo_id, ids: (
+            [
+                resource_record(1, "Papers", publish=False),
+                resource_record(4, "Records", user_defined={"string_1": "UA#1"}),
+            ]
+            if repo_id == 2
+            else []
+        )
+        lists.update_lists()
+
+        self.assertEqual(
+            lists.as_client.aspace.client.get.call_args.kwargs["params"],
+            {"all_ids": True, "modified_since": 1701302400 - 3600},
+        )
+        self.assertEqual(Path("tmp/nnc-rb_fa_list.html").read_text(), "<ul>\n</ul>")
+        self.assertEqual(
+            Path("tmp/nnc-ua_fa_list.html").read_text(),
+            '<ul>\n<li><a href="/ead/nnc-ua/ldpd_c">C</a></li>\n<li><a href="/ead/nnc-ua/ldpd_4">Records</a></li>\n</ul>',
+        )
+        with open("tmp/.fa_list_index.json") as index_file:
+            index = json.load(index_file)
+        self.assertGreater(index["timestamp"], 1701302400)
+        self.assertEqual(
+            sorted(index["lists"]["nnc-ua"]),
+            ["/repositories/2/resources/3", "/repositories/2/resources/4"],
+        )
+
+    @patch("crons.bibid_resolver.BibidResolver.resources")
+    def test_create_all_lists(self, mock_resources):
+        lists = self.get_lists()
+        lists.resolver.batch_size = 2
+        lists.as_client.record_ids.side_effect = lambda uri: (
+            [1, 2, 3] if uri == "/repositories/2/resources" else []
+        )
+        mock_resources.side_effect = lambda repo_id, ids: [
+            resource_record(i, f"Papers {i}", publish=i != 2) for i in ids
+        ]
+        lists.create_all_lists()
+        self.assertEqual(
+            [c.args for c in mock_resources.call_args_list], [(2, [1, 2]), (2, [3])]
+        )
+        self.assertEqual(
+            Path("tmp/nnc-rb_fa_list.html").read_text(),
+            '<ul>\n<li><a href="/ead/nnc-rb/ldpd_1">Papers 1</a></li>\n<li><a href="/ead/nnc-rb/ldpd_3">Papers 3</a></li>\n</ul>',
+        )
+
+    @patch("crons.fa_list_generator.FindingAidLists.create_html_snippet")
+    def test_unchanged_lists(self, mock_create_html_snippet):
+        lists = self.get_lists()
+        lists.index.get_list("nnc-rb").add("/repositories/2/resources/1", "A", "a")
+        lists.write_lists(1701302400)
+        Path("tmp/nnc-rb_fa_list.html").touch()
+        lists.write_lists(1701302500)
+        mock_create_html_snippet.assert_called_once_with(
+            '<ul>\n<li><a href="/ead/nnc-rb/ldpd_a">A</a></li>\n</ul>', "nnc-rb"
+        )
+
+    def test_create_html_snippet(self):
+        lists = self.get_lists()
+        lists.gzip_lists = True
+        lists.index.get_list("nnc-rb").add(
+            "/repositories/2/resources/1", "Smith & Jones <papers>", "1 2"
+        )
+        lists.write_lists(1701302400)
+        expected = '<ul>\n<li><a href="/ead/nnc-rb/ldpd_1%202">Smith &amp; Jones &lt;papers&gt;</a></li>\n</ul>'
+        self.assertEqual(Path("tmp/nnc-rb_fa_list.html").read_text(), expected)
+        with gzip.open("tmp/nnc-rb_fa_list.html.gz", "rt") as gzip_file:
+            self.assertEqual(gzip_file.read(), expected)
+        self.assertEqual(
+            sorted(p.name for p in Path("tmp").iterdir()),
+            [".fa_list_index.json", "nnc-rb_fa_list.html", "nnc-rb_fa_list.html.gz"],
+        )
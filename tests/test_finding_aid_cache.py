@@ -0,0 +1,67 @@
+from pathlib import Path
+from shutil import rmtree
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from crons.finding_aid_cache import FindingAidCache
+
+PARENT_CACHE = "tmp/parent_cache"
+
+
+def mock_response(content):
+    response = MagicMock()
+    response.iter_content.return_value = [content]
+    return response
+
+
+class TestFindingAidCache(TestCase):
+    def tearDown(self):
+        rmtree("tmp", ignore_errors=True)
+
+    def test_write(self):
+        cache = FindingAidCache(PARENT_CACHE)
+        filepath = cache.write(
+            "ead", "cul-123", mock_response(b"<ead/>"), "nnc-rb", "/resources/1"
+        )
+        self.assertEqual(filepath, Path(PARENT_CACHE, "ead_cache/as_ead_cul-123.xml"))
+        self.assertEqual(filepath.read_bytes(), b"<ead/>")
+        entry = cache.get("ead", "cul-123")
+        self.assertEqual(entry["size"], 6)
+        self.assertEqual(entry["repo"], "nnc-rb")
+        self.assertTrue(cache.exists("ead", "cul-123"))
+        self.assertFalse(cache.exists("pdf", "cul-123"))
+
+    def test_sharded(self):
+        cache = FindingAidCache(PARENT_CACHE, sharded=True)
+        filepath = cache.write("pdf", "cul-123", mock_response(b"%PDF"))
+        self.assertEqual(filepath.parent.parent, Path(PARENT_CACHE, "pdf_cache"))
+        self.assertEqual(len(filepath.parent.name), 2)
+        self.assertTrue(filepath.exists())
+
+    def test_garbage_collect(self):
+        cache = FindingAidCache(PARENT_CACHE)
+        for bibid, repo in [
+            ("cul-1", "nnc-rb"),
+            ("cul-2", "nnc-rb"),
+            ("cul-3", "nnc-a"),
+        ]:
+            cache.write("ead", bibid, mock_response(b"<ead/>"), repo)
+            cache.write("pdf", bibid, mock_response(b"%PDF"), repo)
+        removed = cache.garbage_collect({"cul-1"}, "nnc-rb")
+        self.assertEqual(removed, ["cul-2"])
+        self.assertEqual(cache.bibids(), {"cul-1", "cul-3"})
+        self.assertFalse(Path(PARENT_CACHE, "ead_cache/as_ead_cul-2.xml").exists())
+        self.assertFalse(Path(PARENT_CACHE, "pdf_cache/as_ead_cul-2.pdf").exists())
+
+    def test_import_existing(self):
+        cache = FindingAidCache(PARENT_CACHE)
+        self.assertFalse(Path("tmp").exists())
+        Path(PARENT_CACHE, "ead_cache").mkdir(parents=True)
+        Path(PARENT_CACHE, "ead_cache/as_ead_cul-123.xml").write_bytes(b"<ead/>")
+        self.assertEqual(cache.get("ead", "cul-123")["size"], 6)
+        self.assertEqual(cache.import_existing(), 0)
+        cache.claim({"cul-123", "cul-456"}, "nnc-rb")
+        self.assertEqual(cache.bibids("nnc-rb"), {"cul-123"})
+        cache.close()
+        Path(PARENT_CACHE, "ead_cache/as_ead_cul-456.xml").write_bytes(b"<ead/>")
+        self.assertFalse(FindingAidCache(PARENT_CACHE).exists("ead", "cul-456"))
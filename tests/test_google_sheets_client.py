@@ -1,12 +1,25 @@
+import tempfile
 import unittest
-from unittest.mock import patch
+from pathlib import Path
+from unittest.mock import MagicMock, patch
 
-from crons.google_sheets_client import GoogleSheetsClient
+from crons import google_sheets_client
+from crons.google_sheets_client import (
+    DataSheet,
+    GoogleSheetsClient,
+    cell_text,
+    diff_rows,
+    split_range,
+    update_cells_request,
+)
 
 from .helpers import mock_build_service, mock_get_sheet_info
 
 
 class TestGoogleSheetsClient(unittest.TestCase):
+    def setUp(self):
+        google_sheets_client._services.clear()
+
     @patch("crons.google_sheets_client.build")
     def test_init(self, mock_build):
         mock_build.return_value = mock_build_service()
@@ -31,3 +44,266 @@ class TestGoogleSheetsClient(unittest.TestCase):
         ).get_sheet_tabs()
         self.assertEqual(len(sheet_tabs), 5)
         self.assertTrue("Collection Management" in sheet_tabs)
+
+    @patch("crons.google_sheets_client.build")
+    def test_service_shared(self, mock_build):
+        mock_build.return_value = mock_build_service()
+        credentials = ("access_token", "refresh_token", "client_id", "client_secret")
+        first_client = GoogleSheetsClient(*credentials, "spreadsheet_id")
+        second_client = DataSheet(*credentials, "other_spreadsheet_id", "Sheet1!A:Z")
+        self.assertIs(first_client.service, second_client.service)
+        mock_build.assert_called_once()
+        self.assertTrue(mock_build.call_args.kwargs["static_discovery"])
+        GoogleSheetsClient(
+            "access_token",
+            "other_refresh_token",
+            "client_id",
+            "client_secret",
+            "spreadsheet_id",
+        )
+        self.assertEqual(mock_build.call_count, 2)
+
+    @patch("crons.google_sheets_client.GoogleSheetsClient.get_sheet_info")
+    @patch("crons.google_sheets_client.build")
+    def test_replace_ranges(self, mock_build, mock_sheet_info):
+        mock_build.return_value = MagicMock()
+        mock_sheet_info.return_value = mock_get_sheet_info("sheet_info.json")
+        client = GoogleSheetsClient(
+            "access_token",
+            "refresh_token",
+            "client_id",
+            "client_secret",
+            "spreadsheet_id",
+        )
+        client.replace_ranges(
+            {
+                "Resources!A:C": [["uri", "title", "bibid"], ["/1", None]],
+                "README!B3:C": [["note"]],
+            }
+        )
+        batch_update = client.service.spreadsheets().batchUpdate
+        batch_update.assert_called_once()
+        requests = batch_update.call_args.kwargs["body"]["requests"]
+        resources, resources_clear, readme, readme_clear = requests
+        self.assertEqual(
+            resources["updateCells"]["start"],
+            {"sheetId": 0, "rowIndex": 0, "columnIndex": 0},
+        )
+        self.assertEqual(
+            resources["updateCells"]["rows"][1],
+            {"values": [{"userEnteredValue": {"stringValue": "/1"}}, {}, {}]},
+        )
+        self.assertEqual(
+            resources_clear["repeatCell"]["range"],
+            {
+                "sheetId": 0,
+                "startRowIndex": 2,
+                "endRowIndex": 4406,
+                "startColumnIndex": 0,
+                "endColumnIndex": 3,
+            },
+        )
+        self.assertEqual(
+            readme["updateCells"]["start"],
+            {"sheetId": 1639738375, "rowIndex": 2, "columnIndex": 1},
+        )
+        self.assertEqual(len(readme["updateCells"]["rows"][0]["values"]), 2)
+        self.assertEqual(readme_clear["repeatCell"]["range"]["startRowIndex"], 3)
+        client.service.spreadsheets().values().batchUpdate.assert_not_called()
+
+    @patch("crons.google_sheets_client.GoogleSheetsClient.get_sheet_info")
+    @patch("crons.google_sheets_client.build")
+    def test_replace_ranges_grid(self, mock_build, mock_sheet_info):
+        """Rows past the end of the grid are written after growing it, in the same request."""
+        mock_build.return_value = MagicMock()
+        mock_sheet_info.return_value = mock_get_sheet_info("sheet_info.json")
+        client = GoogleSheetsClient(
+            "access_token",
+            "refresh_token",
+            "client_id",
+            "client_secret",
+            "spreadsheet_id",
+        )
+        client.replace_ranges({"log!A999:B": [["a"], ["b"], ["c"]]})
+        requests = client.service.spreadsheets().batchUpdate.call_args.kwargs["body"][
+            "requests"
+        ]
+        self.assertEqual(
+            requests[0],
+            {
+                "appendDimension": {
+                    "sheetId": 362918702,
+                    "dimension": "ROWS",
+                    "length": 1,
+                }
+            },
+        )
+        self.assertEqual(requests[1]["updateCells"]["start"]["rowIndex"], 998)
+        self.assertEqual(len(requests), 2)
+        with self.assertRaisesRegex(ValueError, "no tab named missing"):
+            client.replace_ranges({"missing!A:B": []})
+
+    def test_split_range(self):
+        self.assertEqual(split_range("rbml!A:Z"), ("rbml", "A", 1, 26))
+        self.assertEqual(split_range("'Sheet 1'!B2:AA"), ("Sheet 1", "B", 2, 26))
+
+    @patch("crons.google_sheets_client.GoogleSheetsClient.get_sheet_info")
+    @patch("crons.google_sheets_client.build")
+    def test_import_csv(self, mock_build, mock_sheet_info):
+        mock_build.return_value = MagicMock()
+        mock_sheet_info.return_value = mock_get_sheet_info("sheet_info.json")
+        data_sheet = DataSheet(
+            "access_token",
+            "refresh_token",
+            "client_id",
+            "client_secret",
+            "spreadsheet_id",
+            "log!A:C",
+        )
+        progress = []
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_path = Path(tmp_dir, "import.csv")
+            csv_path.write_text("a|b|c\n1|2|3\n4|5|6\n7|8\n9|10|11\n")
+            rows_written = data_sheet.import_csv(
+                csv_path, delim="|", chunk_size=2, start_row=2, progress=progress.append
+            )
+        self.assertEqual(rows_written, 5)
+        self.assertEqual(progress, [4, 5])
+        calls = data_sheet.service.spreadsheets().batchUpdate.call_args_list
+        requests = [c.kwargs["body"]["requests"] for c in calls]
+        self.assertEqual(
+            [r[0]["updateCells"]["start"]["rowIndex"] for r in requests[:2]], [2, 4]
+        )
+        self.assertEqual(
+            requests[0][0]["updateCells"]["rows"][1],
+            {
+                "values": [
+                    {"userEnteredValue": {"numberValue": 7.0}},
+                    {"userEnteredValue": {"numberValue": 8.0}},
+                    {},
+                ]
+            },
+        )
+        self.assertEqual(
+            requests[2][0]["repeatCell"]["range"],
+            {
+                "sheetId": 362918702,
+                "startRowIndex": 5,
+                "endRowIndex": 1000,
+                "startColumnIndex": 0,
+                "endColumnIndex": 3,
+            },
+        )
+        self.assertEqual(len(requests), 3)
+
+    @patch("crons.google_sheets_client.GoogleSheetsClient.get_sheet_info")
+    @patch("crons.google_sheets_client.build")
+    def test_import_csv_grid(self, mock_build, mock_sheet_info):
+        mock_build.return_value = MagicMock()
+        mock_sheet_info.return_value = mock_get_sheet_info("sheet_info.json")
+        credentials = ("access_token", "refresh_token", "client_id", "client_secret")
+        data_sheet = DataSheet(*credentials, "spreadsheet_id", "log!A998:C")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_path = Path(tmp_dir, "import.csv")
+            csv_path.write_text("a,b\n1,2\n3,4\n5,6\n")
+            self.assertEqual(data_sheet.import_csv(csv_path, chunk_size=2), 4)
+        calls = data_sheet.service.spreadsheets().batchUpdate.call_args_list
+        self.assertEqual(len(calls), 2)
+        first, second = [c.kwargs["body"]["requests"] for c in calls]
+        self.assertEqual([list(r) for r in first], [["updateCells"]])
+        self.assertEqual(
+            second[0]["appendDimension"],
+            {"sheetId": 362918702, "dimension": "ROWS", "length": 1},
+        )
+        self.assertEqual(second[1]["updateCells"]["start"]["rowIndex"], 999)
+        data_sheet = DataSheet(*credentials, "spreadsheet_id", "missing!A:C")
+        with self.assertRaisesRegex(ValueError, "no tab named missing"):
+            data_sheet.import_csv(csv_path)
+
+    def test_cell_text(self):
+        """Values written with USER_ENTERED match the unformatted values read back."""
+        for written, read in [
+            ("0012", 12),
+            (3.50, "3.5"),
+            (True, True),
+            ("true", True),
+            ("'0012", "0012"),
+            (None, ""),
+            ("MS#0012", "MS#0012"),
+        ]:
+            self.assertEqual(cell_text(written), cell_text(read, False), written)
+        self.assertNotEqual(cell_text("1.5"), cell_text(1.25, False))
+        self.assertNotEqual(cell_text("0012"), cell_text("0012", False))
+
+    def test_diff_rows(self):
+        current_rows = [
+            ["uri", "title", "published"],
+            ["/1", "One", "TRUE"],
+            ["/2", "Two", "TRUE"],
+            ["/3", "Three", "FALSE"],
+            ["/4", "Four", "TRUE"],
+        ]
+        new_rows = [
+            ["uri", "title", "published"],
+            ["/1", "One", True],
+            ["/3", "Three", True],
+            ["/4", "Four", True],
+        ]
+        updates, counts = diff_rows(current_rows, new_rows, 0)
+        self.assertEqual(counts, {"inserted": 0, "changed": 1, "deleted": 1})
+        self.assertEqual(
+            updates,
+            [(2, 0, ["/4", "Four"]), (3, 2, [True]), (4, 0, ["", "", ""])],
+        )
+        new_rows.append(["/5", None, False])
+        updates, counts = diff_rows(current_rows, new_rows, 0)
+        self.assertEqual(counts, {"inserted": 1, "changed": 1, "deleted": 1})
+        self.assertEqual(updates, [(2, 0, ["/5", "", False]), (3, 2, [True])])
+
+    @patch("crons.google_sheets_client.GoogleSheetsClient.get_sheet_info")
+    @patch("crons.google_sheets_client.DataSheet.get_sheet_data_columns")
+    @patch("crons.google_sheets_client.build")
+    def test_update_sheet_diff(self, mock_build, mock_columns, mock_sheet_info):
+        mock_build.return_value = MagicMock()
+        sheet_info = mock_get_sheet_info("sheet_info.json")
+        sheet_info["sheets"][1]["properties"]["gridProperties"]["rowCount"] = 3
+        mock_sheet_info.return_value = sheet_info
+        mock_columns.return_value = [["uri", "/1", "/2"], ["title", "One", "Two"]]
+        data_sheet = DataSheet(
+            "access_token",
+            "refresh_token",
+            "client_id",
+            "client_secret",
+            "spreadsheet_id",
+            "Resources!A:Z",
+        )
+        counts = data_sheet.update_sheet_diff(
+            [["uri", "title"], ["/1", "One"], ["/2", "Second"], ["/3", "Three"]]
+        )
+        self.assertEqual(
+            counts, {"inserted": 1, "changed": 1, "deleted": 0, "ranges": 2}
+        )
+        requests = data_sheet.service.spreadsheets().batchUpdate.call_args.kwargs[
+            "body"
+        ]["requests"]
+        self.assertEqual(
+            requests,
+            [
+                {
+                    "appendDimension": {
+                        "sheetId": 0,
+                        "dimension": "ROWS",
+                        "length": 1,
+                    }
+                },
+                update_cells_request(0, 2, 1, [["Second"]]),
+                update_cells_request(0, 3, 0, [["/3", "Three"]]),
+            ],
+        )
+        self.assertEqual(
+            requests[2]["updateCells"]["rows"][0]["values"][1],
+            {"userEnteredValue": {"stringValue": "Three"}},
+        )
+        mock_columns.assert_called_with("UNFORMATTED_VALUE")
+        mock_columns.return_value = [["id", "/1"], ["title", "One"]]
+        self.assertIsNone(data_sheet.update_sheet_diff([["uri", "title"]]))
@@ -1,8 +1,12 @@
+from pathlib import Path
+from shutil import rmtree
 from unittest import TestCase
+from unittest.mock import MagicMock
 
 from freezegun import freeze_time
+from requests import HTTPError
 
-from crons.helpers import format_date, yesterday_utc
+from crons.helpers import format_date, stream_to_file, yesterday_utc
 
 
 class TestHelpers(TestCase):
@@ -54,3 +58,20 @@ class TestHelpers(TestCase):
     def test_yesterday_utc(self):
         yesterday_timestamp = yesterday_utc()
         self.assertEqual(yesterday_timestamp, 1701302400)
+
+    def test_stream_to_file(self):
+        Path("tmp").mkdir()
+        response = MagicMock()
+        response.iter_content.return_value = [b"<ead>", b"\xc3\xa9</ead>"]
+        stream_to_file(response, "tmp/as_ead_cul-123.xml")
+        self.assertEqual(
+            Path("tmp/as_ead_cul-123.xml").read_bytes(), b"<ead>\xc3\xa9</ead>"
+        )
+        response.raise_for_status.side_effect = HTTPError("500 Server Error")
+        with self.assertRaises(HTTPError):
+            stream_to_file(response, "tmp/as_ead_cul-123.xml")
+        contents = Path("tmp/as_ead_cul-123.xml").read_bytes()
+        files = list(Path("tmp").iterdir())
+        rmtree("tmp")
+        self.assertEqual(contents, b"<ead>\xc3\xa9</ead>")
+        self.assertEqual(files, [Path("tmp/as_ead_cul-123.xml")])
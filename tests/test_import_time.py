@@ -0,0 +1,37 @@
+from unittest import TestCase
+
+from crons.import_time import (
+    IMPORT_BUDGETS,
+    ImportBudget,
+    check_import_budget,
+    import_times,
+    parse_import_times,
+)
+
+IMPORTTIME_OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       371 |      38772 |               google.auth.jwt
+import time:      1543 |     297375 | crons.report_runner
+"""
+
+
+class TestImportTime(TestCase):
+    def test_parse_import_times(self):
+        times = parse_import_times(IMPORTTIME_OUTPUT)
+        self.assertEqual(
+            times, {"google.auth.jwt": 0.038772, "crons.report_runner": 0.297375}
+        )
+
+    def test_deferred_imports(self):
+        """Entry points without Google Sheets or EAD export do not load their dependencies."""
+        for module_name, budget in IMPORT_BUDGETS.items():
+            loaded = {name.split(".")[0] for name in import_times(module_name)}
+            self.assertFalse(loaded & set(budget.deferred), module_name)
+
+    def test_check_import_budget(self):
+        self.assertEqual(
+            check_import_budget("crons.report_sinks", ImportBudget(60, ("lxml",)), 1),
+            [],
+        )
+        errors = check_import_budget("crons.validation", ImportBudget(0, ("lxml",)), 1)
+        self.assertEqual(len(errors), 2)
+        self.assertIn("imports deferred packages: lxml", errors[1])
@@ -0,0 +1,55 @@
+import threading
+from unittest import TestCase
+
+from crons.pipeline import Join, Pipeline, Stage
+
+
+class TestPipeline(TestCase):
+    def test_pipeline(self):
+        results = []
+        batches = []
+        lock = threading.Lock()
+
+        def collect(item):
+            with lock:
+                results.append(item)
+
+        def collect_batch(items):
+            with lock:
+                batches.append(items)
+
+        def double(item):
+            if item == 3:
+                raise ValueError("bad item")
+            return item * 2
+
+        double_stage = Stage("double", double, workers=3, maxsize=2)
+        collect_stage = double_stage.then(Stage("collect", collect))
+        batch_stage = double_stage.then(Stage("batch", collect_batch, batch_size=4))
+        with Pipeline(
+            [double_stage, collect_stage, batch_stage], stats_interval=0.01
+        ) as pipeline:
+            for i in range(10):
+                double_stage.put(i)
+        self.assertEqual(sorted(results), [0, 2, 4, 8, 10, 12, 14, 16, 18])
+        self.assertEqual(sorted(i for b in batches for i in b), sorted(results))
+        self.assertTrue(all(len(b) <= 4 for b in batches))
+        stats = pipeline.stats()
+        self.assertEqual(stats["double"]["processed"], 9)
+        self.assertEqual(stats["double"]["errors"], 1)
+        self.assertEqual(stats["batch"]["processed"], 9)
+        self.assertEqual(stats["collect"]["queue_depth"], 0)
+
+    def test_join(self):
+        joined = []
+        square_stage = Stage("square", lambda i: (i, i * i), workers=2)
+        odd_stage = Stage("odd", lambda i: (i, i * i) if i % 2 else None, workers=2)
+        join_stage = Join("join", lambda item: item[0], 2)
+        square_stage.then(join_stage)
+        odd_stage.then(join_stage)
+        collect_stage = join_stage.then(Stage("collect", joined.append))
+        with Pipeline([square_stage, odd_stage, join_stage, collect_stage]):
+            for i in range(6):
+                square_stage.put(i)
+                odd_stage.put(i)
+        self.assertEqual(sorted(joined), [(1, 1), (3, 9), (5, 25)])
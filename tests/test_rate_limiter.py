@@ -0,0 +1,93 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from requests.exceptions import ConnectionError
+
+from crons.rate_limiter import RateLimiter, ThrottledAdapter
+
+
+def mock_response(status_code):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = {}
+    return response
+
+
+class TestRateLimiter(TestCase):
+    @patch("crons.rate_limiter.time.sleep")
+    @patch("crons.rate_limiter.time.monotonic")
+    def test_acquire(self, mock_monotonic, mock_sleep):
+        mock_monotonic.return_value = 100.0
+        mock_sleep.side_effect = lambda seconds: setattr(
+            mock_monotonic, "return_value", mock_monotonic.return_value + seconds
+        )
+        rate_limiter = RateLimiter(2, burst=2)
+        rate_limiter.acquire()
+        rate_limiter.acquire()
+        mock_sleep.assert_not_called()
+        rate_limiter.acquire()
+        mock_sleep.assert_called_once_with(0.5)
+
+    @patch("crons.rate_limiter.time.monotonic")
+    def test_record(self, mock_monotonic):
+        mock_monotonic.return_value = 100.0
+        rate_limiter = RateLimiter(4, min_rate=1, max_rate=5, increase=0.5)
+        rate_limiter.record(0.1, 200)
+        self.assertEqual(rate_limiter.rate, 4.5)
+        rate_limiter.record(0.1, 200)
+        rate_limiter.record(0.1, 200)
+        self.assertEqual(rate_limiter.rate, 5)
+        rate_limiter.record(10, 200)
+        self.assertEqual(rate_limiter.rate, 5)
+        rate_limiter.record(0.1, 502)
+        self.assertEqual(rate_limiter.rate, 2.5)
+        mock_monotonic.return_value = 100.5
+        rate_limiter.record(1, 503)
+        rate_limiter.record(1)
+        self.assertEqual(rate_limiter.rate, 2.5)
+        mock_monotonic.return_value = 101.0
+        rate_limiter.record(0.5)
+        self.assertEqual(rate_limiter.rate, 1.25)
+        mock_monotonic.return_value = 102.0
+        rate_limiter.record(0.1, 429)
+        self.assertEqual(rate_limiter.rate, 1)
+        fixed_rate_limiter = RateLimiter(3)
+        fixed_rate_limiter.record(0.1, 200)
+        fixed_rate_limiter.record(0.1, 429)
+        self.assertEqual(fixed_rate_limiter.rate, 3)
+
+
+class TestThrottledAdapter(TestCase):
+    @patch("crons.rate_limiter.time.sleep")
+    @patch("requests.adapters.HTTPAdapter.send")
+    @patch("crons.rate_limiter.RateLimiter.acquire")
+    def test_send(self, mock_acquire, mock_send, mock_sleep):
+        mock_send.side_effect = [
+            mock_response(502),
+            ConnectionError(),
+            mock_response(200),
+        ]
+        adapter = ThrottledAdapter(RateLimiter(5, max_rate=10), retries=3)
+        response = adapter.send(MagicMock(method="GET"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_acquire.call_count, 3)
+        self.assertEqual(mock_sleep.call_count, 2)
+        self.assertLessEqual(mock_sleep.call_args_list[1].args[0], 2)
+
+    @patch("crons.rate_limiter.time.sleep")
+    @patch("requests.adapters.HTTPAdapter.send")
+    def test_send_not_retried(self, mock_send, mock_sleep):
+        mock_send.return_value = mock_response(503)
+        adapter = ThrottledAdapter(retries=3)
+        response = adapter.send(MagicMock(method="POST"))
+        self.assertEqual(response.status_code, 503)
+        mock_send.return_value = mock_response(503)
+        response = ThrottledAdapter(retries=1).send(MagicMock(method="GET"))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(mock_send.call_count, 3)
+        mock_sleep.assert_called_once()
+
+    def test_retry_delay(self):
+        adapter = ThrottledAdapter(backoff=0.5)
+        self.assertEqual(adapter.retry_delay(2, "7"), 7)
+        self.assertLessEqual(adapter.retry_delay(2), 2)
@@ -29,7 +29,7 @@ class TestAccessionsReporter(unittest.TestCase):
     def tearDown(self):
         rmtree(TEST_DIRECTORY)
 
-    @patch("crons.aspace_client.ArchivesSpaceClient.get_json_response")
+    @patch("crons.aspace_client.ArchivesSpaceClient.get_cached_json_response")
     @patch("crons.aspace_client.ArchivesSpaceClient.accessions_from_repository")
     @patch("crons.aspace_client.ArchivesSpaceClient.__init__", return_value=None)
     def test_construct_sheet(
@@ -73,7 +73,7 @@ class TestAccessionsReporter(unittest.TestCase):
         self.assertEqual(len(accession_row), len(accession_reporter.fields))
 
     @freeze_time("2021-11-02 00:00:00")
-    @patch("crons.aspace_client.ArchivesSpaceClient.get_json_response")
+    @patch("crons.aspace_client.ArchivesSpaceClient.get_cached_json_response")
     @patch("crons.aspace_client.ArchivesSpaceClient.accessions_from_repository")
     @patch("crons.aspace_client.ArchivesSpaceClient.__init__", return_value=None)
     def test_get_row_data(self, mock_as_init, mock_accessions, mock_get_json_response):
@@ -88,3 +88,14 @@ class TestAccessionsReporter(unittest.TestCase):
             self.assertTrue(accession_rows)
             self.assertIsInstance(accession_rows, types.GeneratorType)
             self.assertEqual(len([a for a in accession_rows]), 2)
+
+    @patch("crons.aspace_client.ArchivesSpaceClient.get_cached_json_response")
+    @patch("crons.aspace_client.ArchivesSpaceClient.accessions_from_repository")
+    @patch("crons.aspace_client.ArchivesSpaceClient.__init__", return_value=None)
+    def test_create_report(self, mock_as_init, mock_accessions, mock_get_json_response):
+        mock_accessions.side_effect = lambda repo_id: mock_accessions_generator("rbml")
+        with open(Path("fixtures", "rbml_resource.json")) as s:
+            mock_get_json_response.return_value = json.load(s)
+        report = AccessionsReporter().create_report()
+        self.assertEqual(report.count("Wrote 3 rows"), 4)
+        self.assertEqual(len(list(Path(TEST_DIRECTORY).iterdir())), 4)
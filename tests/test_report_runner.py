@@ -0,0 +1,100 @@
+import time
+from configparser import ConfigParser
+from datetime import timedelta
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from crons.as_cron import BaseAsCron
+from crons.async_aspace_client import SyncArchivesSpaceClient
+from crons.report_runner import ReportInstrumentation, ReportRunner
+
+
+class TestReportRunner(TestCase):
+    @patch.object(
+        BaseAsCron,
+        "run",
+        autospec=True,
+        side_effect=lambda self, google, diff: f"{type(self).__name__} {self.output_format}",
+    )
+    def test_run(self, mock_run):
+        as_client = MagicMock()
+        as_client.aspace.client.session.hooks = {"response": []}
+        runner = ReportRunner(as_client, output_format="csv.gz")
+        messages = runner.run()
+        self.assertEqual(
+            messages,
+            [
+                "ResourceReporter csv.gz",
+                "AccessionsReporter csv.gz",
+                "AgentsReporter csv.gz",
+                "SubjectReporter csv.gz",
+            ],
+        )
+        self.assertTrue(as_client.cache_resources)
+        self.assertEqual(
+            {c.args[0].as_client for c in mock_run.call_args_list}, {as_client}
+        )
+        self.assertEqual(len(runner.instrumentation.durations), 4)
+        self.assertEqual(len(as_client.aspace.client.session.hooks["response"]), 1)
+
+    @patch.object(BaseAsCron, "run", autospec=True)
+    def test_run_after(self, mock_run):
+        events = []
+
+        def run(reporter, google, diff):
+            name = type(reporter).__name__
+            if name == "ResourceReporter":
+                time.sleep(0.05)
+            events.append(name)
+
+        mock_run.side_effect = run
+        as_client = MagicMock()
+        as_client.aspace.client.session.hooks = {"response": []}
+        ReportRunner(as_client).run()
+        self.assertLess(
+            events.index("ResourceReporter"), events.index("AccessionsReporter")
+        )
+
+    @patch("crons.report_sinks.importlib.util.find_spec", return_value=None)
+    @patch.object(BaseAsCron, "run", autospec=True)
+    def test_run_missing_package(self, mock_run, mock_find_spec):
+        """A format whose package is missing fails before any report runs."""
+        as_client = MagicMock()
+        as_client.aspace.client.session.hooks = {"response": []}
+        runner = ReportRunner(as_client, output_format="parquet")
+        with self.assertRaises(ImportError):
+            runner.run()
+        mock_run.assert_not_called()
+        self.assertEqual(len(runner.run(google=True)), 4)
+
+    @patch("crons.async_aspace_client.ASpace")
+    @patch("crons.aspace_client.ASpace")
+    def test_client_from_config(self, mock_aspace, mock_async_aspace):
+        config = ConfigParser()
+        config["ArchivesSpace"] = {
+            "baseurl": "https://aspace/api",
+            "username": "user",
+            "password": "password",
+        }
+        as_client = ReportRunner.client_from_config(config["ArchivesSpace"])
+        self.assertNotIsInstance(as_client, SyncArchivesSpaceClient)
+        config["ArchivesSpace"]["concurrent_requests"] = "4"
+        as_client = ReportRunner.client_from_config(config["ArchivesSpace"])
+        self.assertIsInstance(as_client, SyncArchivesSpaceClient)
+        self.assertEqual(as_client.async_client.concurrency, 4)
+
+    def test_instrumentation(self):
+        instrumentation = ReportInstrumentation()
+        for ok in [True, False]:
+            instrumentation.record_response(
+                MagicMock(ok=ok, elapsed=timedelta(seconds=0.5))
+            )
+        with instrumentation.report("AgentsReporter"):
+            pass
+        self.assertEqual(instrumentation.requests, 2)
+        self.assertEqual(instrumentation.failed_requests, 1)
+        self.assertTrue(
+            instrumentation.summary().startswith(
+                "2 ArchivesSpace requests (1 failed, 1.0s total). Reports: AgentsReporter: 0.0s"
+            )
+        )
@@ -0,0 +1,79 @@
+import csv
+import gzip
+import io
+import json
+from pathlib import Path
+from shutil import rmtree
+from unittest import TestCase
+from unittest.mock import patch
+
+import pytest
+
+from crons.as_cron import BaseAsCron
+from crons.report_sinks import CsvSink, get_sink
+from crons.report_table import Field
+
+ROWS = [
+    ["uri", "year", "linear_feet"],
+    ["/accessions/1", 1999, 1.5],
+    ["/accessions/2", "", 2],
+]
+
+
+class TestReportSinks(TestCase):
+    def setUp(self):
+        Path("tmp").mkdir()
+
+    def tearDown(self):
+        rmtree("tmp")
+
+    def test_csv_sinks(self):
+        get_sink("csv.gz")("tmp/report.csv.gz").write(ROWS)
+        with gzip.open("tmp/report.csv.gz", "rt") as csvfile:
+            self.assertEqual(list(csv.reader(csvfile))[2], ["/accessions/2", "", "2"])
+        get_sink("jsonl")("tmp/report.jsonl").write(ROWS)
+        with open("tmp/report.jsonl") as jsonfile:
+            records = [json.loads(line) for line in jsonfile]
+        self.assertEqual(
+            records[0], {"uri": "/accessions/1", "year": 1999, "linear_feet": 1.5}
+        )
+        with self.assertRaises(ValueError):
+            get_sink("xlsx")
+
+    @patch("crons.report_sinks.importlib.util.find_spec", return_value=None)
+    def test_get_sink_requires(self, mock_find_spec):
+        self.assertIs(get_sink("csv"), CsvSink)
+        with self.assertRaisesRegex(ImportError, "requires the pyarrow package"):
+            get_sink("parquet")
+        mock_find_spec.assert_called_once_with("pyarrow")
+
+    def test_zstd_sink(self):
+        zstandard = pytest.importorskip("zstandard")
+        row_count = get_sink("csv.zst")("tmp/report.csv.zst").write(iter(ROWS))
+        self.assertEqual(row_count, 3)
+        with open("tmp/report.csv.zst", "rb") as zstfile:
+            data = zstandard.ZstdDecompressor().stream_reader(zstfile).read()
+        rows = list(csv.reader(io.StringIO(data.decode("utf-8"))))
+        self.assertEqual(rows[1], ["/accessions/1", "1999", "1.5"])
+
+    def test_parquet_sink(self):
+        parquet = pytest.importorskip("pyarrow.parquet")
+        fields = [Field("uri"), Field("year"), Field("linear_feet", float)]
+        sink = get_sink("parquet")("tmp/report.parquet", fields)
+        sink.batch_size = 1
+        self.assertEqual(sink.write(iter(ROWS)), 3)
+        parquet_file = parquet.ParquetFile("tmp/report.parquet")
+        self.assertEqual(parquet_file.num_row_groups, 2)
+        table = parquet_file.read()
+        self.assertEqual(str(table.schema.field("linear_feet").type), "double")
+        self.assertEqual(table.column("year").to_pylist(), ["1999", ""])
+        self.assertEqual(table.column("linear_feet").to_pylist(), [1.5, 2.0])
+
+    @patch("crons.aspace_client.ArchivesSpaceClient.__init__", return_value=None)
+    def test_write_data_to_file(self, mock_aspace):
+        base_as_cron = BaseAsCron("report_subjects_sheet")
+        self.assertEqual(base_as_cron.output_format, "csv")
+        base_as_cron.output_format = "csv.gz"
+        msg = base_as_cron.write_data_to_file(ROWS, "tmp/2024_01_01_0000_report.csv")
+        self.assertEqual(msg, "Wrote 3 rows to tmp/2024_01_01_0000_report.csv.gz")
+        self.assertTrue(Path("tmp/2024_01_01_0000_report.csv.gz").exists())
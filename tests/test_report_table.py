@@ -0,0 +1,44 @@
+import array
+from unittest import TestCase
+
+from crons.report_table import Field, ReportTable, truncate_text
+
+RECORDS = [
+    {"uri": "/repositories/2/resources/1", "note": " Scope note ", "extra": 1},
+    {"uri": "/repositories/2/resources/2", "note": "x" * 300},
+]
+
+
+class TestReportTable(TestCase):
+    def test_from_records(self):
+        table = ReportTable.from_records(["uri", "note", "missing"], RECORDS)
+        self.assertEqual(len(table), 2)
+        self.assertEqual(table.column("missing"), [None, None])
+        self.assertEqual(
+            table.to_rows(["uri", "missing"]),
+            [
+                ["uri", "missing"],
+                ["/repositories/2/resources/1", None],
+                ["/repositories/2/resources/2", None],
+            ],
+        )
+
+    def test_derive(self):
+        table = ReportTable(["uri", "note"])
+        table.derive(Field("note length", int), len, "note")
+        table.derive("note", truncate_text, "note")
+        table.derive(Field("extra", float), lambda extra: extra or 0, "extra")
+        table.batch_size = 1
+        table.extend(iter(RECORDS))
+        self.assertIsInstance(table.column("note length"), array.array)
+        self.assertEqual(list(table.column("note length")), [12, 300])
+        self.assertEqual(table.column("note")[0], "Scope note")
+        self.assertEqual(len(table.column("note")[1]), 280)
+        self.assertEqual(list(table.column("extra")), [1.0, 0.0])
+        self.assertEqual(
+            [f.name for f in table.fields], ["uri", "note", "note length", "extra"]
+        )
+        with self.assertRaises(ValueError):
+            table.derive("uri", str.upper, "uri")
+        with self.assertRaises(ValueError):
+            table.set_column("short", [1])
@@ -0,0 +1,76 @@
+from shutil import rmtree
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from crons.finding_aid_cache import FindingAidCache
+from crons.resource_delta import ResourceDelta
+
+
+def mock_record(resource_id):
+    return {
+        "jsonmodel_type": "resource",
+        "uri": f"/repositories/2/resources/{resource_id}",
+        "id_0": str(resource_id),
+        "publish": resource_id != 4,
+        "suppressed": False,
+    }
+
+
+def mock_get(uri, params=None):
+    response = MagicMock(ok=True)
+    if params and params.get("id_set[]"):
+        response.json.return_value = [mock_record(i) for i in params["id_set[]"]]
+    elif uri == "/delete-feed":
+        response.json.return_value = {
+            "this_page": 1,
+            "last_page": 1,
+            "results": ["/repositories/2/resources/3", "/agents/people/1"],
+        }
+    elif params.get("modified_since"):
+        response.json.return_value = [1, 4]
+    else:
+        response.json.return_value = [1, 3, 4]
+    return response
+
+
+class TestResourceDelta(TestCase):
+    def setUp(self):
+        self.cache = FindingAidCache("tmp/parent_cache")
+        for resource_id in range(1, 6):
+            self.cache.add(
+                "ead",
+                f"cul-{resource_id}",
+                f"as_ead_cul-{resource_id}.xml",
+                6,
+                "digest",
+                "nnc-rb",
+                f"/repositories/2/resources/{resource_id}",
+            )
+        self.cache.add("ead", "cul-9", "as_ead_cul-9.xml", 6, "digest", "nnc-a")
+        self.as_client = MagicMock()
+        self.as_client.aspace.client.get.side_effect = mock_get
+        self.repo = MagicMock(id=2, repo_code="nnc-rb")
+
+    def tearDown(self):
+        rmtree("tmp")
+
+    def test_removed(self):
+        delta = ResourceDelta(self.as_client, self.repo, self.cache)
+        modified = [r.uri for r in delta.modified(1701302400)]
+        self.assertEqual(modified, ["/repositories/2/resources/1"])
+        self.assertEqual(
+            delta.removed(),
+            {
+                "cul-2": "deleted",
+                "cul-3": "deleted",
+                "cul-4": "unpublished",
+                "cul-5": "deleted",
+            },
+        )
+
+    def test_no_delete_feed(self):
+        self.as_client.aspace.client.get.side_effect = None
+        self.as_client.aspace.client.get.return_value = MagicMock(ok=False)
+        self.assertEqual(
+            ResourceDelta(self.as_client, self.repo, self.cache).deleted_uris(), set()
+        )
@@ -0,0 +1,51 @@
+from pathlib import Path
+from shutil import rmtree
+from unittest import TestCase
+
+from crons.helpers import validate_against_schema
+from crons.validation import ValidationService, validate_file, validate_xml
+
+VALID_MARC = b"""<collection xmlns="http://www.loc.gov/MARC21/slim">
+<record><leader>00000npcaa2200000 a 4500</leader>
+<controlfield tag="001">4078773</controlfield></record>
+</collection>"""
+INVALID_MARC = b"""<collection xmlns="http://www.loc.gov/MARC21/slim">
+<record>
+<bibid>4078773</bibid></record>
+</collection>"""
+
+
+class TestValidation(TestCase):
+    def test_validate_xml(self):
+        self.assertEqual(validate_xml(VALID_MARC, "MARC21slim"), (True, []))
+        result = validate_xml(INVALID_MARC, "MARC21slim")
+        self.assertFalse(result.valid)
+        self.assertEqual(result.errors[0][0], 3)
+        result = validate_xml(b"<collection>", "MARC21slim")
+        self.assertFalse(result.valid)
+        self.assertEqual(len(result.errors), 1)
+        self.assertFalse(validate_against_schema(INVALID_MARC, "MARC21slim"))
+
+    def test_validate_file(self):
+        Path("tmp").mkdir()
+        Path("tmp/valid.xml").write_bytes(VALID_MARC)
+        Path("tmp/invalid.xml").write_bytes(INVALID_MARC)
+        valid = validate_file("tmp/valid.xml", "MARC21slim")
+        invalid = validate_file("tmp/invalid.xml", "MARC21slim")
+        with ValidationService(1, schema_names=("MARC21slim",)) as service:
+            from_service = service.validate_file("tmp/invalid.xml", "MARC21slim")
+        rmtree("tmp")
+        self.assertEqual(valid, (True, []))
+        self.assertFalse(invalid.valid)
+        self.assertEqual(invalid.errors[0][0], 3)
+        self.assertEqual(from_service, invalid)
+
+    def test_validation_service(self):
+        with ValidationService(2, schema_names=("MARC21slim",)) as service:
+            futures = [
+                service.submit(xml, "MARC21slim") for xml in [VALID_MARC, INVALID_MARC]
+            ]
+            results = [future.result() for future in futures]
+        self.assertTrue(results[0].valid)
+        self.assertFalse(results[1].valid)
+        self.assertIn("bibid", results[1].errors[0][1])